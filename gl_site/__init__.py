@@ -16,3 +16,5 @@ Here's an overview of the subdirectories and what they contain:
 * templates: Django HTML templates
 * test: unit tests for views, forms, and inventories score computation
 """
+
+default_app_config = 'gl_site.apps.GlSiteConfig'
@@ -8,6 +8,9 @@ from django.contrib.auth.models import User
 from gl_site.models import Organization, Session
 from gl_site.config_models import SiteConfig, DashboardText
 
+# Statistics cache invalidation
+from gl_site.statistics.cache import bump_data_version
+
 
 admin.site.unregister(User)
 @admin.register(User)
@@ -36,12 +39,7 @@ class InlineSessionAdmin(admin.TabularInline):
     def get_url(self, instance):
         """ Return an absolute url to the session's registration page """
         if instance.uuid != "":
-            configs = SiteConfig.objects.all()
-
-            if configs.exists():
-                base_url = configs[0].base_url
-            else:
-                base_url = '[base_url]'
+            base_url = SiteConfig.cached_base_url() or '[base_url]'
 
             rel = reverse('register', args=(instance.uuid, ))
             url = "{}{}".format(base_url, rel)
@@ -70,6 +68,10 @@ class OrganizationAdmin(admin.ModelAdmin):
         instance.created_by = request.user
         instance.save()
 
+        # Invalidate the cached statistics of the organization
+        if change:
+            bump_data_version(instance.session_set.all())
+
     def save_formset(self, request, form, formset, change):
         """ Override save_formset to set session created_by """
         if formset.model == Session:
@@ -79,13 +81,16 @@ class OrganizationAdmin(admin.ModelAdmin):
                 instance.save()
             formset.save_m2m()
 
+            # Invalidate the cached statistics of changed sessions
+            bump_data_version(instances)
+
     def render_change_form(self, request, context, *args, **kwargs):
         """
         Add one of our own variables to the template's context.
 
         (This ModelAdmin is rendered using a customized template.)
         """
-        context['show_save_url'] = not SiteConfig.objects.all().exists()
+        context['show_save_url'] = SiteConfig.cached_base_url() is None
         return super().render_change_form(request, context, *args, **kwargs)
 
 
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class GlSiteConfig(AppConfig):
+    name = 'gl_site'
+
+    def ready(self):
+        # Connect the signal receivers
+        import gl_site.signals
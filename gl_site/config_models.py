@@ -1,9 +1,59 @@
 """
 Models that store site configuration and content.
+
+The values of the configuration models are cached in the two level
+caches below. Their keys include the version in ConfigVersion, which is
+read from the database at most once per request, so every worker picks
+up a change with its next request. The signal receivers in
+gl_site.signals bump the version when the models are saved, and publish
+the change so that every worker evicts the old values.
 """
+from django.core.signals import request_started
 from django.db import models
+from django.db.models import F
 from ckeditor.fields import RichTextField
 
+from gl_site.invalidation import TwoLevelCache
+
+import threading
+
+# The configuration version read during the current request
+_request = threading.local()
+
+def _forget_version(**kwargs):
+    _request.version = None
+
+request_started.connect(_forget_version)
+
+class ConfigVersion(models.Model):
+    """
+    Version of the site configuration, incremented whenever it changes.
+
+    There is a single instance of this model, created by the migrations.
+    """
+
+    version = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def current(cls):
+        """ Return the configuration version, reading it from the
+            database at most once per request
+        """
+        version = getattr(_request, 'version', None)
+        if (version is None):
+            version = _request.version = cls.objects.values_list('version', flat=True).first() or 0
+
+        return version
+
+    @classmethod
+    def bump(cls):
+        """ Invalidate the cached configuration of every process """
+        cls.objects.update(version=F('version') + 1)
+        _forget_version()
+
+site_config_cache = TwoLevelCache('site_config', version=ConfigVersion.current)
+dashboard_text_cache = TwoLevelCache('dashboard_text', version=ConfigVersion.current)
+
 class SiteConfig(models.Model):
     """
     Configuration variables for gl_site.
@@ -13,6 +63,14 @@ class SiteConfig(models.Model):
 
     base_url = models.CharField(max_length=200)
 
+    @classmethod
+    def cached_base_url(cls):
+        """ Return the configured base url, None if there is none """
+        return site_config_cache.get(
+            'base_url',
+            lambda: cls.objects.values_list('base_url', flat=True).first()
+        )
+
 
 class DashboardText(models.Model):
     """
@@ -34,6 +92,19 @@ class DashboardText(models.Model):
     def __str__(self):
         return 'DashboardText object'
 
+    @classmethod
+    def cached_text(cls):
+        """ Return the dashboard text as a dict of field name to value """
+        return dashboard_text_cache.get(
+            'values',
+            lambda: cls.objects.values(
+                'inventory_desc',
+                'mental_health_warning',
+                'about_panel_title',
+                'about_panel_contents'
+            )[0]
+        )
+
     class Meta:
         verbose_name = 'Dashboard text'
         verbose_name_plural = 'Dashboard text'
@@ -9,21 +9,19 @@ from django.conf import settings
 
 import django.contrib.auth as auth
 
-from gl_site.models import LeadUserInfo
-
 def is_authorized(request):
     """
     Return whether or not the user has access to our app (gl_site).
 
     In addition to being authenticated normally, the user must have
     an associated LeadUserInfo. LeadUserInfo is not required to login
-    to the admin site.
+    to the admin site. The LeadUserInfo is loaded with the user by
+    gl_site.middleware.UserContextMiddleware, so this makes no queries.
     """
     if not request.user.is_authenticated:
         return False
 
-    lead_user_info = LeadUserInfo.objects.filter(user=request.user)
-    if not lead_user_info.exists():
+    if not hasattr(request.user, 'leaduserinfo'):
         auth.logout(request)
         return False
 
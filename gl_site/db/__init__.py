@@ -0,0 +1,10 @@
+"""
+Database connection layer for gevent workers.
+
+gl_site.db.postgresql is a Django database backend that waits on
+psycopg2 sockets through gevent, so a query blocks only its own
+greenlet, and that shares a bounded pool of connections between the
+greenlets of each worker process. gl_site.db.notify listens for
+Postgres notifications in a background greenlet. gl_site.db.large_objects
+stores files in the database in chunks.
+"""
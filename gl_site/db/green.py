@@ -0,0 +1,47 @@
+"""
+Cooperative waiting for psycopg2 under gevent.
+
+psycopg2 blocks in libpq while it waits for the server, which gevent's
+monkey patching cannot see, so one query stalls every greenlet of the
+worker. With a wait callback installed, psycopg2 instead polls the
+connection and hands the wait to the gevent hub, as psycogreen does.
+"""
+
+import psycopg2
+from psycopg2 import extensions
+
+def is_gevent_patched():
+    """ Whether gevent has monkey patched the socket module, as the
+        gunicorn gevent worker does before loading the application
+    """
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+
+    return monkey.is_module_patched('socket')
+
+def gevent_wait_callback(connection, timeout=None):
+    """ Wait for a psycopg2 connection by yielding to the gevent hub """
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = connection.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(connection.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(connection.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError('Bad result from poll: {!r}'.format(state))
+
+def make_psycopg_green():
+    """ Make psycopg2 cooperative with gevent. Affects every connection
+        of the process opened afterwards.
+    """
+    extensions.set_wait_callback(gevent_wait_callback)
+
+def is_psycopg_green():
+    """ Whether the gevent wait callback is installed """
+    return extensions.get_wait_callback() is gevent_wait_callback
@@ -0,0 +1,79 @@
+"""
+Postgres large objects.
+
+Large objects store files of any size in the database, written and read
+in chunks, so neither the writer nor the reader holds a whole file in
+memory. They are referenced by an oid, which is not a foreign key:
+whoever stores the oid must unlink the object once it is no longer
+needed. The server side functions used here run outside of a transaction
+too, so each chunk commits by itself in autocommit mode.
+"""
+
+from django.db import connections
+
+# Bytes written or read at once
+CHUNK_SIZE = 1024 * 1024
+
+def create(using='default'):
+    """ Create an empty large object and return its oid """
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT lo_create(0)')
+        return cursor.fetchone()[0]
+
+def write(oid, chunks, using='default'):
+    """ Append the byte strings yielded by chunks to the large object,
+        CHUNK_SIZE bytes at a time. Returns the number of bytes written.
+    """
+    offset = 0
+    buffer = bytearray()
+
+    with connections[using].cursor() as cursor:
+        def flush():
+            nonlocal offset
+            cursor.execute('SELECT lo_put(%s, %s, %s)', [oid, offset, bytes(buffer)])
+            offset += len(buffer)
+            buffer.clear()
+
+        for chunk in chunks:
+            buffer += chunk
+            if len(buffer) >= CHUNK_SIZE:
+                flush()
+
+        if buffer:
+            flush()
+
+    return offset
+
+def read(oid, using='default'):
+    """ Yield the contents of the large object CHUNK_SIZE bytes at a time """
+    offset = 0
+
+    while True:
+        with connections[using].cursor() as cursor:
+            cursor.execute('SELECT lo_get(%s, %s, %s)', [oid, offset, CHUNK_SIZE])
+            chunk = bytes(cursor.fetchone()[0])
+
+        if chunk:
+            yield chunk
+        if len(chunk) < CHUNK_SIZE:
+            return
+
+        offset += len(chunk)
+
+def unlink(oids, using='default'):
+    """ Delete the large objects that exist among oids """
+    oids = [oid for oid in oids if oid is not None]
+    if not oids:
+        return
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT lo_unlink(oid) FROM pg_largeobject_metadata WHERE oid = ANY(%s::oid[])',
+            [oids]
+        )
+
+def exists(oid, using='default'):
+    """ Whether the large object exists """
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_largeobject_metadata WHERE oid = %s', [oid])
+        return cursor.fetchone() is not None
@@ -0,0 +1,114 @@
+"""
+Postgres LISTEN/NOTIFY.
+
+A Listener keeps its own connection to the database, outside the pool,
+listens on a channel and calls a handler with the payload of every
+notification. It runs in a background greenlet when gevent has monkey
+patched the process, and in a daemon thread otherwise. If the connection
+is lost it reconnects, calling on_connect again, since notifications sent
+in the meantime are lost.
+"""
+
+import logging
+import select
+import threading
+
+import psycopg2
+from psycopg2 import extensions
+
+from django.db import connections
+
+from gl_site.db import green
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of whether the listener was stopped
+POLL_TIMEOUT = 1
+
+# Seconds before reconnecting, doubled after every failed attempt
+RECONNECT_DELAY = 1
+MAX_RECONNECT_DELAY = 60
+
+def notify(channel, payload, using='default'):
+    """ Send a notification, which Postgres delivers once the current
+        transaction of the connection commits
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [channel, payload])
+
+class Listener:
+    """ Calls handler(payload) for each notification on channel """
+
+    def __init__(self, channel, handler, on_connect=None, using='default'):
+        self.channel = channel
+        self.handler = handler
+        self.on_connect = on_connect
+        self.conn_params = connections[using].get_connection_params()
+
+        self.connection = None
+        self.listening = False
+        self.stopped = threading.Event()
+        self.runner = None
+
+    def start(self):
+        """ Start listening in the background """
+        if green.is_gevent_patched():
+            import gevent
+            self.runner = gevent.spawn(self.run)
+        else:
+            self.runner = threading.Thread(target=self.run, name='listen {}'.format(self.channel), daemon=True)
+            self.runner.start()
+
+    def stop(self):
+        """ Stop listening and wait for the background greenlet or thread """
+        self.stopped.set()
+        self.runner.join()
+
+    def connect(self):
+        connection = psycopg2.connect(**self.conn_params)
+        connection.autocommit = True
+
+        with connection.cursor() as cursor:
+            cursor.execute('LISTEN {}'.format(extensions.quote_ident(self.channel, connection)))
+
+        return connection
+
+    def run(self):
+        delay = RECONNECT_DELAY
+
+        while not self.stopped.is_set():
+            try:
+                self.connection = self.connect()
+                self.listening = True
+                delay = RECONNECT_DELAY
+
+                if self.on_connect is not None:
+                    self.on_connect()
+
+                self.listen()
+            except Exception:
+                logger.exception('Listening on %s failed, reconnecting in %s seconds', self.channel, delay)
+            finally:
+                self.listening = False
+                if self.connection is not None:
+                    self.connection.close()
+                    self.connection = None
+
+            if not self.stopped.wait(delay):
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def listen(self):
+        connection = self.connection
+
+        while not self.stopped.is_set():
+            # select is cooperative once gevent has patched it
+            if select.select([connection], [], [], POLL_TIMEOUT) == ([], [], []):
+                continue
+
+            connection.poll()
+            while connection.notifies:
+                notification = connection.notifies.pop(0)
+                try:
+                    self.handler(notification.payload)
+                except Exception:
+                    logger.exception('Handling a notification on %s failed', self.channel)
@@ -0,0 +1,198 @@
+"""
+Bounded pools of database connections, one per database per process.
+
+Every thread or greenlet that uses the database gets its own Django
+connection wrapper. Without a pool each of them opens its own server
+connection, so a burst of requests can exceed the server's connection
+limit. A pool opens at most its size of connections and makes further
+checkouts wait, up to a timeout, for one to be returned.
+
+The pool uses the threading module, which gevent's monkey patching makes
+cooperative, so it works for both threads and greenlets.
+"""
+
+import logging
+import os
+import threading
+import time
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+# Default number of connections per pool
+DEFAULT_SIZE = 10
+
+# Default number of seconds a checkout waits for a connection
+DEFAULT_TIMEOUT = 10
+
+class PoolTimeout(psycopg2.OperationalError):
+    """ No connection was returned to a full pool in time """
+
+class ConnectionPool:
+    """
+    At most size open connections. Idle connections are reused most
+    recently returned first, so the least used ones can be closed by the
+    server's idle timeout without being noticed.
+    """
+
+    def __init__(self, size=DEFAULT_SIZE, timeout=DEFAULT_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self.pid = os.getpid()
+
+        self.idle = []
+        self.in_use = 0
+        self.condition = threading.Condition()
+
+        # Metrics
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def checkout(self, connect):
+        """ Return an idle connection, or a new one from connect() if
+            fewer than size are open. Waits for a connection to be
+            returned otherwise, and raises PoolTimeout after timeout
+            seconds.
+        """
+        start = time.monotonic()
+
+        with self.condition:
+            waited = False
+            while not self.idle and self.in_use >= self.size:
+                remaining = start + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    logger.warning('Database pool exhausted: %s', self.stats())
+                    raise PoolTimeout(
+                        'No database connection became available within {} seconds'.format(self.timeout)
+                    )
+
+                waited = True
+                self.condition.wait(remaining)
+
+            self.in_use += 1
+            connection = self.idle.pop() if self.idle else None
+
+            self.checkouts += 1
+            if waited:
+                elapsed = time.monotonic() - start
+                self.waits += 1
+                self.wait_seconds += elapsed
+                self.max_wait_seconds = max(self.max_wait_seconds, elapsed)
+
+        # Connections closed by the server are replaced
+        if connection is not None and connection.closed:
+            with self.condition:
+                self.discarded += 1
+            connection = None
+
+        if connection is None:
+            try:
+                connection = connect()
+            except BaseException:
+                self.release()
+                raise
+
+            with self.condition:
+                self.created += 1
+
+        return connection
+
+    def checkin(self, connection, discard=False):
+        """ Return a checked out connection. Discarded connections are
+            closed instead of being reused.
+        """
+        if discard or connection.closed:
+            try:
+                connection.close()
+            finally:
+                with self.condition:
+                    self.discarded += 1
+                self.release()
+            return
+
+        with self.condition:
+            self.idle.append(connection)
+            self.in_use -= 1
+            self.condition.notify()
+
+    def release(self):
+        """ Free the place of a checked out connection that was closed """
+        with self.condition:
+            self.in_use -= 1
+            self.condition.notify()
+
+    def close(self):
+        """ Close the idle connections """
+        with self.condition:
+            idle, self.idle = self.idle, []
+            self.discarded += len(idle)
+
+        for connection in idle:
+            connection.close()
+
+    def stats(self):
+        """ Return the state and metrics of the pool as a dict """
+        with self.condition:
+            return {
+                'size': self.size,
+                'in_use': self.in_use,
+                'idle': len(self.idle),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'created': self.created,
+                'discarded': self.discarded,
+                'wait_seconds': self.wait_seconds,
+                'max_wait_seconds': self.max_wait_seconds,
+            }
+
+# Pools of this process, keyed by connection parameters
+pools = {}
+pools_lock = threading.Lock()
+
+# Connections of pools inherited from a parent process. They belong to
+# the parent, so they are kept open rather than closed.
+inherited = []
+
+def pool_key(conn_params):
+    """ Hashable key of a dict of connection parameters """
+    return tuple(sorted((name, str(value)) for name, value in conn_params.items()))
+
+def get_pool(key, size=DEFAULT_SIZE, timeout=DEFAULT_TIMEOUT):
+    """ Return the pool for a pool_key, creating it if needed """
+    with pools_lock:
+        pool = pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            if pool is not None:
+                inherited.extend(pool.idle)
+
+            pool = pools[key] = ConnectionPool(size, timeout)
+
+        return pool
+
+def close_pools(database=None):
+    """ Close the idle connections of every pool, or only of the pools
+        connecting to the named database
+    """
+    with pools_lock:
+        selected = [
+            pool for key, pool in pools.items()
+            if database is None or ('database', database) in key
+        ]
+
+    for pool in selected:
+        pool.close()
+
+def pool_stats():
+    """ Return the stats of every pool of this process, as a dict of
+        database name to stats
+    """
+    with pools_lock:
+        return {dict(key).get('database'): pool.stats() for key, pool in pools.items()}
@@ -0,0 +1,99 @@
+"""
+PostgreSQL backend with pooled connections and gevent support.
+
+Connections are checked out of the pool of the process when Django
+connects and returned when it closes them, which it does at the end of
+each request. A connection is returned only once its transaction is
+rolled back and its session state discarded, so settings, advisory
+locks, prepared statements, cursors and temporary tables do not carry
+over to the next request. Broken connections are closed instead.
+
+Settings, next to the usual keys of the database in DATABASES:
+    POOL_SIZE    - connections per process, gl_site.db.pool.DEFAULT_SIZE
+                   by default
+    POOL_TIMEOUT - seconds a request waits for a connection before
+                   failing with an OperationalError, DEFAULT_TIMEOUT by
+                   default
+
+If gevent has monkey patched the process, psycopg2 is made cooperative
+when the backend is loaded.
+"""
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import DatabaseCreation as BaseDatabaseCreation
+from psycopg2 import extensions
+
+from gl_site.db import green, pool
+
+if green.is_gevent_patched() and not green.is_psycopg_green():
+    green.make_psycopg_green()
+
+class DatabaseCreation(BaseDatabaseCreation):
+    """ Closes the pooled connections to a test database before it is
+        dropped, which would otherwise fail while they are open
+    """
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        pool.close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_pool(self, conn_params):
+        return pool.get_pool(
+            pool.pool_key(conn_params),
+            self.settings_dict.get('POOL_SIZE', pool.DEFAULT_SIZE),
+            self.settings_dict.get('POOL_TIMEOUT', pool.DEFAULT_TIMEOUT)
+        )
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.checkout(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+
+        # Set when the connection is created, see the base backend
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+
+        connection = self.connection
+        with self.wrap_database_errors:
+            self.pool.checkin(connection, discard=not self.reset_connection())
+
+    def reset_connection(self):
+        """ Prepare the connection to be reused by rolling back its
+            transaction and discarding its session state. Returns
+            whether it can be reused.
+        """
+        connection = self.connection
+
+        # Django keeps using a connection closed within an atomic
+        # block until the block exits, so it cannot be shared.
+        if connection.closed or self.in_atomic_block:
+            return False
+
+        try:
+            if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except Exception:
+            return False
+
+        if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+
+        # DISCARD ALL cannot run in a transaction block. Django sets
+        # autocommit again when it connects.
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute('DISCARD ALL')
+        except Exception:
+            return False
+
+        return True
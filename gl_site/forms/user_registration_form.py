@@ -25,7 +25,8 @@ def validate_email_uniqueOrUnchanged(old_email):
             )
     return validate
 
-#The part of the form which deals with the User object
+#The part of the form which deals with the User object.
+#UserCreationForm.save sets the hashed password.
 class UserForm(UserCreationForm):
     class Meta:
         #Use the User object as a model with the desired fields
@@ -46,17 +47,6 @@ class UserForm(UserCreationForm):
             else:
                 field.widget.attrs.update({'class':'form-control'})
 
-    #Override the default save method to set the password correctly
-    def save(self, commit=True):
-        user = super(UserForm, self).save(commit = False)
-        user.set_password(self.cleaned_data['password1'])
-
-        #Save to the db
-        if(commit):
-            user.save()
-
-        return user
-
 class InfoForm(ModelForm):
     """ LeadUserInfo model form """
     class Meta:
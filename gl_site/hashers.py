@@ -0,0 +1,32 @@
+"""
+Password hashing off the gevent hub.
+
+PBKDF2 spends tens of milliseconds of CPU per password without yielding,
+so on a gevent worker a burst of registrations or logins stalls every
+other request of the worker. The hasher here runs it in the hub's pool
+of native threads instead. hashlib releases the GIL while it hashes, so
+the hub keeps serving the other greenlets in the meantime.
+"""
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+from gl_site.db.green import is_gevent_patched
+
+def run_in_thread(function, *args):
+    """ Call function in a native thread of the gevent hub and wait for
+        its result, yielding to other greenlets meanwhile. Calls it
+        directly unless gevent has monkey patched the process.
+    """
+    if not is_gevent_patched():
+        return function(*args)
+
+    import gevent
+    return gevent.get_hub().threadpool.apply(function, args)
+
+class OffloadedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """ Django's default hasher, hashing in a native thread. It keeps the
+        algorithm name, so existing password hashes verify unchanged.
+    """
+
+    def encode(self, password, salt, iterations=None):
+        return run_in_thread(super().encode, password, salt, iterations)
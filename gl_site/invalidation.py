@@ -0,0 +1,211 @@
+"""
+Invalidation of the caches of every worker.
+
+Changes are published on a topic, such as the name of the changed model,
+with Postgres NOTIFY. Each worker runs a listener that hands them to the
+handlers subscribed to the topic, so in-process caches are evicted in
+every gunicorn worker of every dyno shortly after the change commits.
+The signal receivers in gl_site.signals publish changes of the models
+that are cached. Publish a model only once a cache subscribes to it:
+each notification costs a query, and a lock on the whole database while
+the transaction commits.
+
+TwoLevelCache caches values in process memory, optionally in front of a
+cache shared by the workers, named by settings.INVALIDATION_SHARED_CACHE.
+There is no shared level by default: the local memory backend is private
+to each process, so it would only duplicate the first level. Only a
+backend that all workers reach, such as memcached, makes it useful.
+
+Notifications arrive shortly after a change commits, not at once. A
+TwoLevelCache without a version only caches while the process is
+listening, since nothing else would evict its entries, and may serve a
+value changed by another worker until the notification arrives. Values
+that must change with the next request key the cache by a version read
+from the database, as the configuration models do.
+"""
+
+from collections import defaultdict, OrderedDict
+import hashlib
+import logging
+import threading
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from gl_site.db.notify import Listener, notify
+
+logger = logging.getLogger(__name__)
+
+# Channel of the notifications
+CHANNEL = 'gl_site_invalidation'
+
+# Handlers subscribed to each topic
+handlers = defaultdict(list)
+
+# The listener of this process, once started
+listener = None
+
+def subscribe(topic, handler):
+    """ Call handler(key) whenever topic is published. The key is the
+        one published, or None when everything may have changed.
+    """
+    handlers[topic].append(handler)
+
+def dispatch(topic, key=None):
+    """ Call the handlers of topic """
+    for handler in handlers.get(topic, ()):
+        try:
+            handler(key)
+        except Exception:
+            logger.exception('Invalidating %s failed', topic)
+
+def dispatch_all():
+    """ Call the handlers of every topic, as if everything changed """
+    for topic in list(handlers):
+        dispatch(topic)
+
+def handle(payload):
+    """ Dispatch the payload of a notification """
+    topic, separator, key = payload.partition(':')
+    dispatch(topic, key if separator else None)
+
+def publish(topic, key=None):
+    """ Invalidate topic in every process once the current transaction
+        commits. This process is invalidated at once as well, and again
+        on commit, so that it reads its own changes.
+
+        Only the publisher replaces the token of the topic in the shared
+        cache, at once and again on commit, since other workers may store
+        values loaded before the change committed in the meantime.
+    """
+    def invalidate():
+        rotate_token(topic)
+        dispatch(topic, key)
+
+    invalidate()
+    transaction.on_commit(invalidate)
+
+    notify(CHANNEL, topic if key is None else '{}:{}'.format(topic, key))
+
+def start_listener():
+    """ Start listening for invalidations, once per process """
+    global listener
+
+    if (listener is None):
+        listener = Listener(CHANNEL, handle, on_connect=dispatch_all)
+        listener.start()
+
+def is_listening():
+    return listener is not None and listener.listening
+
+def shared_cache():
+    """ The cache shared by the workers, or None if there is none """
+    alias = getattr(settings, 'INVALIDATION_SHARED_CACHE', None)
+    return caches[alias] if alias else None
+
+def token_key(topic):
+    return '{}:token'.format(topic)
+
+def rotate_token(topic):
+    """ Replace the token of topic in the shared cache, so that the
+        values stored under the old one are never read again
+    """
+    shared = shared_cache()
+    if (shared is not None):
+        shared.set(token_key(topic), uuid4().hex, None)
+
+# Marks a value missing from the shared cache
+MISSING = object()
+
+class TwoLevelCache:
+    """
+    Values cached in process memory, up to maxsize of them with the least
+    recently used evicted first, in front of the shared cache if there is
+    one. Publishing topic evicts every value of the cache from both levels.
+
+    The shared cache is keyed by a token that publishing replaces, so a
+    value loaded from the database before a change commits, and stored
+    after it is evicted, is never read.
+
+    version, if given, is called on every get and its result is part of
+    the key, so a value is never read once the version changed. Such a
+    cache also caches while the process is not listening.
+    """
+
+    def __init__(self, topic, maxsize=128, version=None):
+        self.topic = topic
+        self.maxsize = maxsize
+        self.version = version
+
+        self.local = OrderedDict()
+        self.lock = threading.Lock()
+
+        # Incremented by every eviction
+        self.generation = 0
+
+        subscribe(topic, self.evict)
+
+    def get(self, key, load):
+        """ Return the value cached for key, calling load to load it
+            when it is missing
+        """
+        if (self.version is not None):
+            key = (self.version(), key)
+        elif (not is_listening()):
+            return load()
+
+        with self.lock:
+            if (key in self.local):
+                self.local.move_to_end(key)
+                return self.local[key]
+
+            generation = self.generation
+
+        shared = shared_cache()
+        if (shared is None):
+            value = load()
+        else:
+            shared_key = self.shared_key(shared, key)
+
+            value = shared.get(shared_key, MISSING)
+            if (value is MISSING):
+                value = load()
+                shared.set(shared_key, value)
+
+        with self.lock:
+            # Values loaded while an eviction happened may be stale
+            if (generation == self.generation):
+                self.local[key] = value
+                if (len(self.local) > self.maxsize):
+                    self.local.popitem(last=False)
+
+        return value
+
+    def shared_key(self, shared, key):
+        """ The key of the shared cache for key, which may be any value
+            with a stable repr. Hashed, since memcached rejects keys with
+            whitespace or control characters.
+        """
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return '{}:{}:{}'.format(self.topic, self.token(shared), digest)
+
+    def token(self, shared):
+        """ The current token of the shared cache keys """
+        key = token_key(self.topic)
+
+        token = shared.get(key)
+        if (token is None):
+            shared.add(key, uuid4().hex, None)
+            token = shared.get(key)
+
+        return token
+
+    def evict(self, key=None):
+        """ Evict every value from process memory. The publisher has
+            replaced the token of the shared cache.
+        """
+        with self.lock:
+            self.generation += 1
+            self.local.clear()
@@ -5,6 +5,7 @@ from .core_self import CoreSelf
 from .career_commitment import CareerCommitment
 from .ambiguity import Ambiguity
 from .firo_b import FiroB
+from . import via
 from .via import Via
 
 inventory_cls_list = (
@@ -21,3 +22,8 @@ inventory_by_id = dict(zip(range(len(inventory_cls_list)), inventory_cls_list))
 
 for inventory_id, inventory in inventory_by_id.items():
     inventory.inventory_id = inventory_id
+
+# Parses the item banks read from disk, so that the first
+# request served by a worker does not have to.
+def preload_item_banks():
+    via.load_item_bank(Via.questions_per_page)
@@ -4,6 +4,7 @@ questions.
 """
 
 from .shared import Inventory, NumberQuestion
+from .scoring import Scoring, Sum
 from .view_objects import Slider, SliderContainer, SliderMarker
 
 class AmbiguityQuestion(NumberQuestion):
@@ -29,6 +30,14 @@ class Ambiguity(Inventory):
     name = 'Ambiguity'
     template = 'ambiguity.html'
 
+    # Score is the sum of sixteen 1 to 7 answers
+    metric_scale = (16, 112, 8)
+
+    # A single score. Even numbered questions are reverse scored.
+    scoring = Scoring((
+        Sum('score', range(1, 17), reverse=range(2, 17, 2), reverse_from=8),
+    ))
+
     question_text = {
         1: 'An expert who doesn\'t come up with a definite answer probably doesn\'t know much.',
         2: 'I would like to live in a foreign country for a while.',
@@ -58,23 +67,6 @@ class Ambiguity(Inventory):
             text = self.question_text[qid]
             self.questions.append(AmbiguityQuestion(qid, text))
 
-    def compute_metrics(self):
-        """
-        Compute the score for this inventory.
-
-        The inventory defines only a single metric, called "score".
-        Even-numbered questions are reverse-scored.
-        """
-        score = 0
-
-        for qid, answer in self.answers.items():
-            if qid % 2 == 0:
-                score += 8 - int(answer)
-            else:
-                score += int(answer)
-
-        self.metrics = {'score': score}
-
     def review_process_metrics(self, data, metrics):
         """
         Pass score and slider configuration to the review page
@@ -5,6 +5,7 @@ Definition of Big Five inventory.
 # pylint: disable=no-init, no-member
 
 from .shared import Inventory, NumberQuestion
+from .scoring import Mean, Scoring
 from .view_objects import Slider, SliderMarker, SliderContainer
 
 class BigFiveQuestion(NumberQuestion):
@@ -32,6 +33,18 @@ class BigFive(Inventory):
     name = 'Big Five'
     template = 'big_five.html'
 
+    # Metrics are the mean of two 1 to 7 answers
+    metric_scale = (1, 7, 0.5)
+
+    # Each metric is the mean of two questions, one of them reverse scored
+    scoring = Scoring((
+        Mean('extraversion', (1, 6), reverse=(6,), reverse_from=8),
+        Mean('agreeableness', (2, 7), reverse=(2,), reverse_from=8),
+        Mean('conscientiousness', (3, 8), reverse=(8,), reverse_from=8),
+        Mean('emotional_stability', (4, 9), reverse=(4,), reverse_from=8),
+        Mean('openness', (5, 10), reverse=(10,), reverse_from=8),
+    ))
+
     question_text = {
         1: 'Extraverted, enthusiastic.',
         2: 'Critical, quarrelsome.',
@@ -55,44 +68,6 @@ class BigFive(Inventory):
             text = self.question_text[qid]
             self.questions.append(BigFiveQuestion(qid, text))
 
-    def compute_metrics(self):
-        """
-        Compute the five metrics defined by the inventory: extraversion,
-        agreeableness, conscientiousness, emotional_stability, and openness.
-
-        In the comments below, we say which question numbers are associated
-        with each metric. The letter R indicates a reverse-scored question.
-        """
-        def reverse(s):
-            return 8 - int(s)
-
-        self.metrics = {}
-
-        # Extraversion: 1, 6R
-        self.metrics['extraversion'] =\
-            int(self.answers[1]) + reverse(self.answers[6])
-
-        # Agreeableness: 2R, 7
-        self.metrics['agreeableness'] =\
-            reverse(self.answers[2]) + int(self.answers[7])
-
-        # Conscientiousness: 3, 8R
-        self.metrics['conscientiousness'] =\
-            int(self.answers[3]) + reverse(self.answers[8])
-
-        # Emotional Stability: 4R, 9
-        self.metrics['emotional_stability'] =\
-            reverse(self.answers[4]) + int(self.answers[9])
-
-        # Openness to Experiences: 5, 10R
-        self.metrics['openness'] =\
-            int(self.answers[5]) + reverse(self.answers[10])
-
-        # Each metric has two questions
-        # Divide by two to get the average of the two responses
-        for key in self.metrics:
-            self.metrics[key] /= 2
-
     def review_process_metrics(self, data, metrics):
         """
         Provide the labels, values, and sliders for the review page.
@@ -5,6 +5,7 @@ committed the user is to their specific major/field
 # pylint: disable=no-init, no-member
 
 from .shared import Inventory, NumberQuestion
+from .scoring import Mean, Scoring
 from .view_objects import Slider, SliderContainer, SliderMarker
 
 class CareerCommitmentQuestion(NumberQuestion):
@@ -29,6 +30,15 @@ class CareerCommitment(Inventory):
     name = 'Career Commitment'
     template = 'career_commitment.html'
 
+    # Metrics are the mean of four 1 to 5 answers
+    metric_scale = (1, 5, 0.25)
+
+    # Identity and planning factors. Some items are reverse scored.
+    scoring = Scoring((
+        Mean('identity', (1, 2, 3, 4), reverse=(3,), reverse_from=6),
+        Mean('planning', (5, 6, 7, 8), reverse=(5, 7, 8), reverse_from=6),
+    ))
+
     question_text = {
         1: 'My major/career field is an important part of who I am.',
         2: 'My major/career field has a great deal of personal meaning to me.',
@@ -52,25 +62,6 @@ class CareerCommitment(Inventory):
             text = self.question_text[qid]
             self.questions.append(CareerCommitmentQuestion(qid, text))
 
-    def compute_metrics(self):
-        """
-        Compute the identity and planning metrics. Some items are
-        reverse scored.
-        """
-        def reverse(s):
-            return 6 - int(s)
-
-        self.metrics = {
-            'identity': (int(self.answers[1]) +
-                int(self.answers[2]) +
-                reverse(self.answers[3]) +
-                int(self.answers[4]))/4.,
-            'planning': (reverse(self.answers[5]) +
-                int(self.answers[6]) +
-                reverse(self.answers[7]) +
-                reverse(self.answers[8]))/4.
-        }
-
     def review_process_metrics(self, data, metrics):
         """
         Create sliders for the review page.
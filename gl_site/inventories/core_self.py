@@ -1,6 +1,7 @@
 # pylint: disable=no-init, no-member
 
 from .shared import NumberQuestion, Inventory
+from .scoring import Mean, Scoring
 from .view_objects import Slider, SliderMarker
 
 class CoreSelfQuestion(NumberQuestion):
@@ -18,6 +19,14 @@ class CoreSelf(Inventory):
     name = 'Core Self Evaluation Scale'
     template = 'core_self.html'
 
+    # Score is the mean of twelve 1 to 5 answers
+    metric_scale = (1, 5, 0.25)
+
+    # Even numbered questions are reverse scored
+    scoring = Scoring((
+        Mean('score', range(1, 13), reverse=range(2, 13, 2), reverse_from=6),
+    ))
+
     question_text = {
         1: 'I am confident I get the success I deserve in life.',
         2: 'Sometimes I feel depressed.',
@@ -40,17 +49,6 @@ class CoreSelf(Inventory):
             text = self.question_text[qid]
             self.questions.append(CoreSelfQuestion(qid, text))
 
-    def compute_metrics(self):
-        score = 0
-
-        for qid, value in self.answers.items():
-            if qid % 2 == 0:
-                score += 6 - int(value)
-            else:
-                score += int(value)
-
-        self.metrics = {'score': score / 12.}
-
     def review_process_metrics(self, data, metrics):
         marker = SliderMarker('you', 'You', metrics[0].value)
         data['slider'] = Slider(1, 5, (marker,))
@@ -5,6 +5,7 @@ from collections import OrderedDict
 
 
 from .shared import Inventory, NumberQuestion
+from .scoring import Count, Scoring, Total
 
 class FiroBQuestion(NumberQuestion):
 
@@ -126,6 +127,36 @@ class FiroB(Inventory):
         )
     }
 
+    # Each category counts 9 items, totals combine 2 or 3
+    # categories and the social interaction index combines all 6
+    metric_scales = {
+        'total_expressed': (0, 27, 3),
+        'total_wanted': (0, 27, 3),
+        'total_inclusion': (0, 18, 2),
+        'total_control': (0, 18, 2),
+        'total_affection': (0, 18, 2),
+        'social_interaction_index': (0, 54, 6),
+    }
+    metric_scale = (0, 9, 1)
+
+    # Each category counts the answers within the ranges of its items.
+    # The totals combine the categories of a modifier or of a category,
+    # and the social interaction index combines all of them.
+    scoring = Scoring(
+        [Count(key, items) for key, items in scoring_table.items()] + [
+            Total('social_interaction_index', scoring_table),
+            Total('total_expressed', (
+                'expressed_inclusion', 'expressed_control', 'expressed_affection'
+            )),
+            Total('total_wanted', (
+                'wanted_inclusion', 'wanted_control', 'wanted_affection'
+            )),
+            Total('total_inclusion', ('expressed_inclusion', 'wanted_inclusion')),
+            Total('total_control', ('expressed_control', 'wanted_control')),
+            Total('total_affection', ('expressed_affection', 'wanted_affection')),
+        ]
+    )
+
     def __init__(self):
         self.n_pages = len(self.question_text)
 
@@ -143,42 +174,6 @@ class FiroB(Inventory):
             cls = question_cls_list[current_page]
             self.questions.append(cls(qid, text))
 
-    def compute_metrics(self):
-        self.metrics = {}
-
-        for metric_name, items in self.scoring_table.items():
-            score = 0
-
-            for qid, a, b in items:
-                ans = int(self.answers[qid])
-                if a <= ans and ans <= b:
-                    score += 1
-
-            self.metrics[metric_name] = score
-
-        modifiers = ('expressed', 'wanted')
-        categories = ('inclusion', 'control', 'affection')
-
-        self.metrics['social_interaction_index'] = 0
-
-        for modifier in modifiers:
-            key = 'total_' + modifier
-            self.metrics[key] = 0
-
-            for category in categories:
-                key2 = modifier + '_' + category
-                self.metrics[key] += self.metrics[key2]
-
-            self.metrics['social_interaction_index'] += self.metrics[key]
-
-        for category in categories:
-            key = 'total_' + category
-            self.metrics[key] = 0
-
-            for modifier in modifiers:
-                key2 = modifier + '_' + category
-                self.metrics[key] += self.metrics[key2]
-
     def review_process_metrics(self, data, metrics):
         data_metrics = {}
         for metric in metrics:
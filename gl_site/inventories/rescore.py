@@ -0,0 +1,223 @@
+"""
+Recomputing the stored metrics of completed submissions from their answers.
+
+Used by the rescore management command after a scoring rule changes.
+Submissions are read in batches of consecutive ids, so memory use does not
+depend on the number of answers. Each batch is scored with the inventory's
+Scoring and compared with the stored metrics. Only the differences are
+written, in one transaction per batch.
+"""
+
+from collections import namedtuple
+
+import numpy
+
+# Models
+from gl_site.models import Metric, MetricKey, Session, Submission
+from django.db import transaction
+
+# Inventories
+from gl_site.inventories import inventory_by_id
+
+# Statistics computed from the metrics
+from gl_site.statistics import rollup
+
+# Default number of submissions read, scored and written together
+BATCH_SIZE = 1000
+
+# Changes to the metrics of a batch of submissions
+#   updates - (metric id, value) of each metric with a new value
+#   creates - (submission id, key, value) of each missing metric
+#   deletes - ids of metrics with keys the inventory no longer has
+#   scored  - number of submissions scored
+#   skipped - ids of submissions with unanswered or unknown questions
+Changes = namedtuple('Changes', ('updates', 'creates', 'deletes', 'scored', 'skipped'))
+
+def submissions(inventory_id, organization=None, session=None):
+    """ Completed submissions of an inventory, optionally limited to the
+        users of an organization or session.
+    """
+
+    queryset = Submission.objects.filter(
+        inventory_id=inventory_id,
+        current_page__isnull=True
+    )
+
+    if (organization is not None):
+        queryset = queryset.filter(user__leaduserinfo__organization=organization)
+
+    if (session is not None):
+        queryset = queryset.filter(user__leaduserinfo__session=session)
+
+    return queryset
+
+def rescored_sessions(organization=None, session=None):
+    """ The sessions whose submissions are rescored, or None for all """
+
+    if (session is not None):
+        return [session]
+
+    if (organization is not None):
+        return Session.objects.filter(organization=organization)
+
+    return None
+
+def iter_batches(queryset, batch_size=BATCH_SIZE):
+    """ Yield the answers and metrics of the submissions in a queryset,
+        batch_size submissions at a time, as (submission ids, answers,
+        metrics) tuples. Answers are the packed answers of each
+        submission and metrics (id, submission id, key, value) tuples.
+    """
+
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(
+            id__gt=last_id
+        ).order_by(
+            'id'
+        ).values_list('id', 'packed_answers')[:batch_size])
+
+        if (not rows):
+            return
+
+        submission_ids = [submission_id for submission_id, packed in rows]
+        answers = [bytes(packed) for submission_id, packed in rows]
+
+        metrics = [
+            (metric_id, submission_id, MetricKey.key_for(key_id), value)
+            for metric_id, submission_id, key_id, value in Metric.objects.filter(
+                submission_id__in=submission_ids
+            ).values_list(
+                'id', 'submission_id', 'metric_key', 'value'
+            ).order_by()
+        ]
+
+        yield submission_ids, answers, metrics
+
+        last_id = submission_ids[-1]
+
+def score_batch(inventory_id, submission_ids, answers, metrics):
+    """ Score a batch of submissions of an inventory and compare the
+        scores with their stored metrics. Takes a batch yielded by
+        iter_batches and returns its Changes. Doesn't use the database,
+        so batches may be scored in other processes.
+    """
+
+    scoring = inventory_by_id[inventory_id]().scoring
+
+    # Matrix of the packed answers, with a column per question id
+    # and 0 for unanswered questions
+    width = max([len(packed) for packed in answers] + [max(scoring.question_ids)])
+    packed = numpy.frombuffer(
+        b''.join(submission.ljust(width, b'\0') for submission in answers),
+        dtype=numpy.uint8
+    ).reshape(len(answers), width)
+
+    columns = numpy.array(scoring.question_ids, dtype=numpy.intp) - 1
+    matrix = packed[:, columns].astype(numpy.int64)
+
+    # Every question the inventory scores is answered, and no others
+    answered = numpy.count_nonzero(packed, axis=1)
+    complete = (matrix != 0).all(axis=1) & (answered == len(columns))
+
+    submission_ids = numpy.array(submission_ids, dtype=numpy.int64)
+    scores = scoring.score(matrix[complete])
+
+    stored = {(submission_id, key): (metric_id, value) for metric_id, submission_id, key, value in metrics}
+
+    updates = []
+    creates = []
+    for submission_id, values in zip(submission_ids[complete].tolist(), scores.tolist()):
+        for key, value in zip(scoring.keys, values):
+            metric = stored.pop((submission_id, key), None)
+
+            if (metric is None):
+                creates.append((submission_id, key, value))
+            elif (metric[1] != value):
+                updates.append((metric[0], value))
+
+    # Metrics left over from keys the inventory no longer has. Metrics
+    # of skipped submissions are kept.
+    scored = set(submission_ids[complete].tolist())
+    deletes = [
+        metric_id for (submission_id, key), (metric_id, value) in stored.items()
+        if submission_id in scored
+    ]
+
+    return Changes(
+        updates=updates,
+        creates=creates,
+        deletes=deletes,
+        scored=len(scored),
+        skipped=submission_ids[~complete].tolist()
+    )
+
+def apply_changes(changes):
+    """ Write the Changes of a batch in a single transaction """
+
+    with transaction.atomic():
+        Metric.objects.bulk_update(
+            [Metric(id=metric_id, value=value) for metric_id, value in changes.updates],
+            ['value'],
+            batch_size=BATCH_SIZE
+        )
+
+        Metric.objects.bulk_create(
+            [
+                Metric(submission_id=submission_id, key=key, value=value)
+                for submission_id, key, value in changes.creates
+            ],
+            batch_size=BATCH_SIZE
+        )
+
+        Metric.objects.filter(id__in=changes.deletes).delete()
+
+def rescore(inventory_ids, organization=None, session=None, batch_size=BATCH_SIZE,
+        dry_run=False, map_batches=None, callback=None):
+    """ Rescore the completed submissions of the given inventories and
+        write the metrics that changed, unless dry_run. Refreshes the
+        statistics rollups of the rescored sessions and the inventories
+        with changed metrics.
+
+        map_batches(function, batches) is called to score the batches and
+        must yield the Changes of each in order. The batches are scored
+        in this process by default. callback(inventory_id, changes) is
+        called for each batch.
+
+        Returns the number of submissions scored and metrics updated,
+        created and deleted, and the ids of the skipped submissions, as a
+        dict with the same keys as Changes.
+    """
+
+    if (map_batches is None):
+        map_batches = lambda function, batches: (function(*batch) for batch in batches)
+
+    totals = {'updates': 0, 'creates': 0, 'deletes': 0, 'scored': 0, 'skipped': []}
+    changed = set()
+
+    for inventory_id in inventory_ids:
+        queryset = submissions(inventory_id, organization, session)
+        batches = (
+            (inventory_id,) + batch for batch in iter_batches(queryset, batch_size)
+        )
+
+        for changes in map_batches(score_batch, batches):
+            if (not dry_run):
+                apply_changes(changes)
+
+            if (callback is not None):
+                callback(inventory_id, changes)
+
+            totals['updates'] += len(changes.updates)
+            totals['creates'] += len(changes.creates)
+            totals['deletes'] += len(changes.deletes)
+            totals['scored'] += changes.scored
+            totals['skipped'].extend(changes.skipped)
+
+            if (changes.updates or changes.creates or changes.deletes):
+                changed.add(inventory_id)
+
+    if (changed and not dry_run):
+        rollup.refresh(rescored_sessions(organization, session), sorted(changed))
+
+    return totals
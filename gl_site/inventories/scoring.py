@@ -0,0 +1,167 @@
+"""
+Declarative scoring of inventories.
+
+Each inventory describes its metrics with the rules below. A Scoring
+compiles the rules into matrices, so that the metrics of any number of
+submissions are computed at once from a matrix of their answers with
+one row per submission and one column per question.
+"""
+
+import numpy
+
+
+class Sum:
+    """
+    Sum of the answers to items. Reversed items are scored as
+    reverse_from minus the answer.
+    """
+
+    def __init__(self, key, items, reverse=(), reverse_from=None):
+        self.key = key
+        self.items = tuple(items)
+        self.reverse = frozenset(reverse)
+        self.reverse_from = reverse_from
+        self.divisor = 1
+
+
+class Mean(Sum):
+    """
+    Mean of the answers to items, with reversed items scored as for Sum.
+    """
+
+    def __init__(self, key, items, reverse=(), reverse_from=None):
+        super().__init__(key, items, reverse, reverse_from)
+        self.divisor = len(self.items)
+
+
+class Count:
+    """
+    Number of items answered within a range. Ranges are given as
+    (qid, lowest, highest) tuples, both ends included.
+    """
+
+    divisor = 1
+
+    def __init__(self, key, ranges):
+        self.key = key
+        self.ranges = tuple(ranges)
+
+
+class Total:
+    """
+    Sum of other Sum, Mean or Count metrics of the inventory.
+    """
+
+    divisor = 1
+
+    def __init__(self, key, keys):
+        self.key = key
+        self.keys = tuple(keys)
+
+
+class Scoring:
+    """
+    Metrics of an inventory, compiled from a list of rules.
+    """
+
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        self.keys = tuple(rule.key for rule in self.rules)
+
+        question_ids = set()
+        for rule in self.rules:
+            if isinstance(rule, Sum):
+                question_ids.update(rule.items)
+            elif isinstance(rule, Count):
+                question_ids.update(qid for qid, lowest, highest in rule.ranges)
+
+        # Column of each question in the answer matrix
+        self.question_ids = tuple(sorted(question_ids))
+        column = {qid: i for i, qid in enumerate(self.question_ids)}
+
+        n_questions = len(self.question_ids)
+        n_metrics = len(self.rules)
+
+        # Metrics = answers @ weights + constants, plus the number of
+        # answers within their range @ range_weights, plus the totals.
+        self.weights = numpy.zeros((n_questions, n_metrics), dtype=numpy.int64)
+        self.constants = numpy.zeros(n_metrics, dtype=numpy.int64)
+
+        range_columns = []
+        lowest_answers = []
+        highest_answers = []
+        range_metrics = []
+
+        self.total_weights = numpy.zeros((n_metrics, n_metrics), dtype=numpy.int64)
+
+        metric = {key: i for i, key in enumerate(self.keys)}
+
+        for i, rule in enumerate(self.rules):
+            if isinstance(rule, Sum):
+                for qid in rule.items:
+                    if qid in rule.reverse:
+                        self.weights[column[qid], i] -= 1
+                        self.constants[i] += rule.reverse_from
+                    else:
+                        self.weights[column[qid], i] += 1
+            elif isinstance(rule, Count):
+                for qid, lowest, highest in rule.ranges:
+                    range_columns.append(column[qid])
+                    lowest_answers.append(lowest)
+                    highest_answers.append(highest)
+                    range_metrics.append(i)
+            elif isinstance(rule, Total):
+                for key in rule.keys:
+                    if isinstance(self.rules[metric[key]], Total):
+                        raise ValueError('Total {} includes total {}'.format(rule.key, key))
+
+                    self.total_weights[metric[key], i] += 1
+
+        self.range_columns = numpy.array(range_columns, dtype=numpy.intp)
+        self.lowest_answers = numpy.array(lowest_answers, dtype=numpy.int64)
+        self.highest_answers = numpy.array(highest_answers, dtype=numpy.int64)
+
+        self.range_weights = numpy.zeros((len(range_metrics), n_metrics), dtype=numpy.int64)
+        self.range_weights[numpy.arange(len(range_metrics)), range_metrics] = 1
+
+        self.divisors = numpy.array([rule.divisor for rule in self.rules], dtype=numpy.int64)
+
+    def answer_matrix(self, answers):
+        """
+        Matrix of a list of answers, each a dict of question id to the
+        answer as an int or string.
+        """
+        return numpy.array(
+            [[int(submission[qid]) for qid in self.question_ids] for submission in answers],
+            dtype=numpy.int64
+        ).reshape(len(answers), len(self.question_ids))
+
+    def score(self, answers):
+        """
+        Score every row of an answer matrix. Returns a float matrix with
+        one row per submission and one column per metric in keys.
+        """
+        answers = numpy.asarray(answers, dtype=numpy.int64)
+
+        scores = answers @ self.weights + self.constants
+
+        if len(self.range_columns):
+            ranged = answers[:, self.range_columns]
+            in_range = (ranged >= self.lowest_answers) & (ranged <= self.highest_answers)
+            scores += in_range.astype(numpy.int64) @ self.range_weights
+
+        scores += scores @ self.total_weights
+
+        return scores / self.divisors
+
+    def metrics(self, answers):
+        """
+        Metrics of a single submission, as a dict of key to value, from a
+        dict of its answers. Metrics that are not divided are ints.
+        """
+        scores = self.score(self.answer_matrix([answers]))[0].tolist()
+
+        return {
+            rule.key: int(value) if rule.divisor == 1 else value
+            for rule, value in zip(self.rules, scores)
+        }
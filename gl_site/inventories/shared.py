@@ -1,9 +1,16 @@
 # Import forms for Question
 from django import forms
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 
 # Import models for saving inventory results
 # to the database
 import gl_site.models as models
+from django.db import IntegrityError, transaction
+
+# Statistics rollups and cache updated with each completed submission
+from gl_site.statistics import rollup
+from gl_site.statistics import cache as statistics_cache
 
 # Inventory represents an inventory taken by a user.
 # Handles submission of an inventory to save as part
@@ -12,6 +19,16 @@ class Inventory:
     # Class values
     n_pages = 1
 
+    # Scoring of the metrics from the answers, set by subclasses.
+    # See gl_site.inventories.scoring.
+    scoring = None
+
+    # Range of the metric values as (minimum, maximum, bin width),
+    # used to bin metrics for statistics histograms. Set by subclasses,
+    # which may give individual keys their own scale in metric_scales.
+    metric_scale = None
+    metric_scales = {}
+
     # Init Inventory. Set default fields used by
     # sublcasses to remove linter warnings.
     def __init__(self):
@@ -26,67 +43,102 @@ class Inventory:
         self.submission = submission
 
     # Submits the inventory and handles saving
-    # to the database.
+    # to the database. Each page is saved in a single
+    # transaction using a constant number of queries,
+    # however many questions or metrics it has.
     def submit(self, user, form):
-        if self.submission is None:
-            self.submission = models.Submission()
-            self.submission.inventory_id = self.inventory_id
+        created = self.submission is None
+
+        try:
+            self.save_page(user, form)
+        except IntegrityError:
+            if not created:
+                raise
+
+            # A concurrent request, e.g. a double submitted first
+            # page, created the user's submission first. Continue
+            # from that submission, dropping this page.
+            self.submission = models.Submission.objects.filter(
+                user=user, inventory_id=self.inventory_id
+            ).first()
+            if self.submission is None:
+                raise
+
+    # Saves a page of answers, creating the submission
+    # on the first page.
+    def save_page(self, user, form):
+        with transaction.atomic():
+            if self.submission is None:
+                self.submission = models.Submission()
+                self.submission.inventory_id = self.inventory_id
+
+            # Share the user (and its cached LeadUserInfo) rather
+            # than loading the submission's user again.
             self.submission.user = user
 
-        if self.submission.current_page is None:
-            self.submission.current_page = 0
+            if self.submission.current_page is None:
+                self.submission.current_page = 0
 
-        self.submission.current_page += 1
-        if self.submission.current_page == self.n_pages:
-            self.submission.current_page = None
+            self.submission.current_page += 1
+            if self.submission.current_page == self.n_pages:
+                self.submission.current_page = None
 
-        self.submission.save()
-        self.save_answers(form)
+            self.save_answers(form)
+            self.submission.save()
 
-        if self.submission.is_complete():
-            if self.n_pages > 1:
-                self.load_answers()
+            if self.submission.is_complete():
+                if self.n_pages > 1:
+                    self.load_answers()
 
-            self.save_metrics()
+                self.save_metrics()
 
-    # Handles the saving of each individual answer
-    # to the database.
+                # Invalidate the cached statistics of the user's session
+                if hasattr(user, 'leaduserinfo'):
+                    statistics_cache.bump_data_version([user.leaduserinfo.session_id])
+
+    # Adds the answers of a page to the submission, which
+    # stores them when it is saved.
     def save_answers(self, form):
         self.answers = {}
         for key, value in form.cleaned_data.items():
-            answer = models.Answer()
-            answer.submission = self.submission
-            answer.question_id = int(key)
-            answer.content = value
-            answer.save()
-            self.answers[answer.question_id] = answer.content
+            self.answers[int(key)] = int(value)
+
+        self.submission.add_answers(self.answers)
 
     # Computes the metrics for the inventory and then
-    # saves it to the database.
+    # saves them to the database with a single insert.
+    # Also adds the metrics to the statistics rollup
+    # for the user's session.
     def save_metrics(self):
         self.compute_metrics()
+        metrics = []
         for key, value in self.metrics.items():
             metric = models.Metric()
             metric.submission = self.submission
             metric.key = key
             metric.value = value
-            metric.save()
+            metrics.append(metric)
+
+        models.Metric.objects.bulk_create(metrics)
+
+        rollup.record_metrics(self.submission, self.metrics)
 
     # Load the answers corresponding to the submission
     def load_answers(self):
-        self.answers = {}
-        qs = models.Answer.objects.filter(submission=self.submission)
+        self.answers = self.submission.get_answers()
 
-        for answer in qs:
-            self.answers[answer.question_id] = answer.content
+    # Returns the scale of a metric key
+    @classmethod
+    def get_metric_scale(cls, key):
+        return cls.metric_scales.get(key, cls.metric_scale)
 
     # Subclasses may override, but are not required to
     def review_process_metrics(self, data, metrics):
         pass
 
-    # Overridden by subclasses. Used to compute metrics.
+    # Computes the metrics of the submission from its answers
     def compute_metrics(self):
-        pass
+        self.metrics = self.scoring.metrics(self.answers)
 
 # An Inventory question.
 class Question:
@@ -113,14 +165,77 @@ class NumberQuestion(Question):
             label=label,
             choices=choices)
 
-# Form for an inventory that is built out of each of the
-# fields for each of the questions contained within the
-# inventory.
+# Fields of a cached form class. Forms deep copy the fields
+# of their class on creation, which for inventory pages costs
+# more than building them. The fields are never modified
+# while handling a request, so every form of a page shares
+# them instead.
+class SharedFields(dict):
+    def __deepcopy__(self, memo):
+        return dict(self)
+
+# Base class of the inventory forms. The form of each page
+# declares a field for each of the questions on the page.
 class InventoryForm(forms.Form):
-
-    def __init__(self, *args, **kwargs):
-        inventory = kwargs.pop('inventory')
-        super(InventoryForm, self).__init__(*args, **kwargs)
-
-        for question in inventory.questions:
-            self.fields[str(question.question_id)] = question.get_field()
+    pass
+
+# Form classes built by get_form_class, keyed by
+# (inventory id, page).
+form_classes = {}
+
+# Returns the form class for the current page of an inventory.
+# The class is built from the page's questions the first time
+# the page is used and cached for the life of the process, so
+# handling a request only binds the data.
+def get_form_class(inventory):
+    submission = getattr(inventory, 'submission', None)
+    page = submission.current_page if submission is not None else 0
+    key = (inventory.inventory_id, page)
+
+    form_cls = form_classes.get(key)
+    if form_cls is None:
+        fields = {
+            str(question.question_id): question.get_field()
+            for question in inventory.questions
+        }
+        name = '{}Page{}Form'.format(type(inventory).__name__, page)
+        form_cls = type(name, (InventoryForm,), fields)
+        form_cls.base_fields = SharedFields(form_cls.base_fields)
+
+        # Concurrent requests may build the same class, which is harmless
+        form_classes[key] = form_cls
+
+    return form_cls
+
+# Markup of questions rendered by render_questions, keyed by
+# (form class, field name, answer). The answer is None for
+# unbound forms.
+question_markup = {}
+
+# Returns the markup of each question of an inventory form,
+# rendered by take_inventory/question.html. The markup of a
+# question without errors only depends on the checked answer,
+# so it is rendered once for each answer and cached. Questions
+# with errors are rendered every time.
+def render_questions(form):
+    questions = []
+    for field in form:
+        if field.errors:
+            questions.append(render_question(field))
+            continue
+
+        key = (type(form), field.name, field.data if form.is_bound else None)
+
+        markup = question_markup.get(key)
+        if markup is None:
+            markup = render_question(field)
+            question_markup[key] = markup
+
+        questions.append(markup)
+
+    return questions
+
+# Renders the markup of a single question
+def render_question(field):
+    markup = render_to_string('take_inventory/question.html', {'field': field})
+    return mark_safe(markup.strip())
@@ -1,8 +1,11 @@
 import sys
-from collections import OrderedDict
+from collections import namedtuple
+from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
 
 from .shared import *
+from .scoring import Scoring, Sum
 
 
 class ViaQuestion(NumberQuestion):
@@ -19,6 +22,45 @@ class ViaQuestion(NumberQuestion):
 def strength_to_key(s):
     return s.lower().replace(' ', '_')
     
+# Item bank of the VIA inventory, parsed once from via_items.dat
+# and shared by every instance.
+#   pages   - tuple of pages, each a tuple of (qid, text) pairs
+#   scoring - read-only mapping of strength key to a tuple of its qids
+#   names   - read-only mapping of strength key to display name
+#   rules   - Scoring of each strength as the sum of its answers
+ItemBank = namedtuple('ItemBank', ('pages', 'scoring', 'names', 'rules'))
+
+@lru_cache(maxsize=None)
+def load_item_bank(questions_per_page=20):
+    pages = []
+    scoring = {}
+    names = {}
+
+    path = Path(__file__).absolute().parent / 'via_items.dat'
+    with open(path) as infile:
+        for i, line in enumerate(infile):
+            if i % questions_per_page == 0:
+                pages.append([])
+
+            qid_s, text, strength = line.replace('\n', '').split('\t')
+            qid = int(qid_s)
+
+            pages[-1].append((qid, text))
+
+            key = strength_to_key(strength)
+            if key not in scoring:
+                scoring[key] = []
+                names[key] = strength
+
+            scoring[key].append(qid)
+
+    return ItemBank(
+        pages=tuple(tuple(page) for page in pages),
+        scoring=MappingProxyType({key: tuple(qids) for key, qids in scoring.items()}),
+        names=MappingProxyType(names),
+        rules=Scoring(Sum(key, qids) for key, qids in scoring.items())
+    )
+
 class Via(Inventory):
 
     name = 'VIA'
@@ -27,32 +69,23 @@ class Via(Inventory):
     n_signature = 3
 
     def __init__(self):
-        infile = open(Path(__file__).absolute().parent / 'via_items.dat')
-        
-        self.question_text = []
-        self.scoring_dict = {}
-        self.strength_dict = {}
-        
-        i = 0
-        for line in infile:
-            if i % self.questions_per_page == 0:
-                page_questions = OrderedDict()
-                self.question_text.append(page_questions)
-        
-            qid_s, text, strength = line.replace('\n', '').split('\t')
-            qid = int(qid_s)
-            
-            page_questions[qid] = text
-            
-            key = strength_to_key(strength)
-            if key not in self.scoring_dict:
-                self.scoring_dict[key] = set()
-                self.strength_dict[key] = strength
-              
-            self.scoring_dict[key].add(qid)
-            i += 1
-    
-        self.n_pages = len(self.question_text)
+        self.item_bank = load_item_bank(self.questions_per_page)
+        self.n_pages = len(self.item_bank.pages)
+
+    # Strength key -> qids of the strength
+    @property
+    def scoring_dict(self):
+        return self.item_bank.scoring
+
+    # Strength key -> display name
+    @property
+    def strength_dict(self):
+        return self.item_bank.names
+
+    # Scoring of the strengths
+    @property
+    def scoring(self):
+        return self.item_bank.rules
 
     def set_submission(self, submission):
         self.submission = submission
@@ -64,19 +97,9 @@ class Via(Inventory):
             
         self.questions = []
         
-        for qid, text in self.question_text[current_page].items():
+        for qid, text in self.item_bank.pages[current_page]:
             self.questions.append(ViaQuestion(qid, text))           
            
-    def compute_metrics(self):
-        self.metrics = {}
-        
-        for key, qid_set in self.scoring_dict.items():
-            total = 0           
-            for qid in qid_set:
-                total += int(self.answers[qid])
-                
-            self.metrics[key] = total
-            
     def review_process_metrics(self, data, metrics):          
         all_strengths = []
         
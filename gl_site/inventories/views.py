@@ -3,7 +3,7 @@ from gl_site.custom_auth import login_required
 
 from gl_site.inventories import inventory_by_id
 
-from gl_site.inventories.shared import InventoryForm
+from gl_site.inventories.shared import get_form_class, render_questions
 
 import gl_site.models as models
 import gl_site.views
@@ -17,14 +17,9 @@ def validate_inventory_id(inventory_id):
     return inventory_id in inventory_by_id
 
 def get_submission(user, inventory_id):
-    submissions = models.Submission.objects.filter(
+    return models.Submission.objects.filter(
         user=user, inventory_id=inventory_id
-    )
-
-    if len(submissions) != 0:
-        return submissions[0]
-    else:
-        return None
+    ).first()
 
 def submission_is_complete(submission):
     return submission is not None and submission.is_complete()
@@ -40,16 +35,15 @@ def take_inventory(request, inventory_id):
     is_complete = submission_is_complete(submission)
     inventory.set_submission(submission)
 
-    form_cls = InventoryForm
-    form_kwargs = {'inventory': inventory}
+    form_cls = get_form_class(inventory)
 
     if request.method == 'POST':
-        form = form_cls(request.POST, **form_kwargs)
+        form = form_cls(request.POST)
         if form.is_valid():
             inventory.submit(request.user, form)
             is_complete = True
     else:
-        form = form_cls(**form_kwargs)
+        form = form_cls()
 
     if is_complete:
         return redirect('review_inventory', inventory_id=inventory_id)
@@ -59,6 +53,7 @@ def take_inventory(request, inventory_id):
         submission.current_page == inventory.n_pages - 1))
 
     data = {'inventory': inventory, 'form': form,
+        'questions': render_questions(form),
         'is_final_page': is_final_page}
     template = 'take_inventory/{}'.format(inventory.template)
 
@@ -0,0 +1,53 @@
+"""Measure the cost of instantiating each inventory."""
+
+
+# Imports
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from gl_site.inventories import inventory_cls_list, via
+from gl_site.inventories.shared import get_form_class
+
+
+class Command(BaseCommand):
+    """
+    Time creating an inventory, setting up its first page and creating the
+    page's form, which the take_inventory view does on every request. Also
+    times parsing the VIA item bank, which each process does once.
+    """
+
+    help = 'Measure the time taken to instantiate each inventory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--number',
+            type=int,
+            default=1000,
+            help='Number of instantiations to time.'
+        )
+
+    def handle(self, *args, **options):
+        number = options['number']
+
+        def parse():
+            via.load_item_bank.cache_clear()
+            via.load_item_bank(via.Via.questions_per_page)
+
+        self.stdout.write('{:<24} {:>14}'.format('', 'microseconds'))
+
+        seconds = timeit.timeit(parse, number=number)
+        self.stdout.write('{:<24} {:>14.2f}'.format(
+            'VIA item bank parse', seconds / number * 1e6
+        ))
+
+        for inventory_cls in inventory_cls_list:
+            def instantiate():
+                inventory = inventory_cls()
+                inventory.set_submission(None)
+                get_form_class(inventory)()
+
+            seconds = timeit.timeit(instantiate, number=number)
+            self.stdout.write('{:<24} {:>14.2f}'.format(
+                inventory_cls.name, seconds / number * 1e6
+            ))
@@ -0,0 +1,112 @@
+"""Benchmark every stage of the statistics pipeline and report regressions."""
+
+
+# Imports
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gl_site.statistics import benchmark
+
+
+class Command(BaseCommand):
+    """
+    Seed synthetic organizations, sessions and users at each sample size
+    and measure every stage of the statistics pipeline: generating and
+    formatting the data, the load_data view and each download_data format.
+    Reports the median wall time, query count and peak Python allocations
+    of each stage.
+
+    The report can be written as JSON with --output and compared against
+    a report from another commit with --compare. The command fails if any
+    stage regressed by more than --threshold.
+
+    All data created by the benchmark is rolled back afterwards. Don't
+    run this against the production database.
+    """
+
+    help = 'Benchmark the statistics pipeline and write a JSON report'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 100000],
+            help='Sample sizes to benchmark.'
+        )
+        parser.add_argument(
+            '--sessions',
+            type=int,
+            default=10,
+            help='Number of sessions the users are spread across.'
+        )
+        parser.add_argument(
+            '--organizations',
+            type=int,
+            default=2,
+            help='Number of organizations the sessions are spread across.'
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=3,
+            help='Number of timed calls of each stage.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON report to this file.'
+        )
+        parser.add_argument(
+            '--compare',
+            help='Compare against the JSON report in this file.'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help='Allowed relative increase in time and memory when comparing.'
+        )
+
+    def handle(self, *args, **options):
+        # Read the baseline first so a bad path fails before benchmarking
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        self.stdout.write('{:>10} {:<28} {:>10} {:>10} {:>14}'.format(
+            'users', 'stage', 'median', 'queries', 'peak memory'
+        ))
+
+        def write_stats(size, stage, stats):
+            self.stdout.write('{:>10} {:<28} {:>10.3f} {:>10} {:>14}'.format(
+                size, stage, stats['median'], stats['queries'], stats['peak_memory']
+            ))
+
+        report = benchmark.run_suite(
+            options['users'],
+            rounds=options['rounds'],
+            n_sessions=options['sessions'],
+            n_organizations=options['organizations'],
+            callback=write_stats
+        )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+
+        if baseline is not None:
+            regressions = benchmark.compare(baseline, report, options['threshold'])
+
+            for size, stage, measurement, old, new in regressions:
+                self.stdout.write('Regression: {} users, {} {}: {} -> {}'.format(
+                    size, stage, measurement, old, new
+                ))
+
+            if regressions:
+                raise CommandError('{} regressions since {}'.format(
+                    len(regressions), baseline.get('commit')
+                ))
+
+            self.stdout.write('No regressions since {}'.format(baseline.get('commit')))
@@ -0,0 +1,66 @@
+"""Compare the statistics data engines on synthetic samples."""
+
+
+# Imports
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from gl_site.statistics import benchmark
+from gl_site.statistics.data_generation import (
+    DATA_ENGINES, format_file_data, format_graph_data,
+    generate_data_from_sessions
+)
+
+
+class Command(BaseCommand):
+    """
+    Seed samples of increasing size and measure generating and formatting
+    the statistics with each STATISTICS_DATA_ENGINE. Reports wall time,
+    query count and peak Python allocations for the graph data (the
+    load_data view) and the file data (the JSON download).
+
+    All data created by the benchmark is rolled back afterwards. Don't
+    run this against the production database.
+    """
+
+    help = 'Compare time, queries and memory of the statistics data engines'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            nargs='+',
+            default=[10000, 100000],
+            help='Sample sizes to benchmark.'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('{:>10} {:>10} {:>8} {:>10} {:>10} {:>14}'.format(
+            'users', 'engine', 'format', 'seconds', 'queries', 'peak memory'
+        ))
+
+        for n_users in options['users']:
+            # Statistics are generated as a staff user, who sees everything
+            with benchmark.seeded(n_users, n_organizations=1) as (sessions, staff):
+                for engine in DATA_ENGINES:
+                    for format_name, format_function in (
+                        ('graph', format_graph_data),
+                        ('file', format_file_data)
+                    ):
+                        with override_settings(STATISTICS_DATA_ENGINE=engine):
+                            _, result = benchmark.measure(
+                                lambda: format_function(
+                                    generate_data_from_sessions(sessions, staff)
+                                )
+                            )
+
+                        self.stdout.write(
+                            '{:>10} {:>10} {:>8} {:>10.2f} {:>10} {:>14}'.format(
+                                n_users,
+                                engine,
+                                format_name,
+                                result['seconds'],
+                                result['queries'],
+                                result['peak_memory']
+                            )
+                        )
@@ -0,0 +1,49 @@
+"""Rebuild the statistics rollup table from the Metric table."""
+
+
+# Imports
+from django.core.management.base import BaseCommand, CommandError
+
+from gl_site.statistics import rollup
+
+
+class Command(BaseCommand):
+    """
+    Recompute every MetricRollup row from the stored metrics and then
+    verify the rollups against aggregates computed directly from the
+    Metric table.
+
+    Run this after deploying the rollup table for the first time, or
+    whenever metrics are changed without going through the models (e.g.
+    in SQL). Deleting submissions or users and moving users between
+    sessions update the rollup by themselves.
+    """
+
+    help = 'Rebuild the statistics rollup table and verify it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help='Only compare the existing rollups against the metrics.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            n_rows = rollup.rebuild()
+            self.stdout.write('Rebuilt {} rollup rows.'.format(n_rows))
+
+        mismatches = rollup.verify()
+        for session_id, inventory_id, key, field, expected, actual in mismatches:
+            self.stderr.write(
+                'session {} inventory {} {}: {} is {}, expected {}'.format(
+                    session_id, inventory_id, key, field, actual, expected
+                )
+            )
+
+        if mismatches:
+            raise CommandError(
+                '{} rollup values do not match the metrics.'.format(len(mismatches))
+            )
+
+        self.stdout.write('Rollups match the metrics.')
@@ -0,0 +1,145 @@
+"""Recompute the stored metrics of completed submissions from their answers."""
+
+
+# Imports
+import multiprocessing
+import os
+from collections import deque
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from gl_site.inventories import inventory_by_id, rescore
+from gl_site.models import Organization, Session
+
+
+class Command(BaseCommand):
+    """
+    Score every completed submission again with the current scoring rules
+    and update the Metric rows that changed. Run it after changing how an
+    inventory is scored.
+
+    Submissions are read in batches and scored in a pool of worker
+    processes while the main process reads the next batches and writes
+    the changes, one transaction per batch. At most two batches per worker
+    are in memory at once. Afterwards the statistics rollups of the
+    rescored sessions are refreshed for the inventories whose metrics
+    changed.
+
+    Use --dry-run to report the changes without writing them.
+    """
+
+    help = 'Recompute the metrics of completed submissions from their answers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--inventory',
+            type=int,
+            nargs='+',
+            default=sorted(inventory_by_id),
+            help='Ids of the inventories to rescore. Defaults to all of them.'
+        )
+        parser.add_argument(
+            '--organization',
+            type=int,
+            help='Only rescore the submissions of users in this organization.'
+        )
+        parser.add_argument(
+            '--session',
+            type=int,
+            help='Only rescore the submissions of users in this session.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=rescore.BATCH_SIZE,
+            help='Number of submissions scored and written together.'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count(),
+            help='Number of worker processes. 0 scores in this process.'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the changes without writing them.'
+        )
+
+    def handle(self, *args, **options):
+        for inventory_id in options['inventory']:
+            if inventory_id not in inventory_by_id:
+                raise CommandError('Unknown inventory {}'.format(inventory_id))
+
+        organization = None
+        if options['organization'] is not None:
+            try:
+                organization = Organization.objects.get(id=options['organization'])
+            except Organization.DoesNotExist:
+                raise CommandError('Unknown organization {}'.format(options['organization']))
+
+        session = None
+        if options['session'] is not None:
+            try:
+                session = Session.objects.get(id=options['session'])
+            except Session.DoesNotExist:
+                raise CommandError('Unknown session {}'.format(options['session']))
+
+        processes = options['processes']
+
+        pool = None
+        map_batches = None
+        if processes > 0:
+            context = multiprocessing.get_context('spawn')
+            pool = context.Pool(processes, initializer=django.setup)
+
+            def map_batches(function, batches):
+                # Score up to two batches per worker ahead of the writes
+                pending = deque()
+                for batch in batches:
+                    pending.append(pool.apply_async(function, batch))
+
+                    if len(pending) >= 2 * processes:
+                        yield pending.popleft().get()
+
+                while pending:
+                    yield pending.popleft().get()
+
+        def write_changes(inventory_id, changes):
+            self.stdout.write('{}: scored {}, updated {}, created {}, deleted {}'.format(
+                inventory_by_id[inventory_id].name,
+                changes.scored,
+                len(changes.updates),
+                len(changes.creates),
+                len(changes.deletes)
+            ))
+
+        try:
+            totals = rescore.rescore(
+                options['inventory'],
+                organization=organization,
+                session=session,
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run'],
+                map_batches=map_batches,
+                callback=write_changes
+            )
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        if totals['skipped']:
+            self.stderr.write('Skipped {} submissions with missing or unknown answers: {}'.format(
+                len(totals['skipped']),
+                ', '.join(str(submission_id) for submission_id in totals['skipped'][:20])
+            ))
+
+        self.stdout.write('{}Scored {} submissions: {} metrics updated, {} created, {} deleted.'.format(
+            'Dry run. ' if options['dry_run'] else '',
+            totals['scored'],
+            totals['updates'],
+            totals['creates'],
+            totals['deletes']
+        ))
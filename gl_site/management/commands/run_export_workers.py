@@ -0,0 +1,106 @@
+"""Generate queued statistics exports in a pool of worker processes."""
+
+
+# Imports
+import multiprocessing
+import os
+import time
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from gl_site.statistics import jobs
+
+
+def run_job(job_id):
+    """Run an export job in a worker process."""
+    # Worker processes are long lived, like web workers between requests
+    close_old_connections()
+    jobs.run(job_id)
+
+
+class Command(BaseCommand):
+    """
+    Claim pending ExportJobs and generate their files in a pool of worker
+    processes. Run it as a separate process type (see the Procfile) and
+    scale it independently of the web workers. Several instances may run
+    at once, since each job is claimed by exactly one of them.
+
+    Worker processes are spawned rather than forked, so they never share
+    the database connection of this process. Running jobs renew a lease;
+    jobs whose lease expired because their worker stopped are requeued.
+    """
+
+    help = 'Generate queued statistics exports in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count(),
+            help='Number of worker processes. 0 runs jobs in this process.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between checks for new jobs.'
+        )
+        parser.add_argument(
+            '--keep-hours',
+            type=float,
+            default=24,
+            help='Delete finished jobs after this many hours.'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once there are no pending or running jobs.'
+        )
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        max_age = timedelta(hours=options['keep_hours'])
+
+        pool = None
+        if processes > 0:
+            context = multiprocessing.get_context('spawn')
+            pool = context.Pool(processes, initializer=django.setup)
+
+        # Results of the jobs submitted to the pool
+        running = []
+
+        try:
+            while True:
+                jobs.delete_expired(max_age)
+
+                # Jobs of workers that stopped, in any instance
+                requeued = jobs.requeue_stale()
+                if requeued:
+                    self.stdout.write('Requeued {} stale export jobs'.format(requeued))
+
+                if pool is None:
+                    claimed = jobs.claim(1)
+                    for job_id in claimed:
+                        jobs.run(job_id)
+                else:
+                    running = [result for result in running if not result.ready()]
+
+                    claimed = jobs.claim(processes - len(running))
+                    for job_id in claimed:
+                        running.append(pool.apply_async(run_job, (job_id,)))
+
+                for job_id in claimed:
+                    self.stdout.write('Started export job {}'.format(job_id))
+
+                if options['once'] and not claimed and not running:
+                    break
+
+                if not claimed:
+                    time.sleep(options['interval'])
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
@@ -0,0 +1,59 @@
+"""
+Middleware that loads the requesting user together with their context.
+
+Replaces django.contrib.auth's AuthenticationMiddleware. The user is
+loaded with their LeadUserInfo, organization and session in a single
+query the first time request.user is used, so login_required and the
+views that read request.user.leaduserinfo make no further queries.
+"""
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser, User
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+# Relations loaded with the user
+USER_CONTEXT = ('leaduserinfo__organization', 'leaduserinfo__session')
+
+def get_user(request):
+    """
+    Return the user logged in to the request's session, as
+    django.contrib.auth.get_user does, with USER_CONTEXT loaded by
+    the same query. Users without a LeadUserInfo have none cached, so
+    checking for one makes no query either.
+    """
+    try:
+        user_id = User._meta.pk.to_python(request.session[auth.SESSION_KEY])
+        backend_path = request.session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+
+    backend = auth.load_backend(backend_path)
+    if not isinstance(backend, ModelBackend):
+        return auth.get_user(request)
+
+    user = User.objects.select_related(*USER_CONTEXT).filter(pk=user_id).first()
+    if user is None or not backend.user_can_authenticate(user):
+        return AnonymousUser()
+
+    # Sessions are invalidated when the password changes
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    if not (session_hash and constant_time_compare(session_hash, user.get_session_auth_hash())):
+        request.session.flush()
+        return AnonymousUser()
+
+    return user
+
+class UserContextMiddleware(AuthenticationMiddleware):
+    """
+    AuthenticationMiddleware that sets request.user lazily with get_user
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
@@ -0,0 +1,66 @@
+# Generated by Django 2.2.28 on 2026-10-18 13:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_rollups(apps, schema_editor):
+    """ Aggregate the existing metrics into the new rollup table """
+    Metric = apps.get_model('gl_site', 'Metric')
+    MetricRollup = apps.get_model('gl_site', 'MetricRollup')
+
+    aggregates = Metric.objects.filter(
+        submission__user__leaduserinfo__isnull=False
+    ).values(
+        'submission__user__leaduserinfo__session_id',
+        'submission__inventory_id',
+        'key'
+    ).annotate(
+        total_count=models.Count('value'),
+        total_sum=models.Sum('value'),
+        total_sum_of_squares=models.Sum(models.F('value') * models.F('value')),
+        total_min=models.Min('value'),
+        total_max=models.Max('value')
+    ).order_by()
+
+    MetricRollup.objects.bulk_create([
+        MetricRollup(
+            session_id=row['submission__user__leaduserinfo__session_id'],
+            inventory_id=row['submission__inventory_id'],
+            key=row['key'],
+            count=row['total_count'],
+            sum=row['total_sum'],
+            sum_of_squares=row['total_sum_of_squares'],
+            min=row['total_min'],
+            max=row['total_max']
+        )
+        for row in aggregates
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gl_site', '0018_upgradeToDjango2'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inventory_id', models.IntegerField()),
+                ('key', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('sum', models.FloatField(default=0)),
+                ('sum_of_squares', models.FloatField(default=0)),
+                ('min', models.FloatField()),
+                ('max', models.FloatField()),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='gl_site.Session')),
+            ],
+            options={
+                'unique_together': {('session', 'inventory_id', 'key')},
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gl_site', '0019_metricRollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
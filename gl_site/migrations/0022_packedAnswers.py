@@ -0,0 +1,94 @@
+from django.db import migrations, models
+
+# Number of submissions converted per query
+BATCH_SIZE = 1000
+
+# Packing as done by gl_site.models.pack_answers when this migration
+# was written: byte qid - 1 holds the answer to question qid.
+def pack(answers):
+    packed = bytearray(max(answers))
+    for qid, answer in answers.items():
+        packed[qid - 1] = int(answer)
+
+    return bytes(packed)
+
+def unpack(packed):
+    return {qid: answer for qid, answer in enumerate(bytes(packed), 1) if answer}
+
+def pack_answers(apps, schema_editor):
+    """ Pack the Answer rows of each submission into the submission """
+    Answer = apps.get_model('gl_site', 'Answer')
+    Submission = apps.get_model('gl_site', 'Submission')
+
+    def save(batch):
+        Submission.objects.bulk_update(
+            [
+                Submission(id=submission_id, packed_answers=pack(answers))
+                for submission_id, answers in batch.items()
+            ],
+            ['packed_answers']
+        )
+
+    # Rows are streamed in submission order, so each submission's
+    # answers are complete once the next submission starts.
+    batch = {}
+    rows = Answer.objects.order_by(
+        'submission_id', 'question_id'
+    ).values_list(
+        'submission_id', 'question_id', 'content'
+    ).iterator(chunk_size=10 * BATCH_SIZE)
+
+    for submission_id, question_id, content in rows:
+        if submission_id not in batch and len(batch) == BATCH_SIZE:
+            save(batch)
+            batch = {}
+
+        batch.setdefault(submission_id, {})[question_id] = content
+
+    if batch:
+        save(batch)
+
+def unpack_answers(apps, schema_editor):
+    """ Create an Answer row for each answer packed in a submission """
+    Answer = apps.get_model('gl_site', 'Answer')
+    Submission = apps.get_model('gl_site', 'Submission')
+
+    submissions = Submission.objects.exclude(
+        packed_answers=b''
+    ).values_list(
+        'id', 'packed_answers'
+    ).iterator(chunk_size=BATCH_SIZE)
+
+    answers = []
+    for submission_id, packed in submissions:
+        for question_id, content in unpack(packed).items():
+            answers.append(Answer(
+                submission_id=submission_id,
+                question_id=question_id,
+                content=str(content)
+            ))
+
+        if len(answers) >= 100 * BATCH_SIZE:
+            Answer.objects.bulk_create(answers, batch_size=10 * BATCH_SIZE)
+            answers = []
+
+    Answer.objects.bulk_create(answers, batch_size=10 * BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gl_site', '0021_exportJob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='packed_answers',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.RunPython(pack_answers, unpack_answers),
+        migrations.DeleteModel(
+            name='Answer',
+        ),
+    ]
@@ -0,0 +1,121 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+import gl_site.models
+
+# Number of metrics converted per query
+BATCH_SIZE = 10000
+
+# Keys of the inventories when this migration was written. Keys added
+# later are created by MetricKey.id_for the first time they are saved.
+INVENTORY_KEYS = (
+    # Big Five
+    'extraversion', 'agreeableness', 'conscientiousness', 'emotional_stability', 'openness',
+
+    # Core Self, Ambiguity
+    'score',
+
+    # Career Commitment
+    'identity', 'planning',
+
+    # FIRO-B
+    'expressed_inclusion', 'wanted_inclusion', 'expressed_control', 'wanted_control',
+    'expressed_affection', 'wanted_affection', 'social_interaction_index',
+    'total_expressed', 'total_wanted', 'total_inclusion', 'total_control', 'total_affection',
+
+    # VIA
+    'creativity', 'bravery', 'perserverance', 'integrity', 'self_regulation', 'hopefulness',
+    'spirituality', 'social_intelligence', 'kindness', 'love', 'leadership', 'forgiveness',
+    'curiosity', 'love_of_learning', 'fairness', 'prudence', 'appreciation_of_beauty',
+    'gratitude', 'humility', 'humour', 'open_mindedness', 'citizenship', 'vitality',
+    'perspective',
+)
+
+def metric_batches(Metric):
+    """ Yield the (lowest, highest) id range of each batch of metrics """
+    bounds = Metric.objects.aggregate(lowest=models.Min('id'), highest=models.Max('id'))
+    if bounds['lowest'] is None:
+        return
+
+    for lowest in range(bounds['lowest'], bounds['highest'] + 1, BATCH_SIZE):
+        yield lowest, lowest + BATCH_SIZE - 1
+
+def create_keys(apps, schema_editor):
+    """ Create a MetricKey for the key of every inventory and every key
+        already saved
+    """
+    Metric = apps.get_model('gl_site', 'Metric')
+    MetricKey = apps.get_model('gl_site', 'MetricKey')
+
+    keys = list(INVENTORY_KEYS)
+    for key in Metric.objects.values_list('key', flat=True).distinct().order_by('key'):
+        if key not in keys:
+            keys.append(key)
+
+    MetricKey.objects.bulk_create([MetricKey(key=key) for key in keys])
+
+def set_metric_keys(apps, schema_editor):
+    """ Point every metric at the MetricKey of its key, one batch of ids
+        per query
+    """
+    Metric = apps.get_model('gl_site', 'Metric')
+    MetricKey = apps.get_model('gl_site', 'MetricKey')
+
+    key_id = MetricKey.objects.filter(key=OuterRef('key')).values('id')[:1]
+    for lowest, highest in metric_batches(Metric):
+        Metric.objects.filter(
+            id__range=(lowest, highest)
+        ).update(metric_key_id=Subquery(key_id))
+
+def set_keys(apps, schema_editor):
+    """ Copy the key of each metric's MetricKey back into the metric """
+    Metric = apps.get_model('gl_site', 'Metric')
+    MetricKey = apps.get_model('gl_site', 'MetricKey')
+
+    key = MetricKey.objects.filter(id=OuterRef('metric_key_id')).values('key')[:1]
+    for lowest, highest in metric_batches(Metric):
+        Metric.objects.filter(
+            id__range=(lowest, highest)
+        ).update(key=Subquery(key))
+
+
+class Migration(migrations.Migration):
+
+    # Each batch is committed on its own
+    atomic = False
+
+    dependencies = [
+        ('gl_site', '0022_packedAnswers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricKey',
+            fields=[
+                ('id', gl_site.models.SmallAutoField(primary_key=True, serialize=False)),
+                ('key', models.CharField(max_length=50, unique=True)),
+            ],
+        ),
+        migrations.RunPython(create_keys, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='metric',
+            name='metric_key',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='gl_site.MetricKey'),
+        ),
+        # Lets the key column be added back empty when unapplied
+        migrations.AlterField(
+            model_name='metric',
+            name='key',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.RunPython(set_metric_keys, set_keys),
+        migrations.AlterField(
+            model_name='metric',
+            name='metric_key',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='gl_site.MetricKey'),
+        ),
+        migrations.RemoveField(
+            model_name='metric',
+            name='key',
+        ),
+    ]
@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, F, Max, Min, Sum
+
+def remove_duplicates(apps, schema_editor):
+    """ Keep one submission per user and inventory: the completed one if
+        there is one, otherwise the first created. Rebuilds the statistics
+        rollup if the metrics of a deleted submission were counted.
+    """
+    Submission = apps.get_model('gl_site', 'Submission')
+    Metric = apps.get_model('gl_site', 'Metric')
+    rebuild = False
+
+    duplicates = Submission.objects.values(
+        'user_id', 'inventory_id'
+    ).annotate(
+        count=Count('id')
+    ).filter(
+        count__gt=1
+    ).order_by()
+
+    for duplicate in duplicates:
+        submissions = Submission.objects.filter(
+            user_id=duplicate['user_id'],
+            inventory_id=duplicate['inventory_id']
+        ).order_by(
+            F('current_page').asc(nulls_first=True), 'id'
+        )
+
+        deleted = Submission.objects.filter(
+            id__in=[submission.id for submission in submissions[1:]]
+        )
+        rebuild = rebuild or Metric.objects.filter(submission__in=deleted).exists()
+        deleted.delete()
+
+    if rebuild:
+        rebuild_rollups(apps, schema_editor)
+
+    # Check the deferred foreign keys of the deleted rows now, since
+    # Postgres won't alter a table with pending trigger events
+    schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+def rebuild_rollups(apps, schema_editor):
+    """ Replace the rollup rows with aggregates of the remaining metrics
+        and invalidate the cached statistics of every session
+    """
+    Metric = apps.get_model('gl_site', 'Metric')
+    MetricRollup = apps.get_model('gl_site', 'MetricRollup')
+    Session = apps.get_model('gl_site', 'Session')
+
+    # Keep submissions from updating the rows being replaced
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('LOCK TABLE {} IN EXCLUSIVE MODE'.format(MetricRollup._meta.db_table))
+
+    aggregates = Metric.objects.filter(
+        submission__user__leaduserinfo__isnull=False
+    ).values(
+        'submission__user__leaduserinfo__session_id',
+        'submission__inventory_id',
+        'metric_key__key'
+    ).annotate(
+        total_count=Count('value'),
+        total_sum=Sum('value'),
+        total_sum_of_squares=Sum(F('value') * F('value')),
+        total_min=Min('value'),
+        total_max=Max('value')
+    ).order_by()
+
+    MetricRollup.objects.all().delete()
+    MetricRollup.objects.bulk_create([
+        MetricRollup(
+            session_id=row['submission__user__leaduserinfo__session_id'],
+            inventory_id=row['submission__inventory_id'],
+            key=row['metric_key__key'],
+            count=row['total_count'],
+            sum=row['total_sum'],
+            sum_of_squares=row['total_sum_of_squares'],
+            min=row['total_min'],
+            max=row['total_max']
+        )
+        for row in aggregates.iterator()
+    ], batch_size=1000)
+
+    Session.objects.update(data_version=F('data_version') + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gl_site', '0023_metricKeys'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='submission',
+            unique_together={('user', 'inventory_id')},
+        ),
+    ]
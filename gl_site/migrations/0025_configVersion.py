@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+def create_config_version(apps, schema_editor):
+    ConfigVersion = apps.get_model('gl_site', 'ConfigVersion')
+    ConfigVersion.objects.create()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gl_site', '0024_uniqueSubmissions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfigVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_config_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gl_site', '0026_exportJobLease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='content_oid',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        # Move the files of existing jobs to large objects
+        migrations.RunSQL(
+            'UPDATE gl_site_exportjob SET content_oid = lo_from_bytea(0, content) '
+            'WHERE content IS NOT NULL',
+            [
+                'UPDATE gl_site_exportjob SET content = lo_get(content_oid::oid) '
+                'WHERE content_oid IS NOT NULL',
+                'SELECT lo_unlink(content_oid::oid) FROM gl_site_exportjob '
+                'WHERE content_oid IS NOT NULL',
+            ],
+        ),
+        migrations.RemoveField(
+            model_name='exportjob',
+            name='content',
+        ),
+    ]
@@ -57,6 +57,10 @@ class Session(models.Model):
     # Used for generating session registration urls.
     uuid = models.CharField(max_length=32, unique = True)
 
+    # Incremented whenever the statistics of the session change.
+    # Used to invalidate cached statistics.
+    data_version = models.PositiveIntegerField(default=0)
+
     def save(self, *args, **kwargs):
         """
         Override the default save to set uuid. There's no chance of a uuid
@@ -151,20 +155,206 @@ class LeadUserInfo(models.Model):
     # Foreign key linking to a session
     session = models.ForeignKey(Session, models.PROTECT)
 
+def pack_answers(answers):
+    """ Pack a dict of question id to answer into bytes. Byte qid - 1
+        holds the answer to question qid, and 0 marks a question that
+        was not answered. Answers must be integers from 1 to 255.
+    """
+
+    packed = bytearray(max(answers, default=0))
+    for qid, answer in answers.items():
+        answer = int(answer)
+        if not 1 <= answer <= 255:
+            raise ValueError('Answer {} to question {} cannot be packed'.format(answer, qid))
+
+        packed[qid - 1] = answer
+
+    return bytes(packed)
+
+def unpack_answers(packed):
+    """ Return the dict of question id to answer packed by pack_answers """
+    return {qid: answer for qid, answer in enumerate(bytes(packed), 1) if answer}
+
 class Submission(models.Model):
+
+    class Meta:
+        # Users have one submission per inventory
+        unique_together = ('user', 'inventory_id')
+
     user = models.ForeignKey(User, models.CASCADE)
     inventory_id = models.IntegerField()
     current_page = models.IntegerField(default=None, null=True)
 
+    # Answers saved so far, packed by pack_answers
+    packed_answers = models.BinaryField(default=b'')
+
     def is_complete(self):
         return self.current_page is None
 
-class Answer(models.Model):
-    submission = models.ForeignKey(Submission, models.CASCADE)
-    question_id = models.IntegerField()
-    content = models.CharField(max_length=1000)
+    # Returns the answers saved so far as a dict
+    # of question id to answer
+    def get_answers(self):
+        return unpack_answers(self.packed_answers)
+
+    # Adds answers to the ones saved so far. They
+    # are stored by the next save of the submission.
+    def add_answers(self, answers):
+        merged = self.get_answers()
+        merged.update(answers)
+        self.packed_answers = pack_answers(merged)
+
+class SmallAutoField(models.AutoField):
+    """ AutoField stored as a smallint, so that the columns
+        referencing it are smallints as well.
+    """
+
+    def db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return 'smallserial'
+        return super().db_type(connection)
+
+    def rel_db_type(self, connection):
+        return models.SmallIntegerField().db_type(connection=connection)
+
+# Metric key of each MetricKey id and the reverse, filled on first use.
+# Keys are never renamed or deleted, so the caches never go stale.
+_metric_keys = {}
+_metric_key_ids = {}
+
+class MetricKey(models.Model):
+    """ Lookup table of metric keys, so that each Metric stores a
+        smallint instead of repeating its key. Rows are created for the
+        keys of every inventory by migrations and for any other key the
+        first time it is saved.
+    """
+
+    id = SmallAutoField(primary_key=True)
+    key = models.CharField(max_length=50, unique=True)
+
+    def __str__(self):
+        return self.key
+
+    @classmethod
+    def load(cls):
+        """ Load every key into the caches """
+        for key_id, key in cls.objects.values_list('id', 'key'):
+            _metric_keys[key_id] = key
+            _metric_key_ids[key] = key_id
+
+    @classmethod
+    def id_for(cls, key):
+        """ Return the id of a key, creating its row if it is new """
+        if key not in _metric_key_ids:
+            cls.load()
+
+        if key not in _metric_key_ids:
+            metric_key, created = cls.objects.get_or_create(key=key)
+            _metric_keys[metric_key.id] = key
+            _metric_key_ids[key] = metric_key.id
+
+        return _metric_key_ids[key]
+
+    @classmethod
+    def key_for(cls, key_id):
+        """ Return the key of an id """
+        if key_id not in _metric_keys:
+            cls.load()
+
+        return _metric_keys[key_id]
 
 class Metric(models.Model):
     submission = models.ForeignKey(Submission, models.CASCADE)
-    key = models.CharField(max_length=50)
+    metric_key = models.ForeignKey(MetricKey, models.PROTECT)
     value = models.FloatField()
+
+    # The key is read and written through the cached MetricKey ids,
+    # so Metric(key='score') and metric.key use no extra queries.
+    @property
+    def key(self):
+        return MetricKey.key_for(self.metric_key_id)
+
+    @key.setter
+    def key(self, key):
+        self.metric_key_id = MetricKey.id_for(key)
+
+class MetricRollup(models.Model):
+    """ Running aggregates of the metrics submitted within a session.
+        One row is kept per session, inventory and metric key so that
+        statistics can be computed without scanning every Metric.
+        Updated by Inventory.save_metrics, recomputed for the affected
+        sessions by the receivers in gl_site.signals when metrics leave a
+        session, and rebuilt from scratch by the
+        rebuild_statistics_rollup management command.
+    """
+
+    class Meta:
+        unique_together = ('session', 'inventory_id', 'key')
+
+    # Session the submitting users belong to
+    session = models.ForeignKey(Session, models.CASCADE)
+
+    # Inventory and metric key being aggregated
+    inventory_id = models.IntegerField()
+    key = models.CharField(max_length=50)
+
+    # Number of values, their sum and the sum of their squares.
+    # Sessions combine by adding these fields together.
+    count = models.IntegerField(default=0)
+    sum = models.FloatField(default=0)
+    sum_of_squares = models.FloatField(default=0)
+
+    # Extremes of the values
+    min = models.FloatField()
+    max = models.FloatField()
+
+class ExportJob(models.Model):
+    """ A statistics download that is generated in the background by
+        the run_export_workers management command. The file is stored
+        in a Postgres large object until the job expires, and deleted
+        along with the job.
+    """
+
+    # Job states
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETE = 'complete'
+    FAILED = 'failed'
+    status_choices = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (COMPLETE, 'Complete'),
+        (FAILED, 'Failed'),
+    )
+
+    # User requesting the download and their selection. No organization
+    # or session means all data available to the user.
+    user = models.ForeignKey(User, models.CASCADE)
+    organization = models.ForeignKey(Organization, models.CASCADE, null=True, blank=True)
+    session = models.ForeignKey(Session, models.CASCADE, null=True, blank=True)
+    file_type = models.CharField(max_length=50)
+
+    status = models.CharField(max_length=10, choices=status_choices, default=PENDING)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    # Lease of the worker running the job, renewed by its heartbeat,
+    # and the number of times the job was claimed
+    heartbeat = models.DateTimeField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+
+    # Progress in users written out of the users in the sample
+    processed = models.IntegerField(default=0)
+    total = models.IntegerField(null=True, blank=True)
+
+    # Oid of the large object holding the file, or the reason the job
+    # failed. Oids are unsigned 32 bit integers.
+    content_oid = models.BigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    def progress(self):
+        """ Percentage of the users written so far """
+        if self.status == self.COMPLETE:
+            return 100
+        if not self.total:
+            return 0
+        return min(100, int(100 * self.processed / self.total))
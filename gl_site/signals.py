@@ -0,0 +1,91 @@
+"""
+Signal receivers publishing changes of the models to gl_site.invalidation,
+bumping the configuration version, keeping the statistics rollup in step
+with the metrics of its sessions, and deleting the files of deleted
+export jobs.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from gl_site.config_models import ConfigVersion, DashboardText, SiteConfig
+from gl_site.db import large_objects
+from gl_site.invalidation import publish
+from gl_site.models import ExportJob, LeadUserInfo, Submission
+from gl_site.statistics import rollup
+
+# Topic published when each model changes. Only models with a cache
+# subscribed to their topic are published, since every notification
+# costs a query and a lock at commit.
+TOPICS = {
+    SiteConfig: 'site_config',
+    DashboardText: 'dashboard_text',
+}
+
+def model_changed(sender, instance, **kwargs):
+    """ Publish saved and deleted instances of the models in TOPICS """
+    publish(TOPICS[sender], instance.pk)
+
+for model in TOPICS:
+    post_save.connect(model_changed, sender=model)
+    post_delete.connect(model_changed, sender=model)
+
+def config_changed(sender, instance, raw=False, **kwargs):
+    """ Every worker reads the new configuration with its next request.
+        Fixtures are loaded raw, possibly by migrations that run before
+        ConfigVersion exists.
+    """
+    if (not raw):
+        ConfigVersion.bump()
+
+for model in (SiteConfig, DashboardText):
+    post_save.connect(config_changed, sender=model)
+    post_delete.connect(config_changed, sender=model)
+
+# The rollup adds the metrics of each completed submission to the session
+# of its user. Metrics leave the session when the submission is deleted,
+# or when the user is deleted or moved to another session, and the
+# affected rollup rows are then recomputed from the remaining metrics.
+# Metric itself has no receivers: Django deletes the metrics of a
+# submission in one query only while it has none.
+
+@receiver(pre_delete, sender=Submission)
+def submission_deleting(sender, instance, **kwargs):
+    """ Remember the session of a completed submission. Its user's
+        LeadUserInfo may be deleted along with it.
+    """
+    if (instance.is_complete()):
+        instance.rollup_session_id = LeadUserInfo.objects.filter(
+            user_id=instance.user_id
+        ).values_list('session_id', flat=True).first()
+
+@receiver(post_delete, sender=Submission)
+def submission_deleted(sender, instance, **kwargs):
+    session_id = getattr(instance, 'rollup_session_id', None)
+    if (session_id is not None):
+        rollup.refresh([session_id], [instance.inventory_id])
+
+@receiver(pre_save, sender=LeadUserInfo)
+def user_info_saving(sender, instance, update_fields=None, **kwargs):
+    """ Remember the session the user belonged to before the save """
+    if (instance.pk is not None and (update_fields is None or 'session' in update_fields)):
+        instance.rollup_session_id = LeadUserInfo.objects.filter(
+            pk=instance.pk
+        ).values_list('session_id', flat=True).first()
+
+@receiver(post_save, sender=LeadUserInfo)
+def user_info_saved(sender, instance, **kwargs):
+    session_id = getattr(instance, 'rollup_session_id', None)
+    if (session_id is not None and session_id != instance.session_id):
+        rollup.refresh([session_id, instance.session_id])
+
+    instance.rollup_session_id = instance.session_id
+
+@receiver(post_delete, sender=LeadUserInfo)
+def user_info_deleted(sender, instance, **kwargs):
+    rollup.refresh([instance.session_id])
+
+@receiver(post_delete, sender=ExportJob)
+def export_job_deleted(sender, instance, **kwargs):
+    """ Large objects aren't deleted with the rows referencing them """
+    large_objects.unlink([instance.content_oid])
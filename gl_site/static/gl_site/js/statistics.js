@@ -23,8 +23,14 @@ $(function() {
     // Users in sample
     var users_in_sample = {};
 
+    // Plot type of each inventory
+    var plot_types = {};
+
     // Store jquery elements in more convenient varialbes
     var $form = $("#statistics_request_form"),
+        $downloadForm = $("#statistics_download_form"),
+        $exportProgress = $("#export-progress"),
+        $exportProgressBar = $exportProgress.children(".progress-bar"),
         $org = $("#id_organization"),
         $session = $("#id_session"),
         $downloads_session = $("#id_downloads_session"),
@@ -46,14 +52,38 @@ $(function() {
         MAX = 1,
         MEAN = 2,
         STANDARD_DEVIATION = 3,
+        PERCENTILES = [4, 5, 6, 7, 8],
+        PERCENTILE_HEADERS = ["P10", "P25", "Median", "P75", "P90"],
         PRECISION = 2,
         ANALYSIS_PRIFIX = "#analysis-",
         MIN_DATA_POINTS_FOR_PLOT = 6,
+        EXPORT_POLL_INTERVAL = 1000,
         DATA_ERROR = "There are not enough data points to render a box plot";
 
-    // Hide the graphs and analysis
+    // Hide the graphs, analysis and export progress
     $graphColumn.hide();
     $analysis.hide();
+    $exportProgress.hide();
+
+    // Append error messages returned by the server to the page
+    function showMessages(messages) {
+        for (var i in messages) {
+            $messageDiv = $("<div></div>").attr(
+                "class",
+                "alert alert-danger alert-dismissable"
+            );
+            $dismiss = $("<button></button>").attr(
+                    "class", "close"
+                ).attr(
+                    "data-dismiss", "alert"
+                ).attr(
+                    "aria-hidden", "true"
+                )
+                .html("&times;");
+            $messageDiv.html(messages[i]).append($dismiss);
+            $messages.append($messageDiv);
+        }
+    }
 
     // If there is more than one organization, remove
     // all options but the empty value from the session select.
@@ -122,7 +152,7 @@ $(function() {
             $analysis.hide();
         }
 
-        if (getPlotType(selected) === BOX) {
+        if (plot_types[selected] === BOX) {
             $('.boxplot-popover').show()
         } else {
             $('.boxplot-popover').hide()
@@ -157,7 +187,10 @@ $(function() {
                 var inventory = data[key].inventory,
                     inventory_name = inventory.replace(/ /g, "-"),
                     inventory_data = data[key].data,
-                    inventory_analysis = data[key].analysis;
+                    inventory_analysis = data[key].analysis,
+                    inventory_histogram = data[key].histogram,
+                    inventory_group_by = data[key].group_by,
+                    inventory_levels = data[key].levels;
 
                 // Set the count of users in sample
                 users_in_sample[inventory_name] = data[key].count;
@@ -176,7 +209,10 @@ $(function() {
                             $("<th>Min</th>"),
                             $("<th>Max</th>"),
                             $("<th>Mean</th>"),
-                            $("<th>Standard Deviation</th>")
+                            $("<th>Standard Deviation</th>"),
+                            PERCENTILE_HEADERS.map(function(header) {
+                                return $("<th>" + header + "</th>");
+                            })
                         )
                     );
 
@@ -199,7 +235,12 @@ $(function() {
                                     "</td>"),
                                 $("<td>" + analysis[STANDARD_DEVIATION]
                                     .value.toFixed(PRECISION) +
-                                    "</td>")
+                                    "</td>"),
+                                PERCENTILES.map(function(index) {
+                                    return $("<td>" + analysis[index]
+                                        .value.toFixed(PRECISION) +
+                                        "</td>");
+                                })
                             )
                         );
                     }
@@ -209,7 +250,11 @@ $(function() {
                     $tables = $tables.add($table);
                 }
 
-                var type = getPlotType(inventory_name)
+                // Histograms are drawn as bar graphs of the bin counts,
+                // groups and levels as bar graphs of their means
+                var type = (inventory_histogram || inventory_group_by || inventory_levels) ?
+                    BAR : getPlotType(inventory_name);
+                plot_types[inventory_name] = type;
 
                 // Append the select option and graph div for the inventory
                 $inventorySelect.append(
@@ -231,8 +276,48 @@ $(function() {
                     .height(graph_height)
                     .width($graphs.width());
 
+                // Color histogram bars by metric
+                if (inventory_histogram) {
+                    graphs[inventory_name].id(["name", "key"])
+                        .color("name")
+                        .tooltip({
+                            "Metric": "name",
+                            "Score": "key"
+                        })
+                        .y({
+                            "label": "Number of people with this score"
+                        });
+                }
+                // Color group means by metric
+                else if (inventory_group_by) {
+                    graphs[inventory_name].id(["name", "key"])
+                        .color("name")
+                        .tooltip({
+                            "Metric": "name",
+                            "Group": "key",
+                            "Number of people": "count",
+                            "Standard deviation": "standard_deviation"
+                        })
+                        .y({
+                            "label": "Mean score"
+                        });
+                }
+                // Overlay the means of each level, colored by level
+                else if (inventory_levels) {
+                    graphs[inventory_name].id(["name", "key"])
+                        .color("name")
+                        .tooltip({
+                            "Level": "name",
+                            "Metric": "key",
+                            "Number of people": "count",
+                            "Standard deviation": "standard_deviation"
+                        })
+                        .y({
+                            "label": "Mean score"
+                        });
+                }
                 // Set the color for bar graphs like VIA
-                if (type == BAR) {
+                else if (type == BAR) {
                     graphs[inventory_name].id(["name", "key"])
                         .color("name")
                         .text({
@@ -265,28 +350,61 @@ $(function() {
             $graphColumn.hide();
             $analysis.hide();
 
-            messages = JSON.parse(xhr.responseText);
-
-            // Process each message
-            for (var i in messages) {
-                // Append the error message to the page
-                $messageDiv = $("<div></div>").attr(
-                    "class",
-                    "alert alert-danger alert-dismissable"
-                );
-                $dismiss = $("<button></button>").attr(
-                        "class", "close"
-                    ).attr(
-                        "data-dismiss", "alert"
-                    ).attr(
-                        "aria-hidden", "true"
-                    )
-                    .html("&times;");
-                $messageDiv.html(messages[i]).append($dismiss);
-                $messages.append($messageDiv);
-            }
+            showMessages(JSON.parse(xhr.responseText));
         });
     });
 
+    // Show the progress of an export job
+    function setExportProgress(progress) {
+        $exportProgressBar
+            .attr("aria-valuenow", progress)
+            .css("width", progress + "%")
+            .text(progress + "%");
+    }
+
+    // Hide the export progress and allow another download
+    function finishExport() {
+        $exportProgress.hide();
+        $downloadForm.find(":submit").prop("disabled", false);
+    }
+
+    // Poll an export job until it finishes, then download the file
+    function pollExport(job) {
+        setExportProgress(job.progress);
+
+        if (job.status === "complete") {
+            finishExport();
+            window.location = job.download_url;
+        } else if (job.status === "failed") {
+            finishExport();
+            showMessages([job.error]);
+        } else {
+            setTimeout(function() {
+                $.getJSON(job.status_url).done(pollExport).fail(function(xhr) {
+                    finishExport();
+                    showMessages(JSON.parse(xhr.responseText));
+                });
+            }, EXPORT_POLL_INTERVAL);
+        }
+    }
+
+    // Downloads are generated in the background. Queue an export job
+    // and show its progress instead of waiting on the download.
+    $downloadForm.submit(function(e) {
+        e.preventDefault();
+
+        $messages.empty();
+        $downloadForm.find(":submit").prop("disabled", true);
+        setExportProgress(0);
+        $exportProgress.show();
+
+        $.post($downloadForm.data("export-url"), $downloadForm.serialize())
+            .done(pollExport)
+            .fail(function(xhr) {
+                finishExport();
+                showMessages(JSON.parse(xhr.responseText));
+            });
+    });
+
     $form.submit()
 });
@@ -0,0 +1,343 @@
+"""
+Helpers for benchmarking the statistics pipeline against synthetic data.
+
+seed() bulk inserts users with completed submissions so that large
+samples can be generated quickly, and measure() records the wall time,
+query count and peak memory of a single call.
+
+seeded() wraps seed() for benchmark commands, rolling the sample back
+afterwards. run_suite() uses it to measure every stage of the statistics
+pipeline at each sample size with a Benchmark, producing a JSON
+serializable report. compare() lists the regressions between two
+reports, so reports saved on different commits can be checked against
+each other.
+"""
+
+# Models
+from gl_site.models import Organization, Session, LeadUserInfo, Submission, Metric
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+# Inventories
+from gl_site.inventories import numeric_inventory_cls_list
+from gl_site.statistics.sample_data import get_answers
+
+# Rollups used by the statistics page
+from gl_site.statistics import rollup
+
+# Statistics pipeline
+from django.core.cache import caches
+from django.test import RequestFactory
+from gl_site.statistics import cache, views
+from gl_site.statistics.data_generation import (
+    format_file_data, format_graph_data, generate_data_from_sessions
+)
+
+# Measurement
+import resource
+import time
+import tracemalloc
+from statistics import mean, median, pstdev
+
+# Report environment
+import django
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+# Utilities
+from contextlib import contextmanager
+from itertools import islice
+from uuid import uuid4
+
+# Number of users inserted per batch
+SEED_BATCH_SIZE = 1000
+
+def seed(n_users, n_sessions=1, inventory_cls_list=numeric_inventory_cls_list,
+    n_organizations=1):
+    """ Create n_organizations organizations with n_sessions sessions
+        spread evenly across them, and n_users users spread evenly across
+        the sessions. Every user completes each inventory in
+        inventory_cls_list with random answers. Returns the sessions.
+    """
+
+    prefix = uuid4().hex[:8]
+
+    # Passwords are left unusable so that no hashing is done
+    admin = User.objects.create(username='benchmark-{}'.format(prefix), password='!')
+    organizations = [
+        Organization.objects.create(
+            name='Benchmark {} {}'.format(prefix, i),
+            code='{}-{}'.format(prefix, i),
+            created_by=admin
+        )
+        for i in range(n_organizations)
+    ]
+    sessions = [
+        Session.objects.create(
+            name='Session {}'.format(i),
+            organization=organizations[i % n_organizations],
+            created_by=admin
+        )
+        for i in range(n_sessions)
+    ]
+
+    # Reuse one instance of each inventory for scoring
+    inventories = {
+        inventory_cls.inventory_id: inventory_cls()
+        for inventory_cls in inventory_cls_list
+    }
+
+    users = iter(range(n_users))
+    while True:
+        batch = list(islice(users, SEED_BATCH_SIZE))
+        if not batch:
+            break
+
+        user_objects = User.objects.bulk_create([
+            User(username='benchmark-{}-{}'.format(prefix, i), password='!')
+            for i in batch
+        ])
+
+        LeadUserInfo.objects.bulk_create([
+            LeadUserInfo(
+                user=user,
+                gender='N',
+                major=LeadUserInfo.OTHER,
+                education='FR',
+                organization=sessions[i % n_sessions].organization,
+                session=sessions[i % n_sessions]
+            )
+            for i, user in zip(batch, user_objects)
+        ])
+
+        submissions = Submission.objects.bulk_create([
+            Submission(user=user, inventory_id=inventory.inventory_id)
+            for user in user_objects
+            for inventory in inventories.values()
+        ])
+
+        metrics = []
+        for submission in submissions:
+            inventory = inventories[submission.inventory_id]
+            inventory.answers = get_answers(type(inventory).__name__)
+            inventory.compute_metrics()
+
+            for key, value in inventory.metrics.items():
+                metrics.append(Metric(submission=submission, key=key, value=value))
+
+        Metric.objects.bulk_create(metrics, batch_size=SEED_BATCH_SIZE * 10)
+
+    rollup.rebuild()
+
+    return sessions
+
+def measure(function, *args, **kwargs):
+    """ Call function and return its result along with a dict containing
+        the wall time in seconds, the number of queries, the peak memory
+        allocated by Python during the call, and the peak resident set
+        size of the process so far (both in bytes).
+    """
+
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            seconds = time.perf_counter() - start
+
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return result, {
+        'seconds': seconds,
+        'queries': len(queries),
+        'peak_memory': peak_memory,
+
+        # ru_maxrss is reported in kilobytes on Linux
+        'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+class Benchmark:
+    """ Callable measuring repeated calls of a function, in the style of
+        the pytest-benchmark fixture. benchmark(function, *args) returns
+        the result of the last call and leaves the measurements in stats.
+
+        Timing rounds run without tracing memory allocations, which
+        slows Python down considerably. Peak memory is measured by one
+        additional traced call.
+    """
+
+    def __init__(self, rounds=3):
+        self.rounds = rounds
+        self.stats = None
+
+    def __call__(self, function, *args, **kwargs):
+        seconds = []
+        for i in range(self.rounds):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                result = function(*args, **kwargs)
+                seconds.append(time.perf_counter() - start)
+
+        result, traced = measure(function, *args, **kwargs)
+
+        self.stats = {
+            'rounds': self.rounds,
+            'min': min(seconds),
+            'max': max(seconds),
+            'mean': mean(seconds),
+            'median': median(seconds),
+            'stddev': pstdev(seconds),
+            'queries': len(queries),
+            'peak_memory': traced['peak_memory'],
+            'max_rss': traced['max_rss'],
+        }
+
+        return result
+
+def consume(response):
+    """ Read the whole body of a response, streamed or not """
+    if (response.streaming):
+        return sum(len(chunk) for chunk in response.streaming_content)
+
+    return len(response.content)
+
+def pipeline_stages(sessions, user):
+    """ Return a list of (name, function) pairs for each stage of the
+        statistics pipeline, applied to the given sessions as user.
+        The format stages reuse the data generated by the first stage,
+        so stages must be run in order.
+    """
+
+    factory = RequestFactory()
+    data = {}
+
+    def get(view, **params):
+        """ Call a view with a GET request by the user """
+        request = factory.get('/', params)
+        request.user = user
+        return consume(view(request))
+
+    def generate():
+        # Load the users here rather than in the first format stage
+        preformatted = generate_data_from_sessions(sessions, user)
+        preformatted['users'] = list(preformatted['users'])
+        data['preformatted'] = preformatted
+
+    def load_data(mode):
+        # Measure generating the response rather than the cache
+        caches[cache.CACHE_ALIAS].clear()
+        return get(views.load_data, mode=mode)
+
+    return [
+        ('generate_data_from_sessions', generate),
+        ('format_graph_data', lambda: format_graph_data(data['preformatted'])),
+        ('format_file_data', lambda: format_file_data(data['preformatted'])),
+        ('load_data', lambda: load_data('points')),
+        ('load_data_bins', lambda: load_data('bins')),
+        ('download_data_xlsx', lambda: get(views.download_data, file_type='application/xlsx')),
+        ('download_data_csv', lambda: get(views.download_data, file_type='text/csv')),
+        ('download_data_json', lambda: get(views.download_data, file_type='application/json')),
+    ]
+
+def environment():
+    """ Describe where a report was produced """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True
+        ).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+    }
+
+@contextmanager
+def seeded(size, n_sessions=10, n_organizations=2):
+    """ Seed a sample of size users along with a staff user who can see
+        all of them, and yield (sessions, staff). Everything is rolled
+        back when the block exits.
+    """
+
+    with transaction.atomic():
+        sessions = seed(size, n_sessions=n_sessions, n_organizations=n_organizations)
+
+        # The statistics views require a LeadUserInfo
+        staff = User.objects.create(
+            username='benchmark-staff-{}'.format(uuid4().hex[:8]),
+            password='!',
+            is_staff=True
+        )
+        LeadUserInfo.objects.create(
+            user=staff,
+            gender='N',
+            major=LeadUserInfo.OTHER,
+            education='FR',
+            organization=sessions[0].organization,
+            session=sessions[0]
+        )
+
+        try:
+            yield sessions, staff
+        finally:
+            transaction.set_rollback(True)
+
+def run_suite(sizes, rounds=3, n_sessions=10, n_organizations=2, callback=None):
+    """ Seed a sample of each size in sizes and benchmark every pipeline
+        stage against it as a staff user. The seeded data is rolled back
+        afterwards. callback, if given, is called with (size, stage,
+        stats) after each stage. Returns the report.
+    """
+
+    report = dict(environment(), rounds=rounds, results={})
+
+    for size in sizes:
+        with seeded(size, n_sessions, n_organizations) as (sessions, staff):
+            results = report['results'][str(size)] = {}
+            for stage, function in pipeline_stages(sessions, staff):
+                benchmark = Benchmark(rounds)
+                benchmark(function)
+                results[stage] = benchmark.stats
+
+                if (callback is not None):
+                    callback(size, stage, benchmark.stats)
+
+    return report
+
+def compare(baseline, report, threshold=0.25):
+    """ Compare a report against a baseline report. Returns a list of
+        (size, stage, measurement, baseline value, new value) tuples for
+        every stage that got more than threshold slower (by median) or
+        used more than threshold more memory, or that made more queries.
+        Sizes and stages missing from either report are skipped.
+    """
+
+    regressions = []
+    for size, results in sorted(report['results'].items(), key=lambda item: int(item[0])):
+        for stage, stats in results.items():
+            old = baseline['results'].get(size, {}).get(stage)
+            if (old is None):
+                continue
+
+            for measurement, allowed in (
+                ('median', old['median'] * (1 + threshold)),
+                ('peak_memory', old['peak_memory'] * (1 + threshold)),
+                ('queries', old['queries']),
+            ):
+                if (stats[measurement] > allowed):
+                    regressions.append(
+                        (int(size), stage, measurement, old[measurement], stats[measurement])
+                    )
+
+    return regressions
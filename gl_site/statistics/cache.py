@@ -0,0 +1,74 @@
+"""
+Cache for the responses of the statistics load_data view.
+
+Responses are stored in the 'statistics' cache, which may be any Django
+cache backend. Each key includes the data_version of every session in the
+sample. Versions are kept in the database, so bumping them invalidates
+cached responses in every worker, whichever backend is configured.
+"""
+
+# Models
+from gl_site.models import Session
+from django.db.models import F
+
+# Caching
+from django.core.cache import caches
+
+# Hashing the session versions
+from hashlib import sha1
+
+# Name of the cache in settings.CACHES
+CACHE_ALIAS = 'statistics'
+
+def cache_key(user, organization, session, display, sessions):
+    """ Return the cache key for a load_data response. The key covers the
+        user's scope, the selection, the staff flag, how the data is
+        displayed (the mode or grouping) and the current data version of
+        every session in the sample.
+    """
+
+    # Non staff users are limited to their own organization
+    if (user.is_staff):
+        scope = 'all'
+    else:
+        scope = user.leaduserinfo.organization_id
+
+    versions = Session.objects.filter(
+        id__in=[s.id for s in sessions]
+    ).order_by('id').values_list('id', 'data_version')
+
+    digest = sha1(repr(list(versions)).encode()).hexdigest()
+
+    return 'load_data:{}:{}:{}:{}:{}:{}'.format(
+        scope,
+        organization.id if organization else '',
+        session.id if session else '',
+        int(user.is_staff),
+        display,
+        digest
+    )
+
+def get_or_generate(key, generate):
+    """ Return the cached value of key, or call generate and cache the
+        value it returns. Exceptions raised by generate are not cached.
+    """
+
+    cache = caches[CACHE_ALIAS]
+
+    value = cache.get(key)
+    if (value is None):
+        value = generate()
+        cache.set(key, value)
+
+    return value
+
+def bump_data_version(sessions):
+    """ Invalidate the cached statistics of the given sessions, which
+        may be Session instances, ids or a queryset.
+    """
+    if (isinstance(sessions, type(Session.objects.none()))):
+        sessions = sessions.values('id')
+    else:
+        sessions = [getattr(s, 'id', s) for s in sessions]
+
+    Session.objects.filter(id__in=sessions).update(data_version=F('data_version') + 1)
@@ -1,8 +1,15 @@
 # Models
-from gl_site.models import Metric, Submission, Organization, Session
-from django.db.models import Count, Min, Max, Avg, StdDev, Prefetch
+from gl_site.models import Metric, MetricKey, Submission, Organization, Session
+from django.db.models import F, Prefetch
 from django.contrib.auth.models import User
 
+# Settings
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Utilities
+from collections import namedtuple
+
 # Inventories
 from gl_site.inventories import inventory_by_id, inventory_cls_list, numeric_inventory_cls_list
 from gl_site.inventories.via import Via
@@ -10,6 +17,9 @@ from gl_site.inventories.via import Via
 # Via categories
 from gl_site.statistics import via_inverse
 
+# Precomputed aggregates
+from gl_site.statistics import percentiles, rollup
+
 # Minimum number of submissions needed to load data
 MINIMUM_SUBMISSIONS = 10
 
@@ -24,7 +34,7 @@ def get_queryset(user):
     if (user.is_staff):
         organizations = Organization.objects.all()
     else:
-        organizations = Organization.objects.filter(id=user.leaduserinfo.organization.id)
+        organizations = Organization.objects.filter(id=user.leaduserinfo.organization_id)
 
     # Load all sessions belonging to the organizations
     sessions = Session.objects.filter(organization__in = organizations)
@@ -65,69 +75,89 @@ def validate_sessions(organization, session, user):
 
     return sessions
 
-def generate_data_from_sessions(sessions, user):
-    """ Generate the data for a set of selected sessions """
-
-    # Returned data set
-    data = {}
-
-    # SELECT COUNT from all submissions in the requested session
-    # for all inventories. GROUP BY inventory_id.
-    # Aggregate by count and annotate results
-    data['submission_counts'] = Submission.objects.filter(
-        user__leaduserinfo__session__in=sessions
-    ).exclude(
-        metric__isnull=True
-    ).values(
-        'inventory_id'
-    ).annotate(
-        count=Count('inventory_id')
-    )
+def get_excludes(submission_counts, user):
+    """ Return the inventory ids the user may not view statistics for.
+        Expects submission_counts as returned by rollup.submission_counts.
+        Raises a LookupError if every inventory is excluded.
+    """
 
     # Process excludes. Inventories with 0 submissions do not show up,
     # but they will be excluded by default as there are no submissions.
     # Admins will see all submissions.
     excludes = []
     if (not user.is_staff):
-        for submission in data['submission_counts']:
+        for submission in submission_counts:
             if (submission['count'] < MINIMUM_SUBMISSIONS):
                 excludes.append(submission['inventory_id'])
 
     # If all inventories are excluded, or the number of excluded inventories
     # is equal to the number of inventories which have counts.
-    if (len(excludes) == len(inventory_cls_list) or len(excludes) == len(data['submission_counts'])):
+    if (len(excludes) == len(inventory_cls_list) or len(excludes) == len(submission_counts)):
         raise LookupError(NO_DATA)
 
+    return excludes
+
+def generate_data_from_sessions(sessions, user):
+    """ Generate the data for a set of selected sessions """
+
+    # Returned data set
+    data = {}
+
+    # Count the completed submissions in the requested sessions
+    # for all inventories. Served from the rollup table, which
+    # combines the per session counts.
+    data['submission_counts'] = rollup.submission_counts(sessions)
+
+    # Inventories without enough submissions for the user to view
+    excludes = get_excludes(data['submission_counts'], user)
+
     # If the user is staff they have access to extra analysis
     if (user.is_staff):
-        # Get all metrics in the provided sessions that are
-        # not in the excludes list or VIA.
-        # GROUP BY key and submission.inventory_id.
-        # Aggregate on Min, Max, Avg (mean), and StdDev.
-        # Annotate selected values with aggregation results.
-        data['metrics_analysis'] = Metric.objects.filter(
-            submission__user__leaduserinfo__session__in=sessions
-        ).exclude(
-            submission__inventory_id=Via.inventory_id
-        ).exclude(
-            submission__inventory_id__in=excludes
-        ).values(
-            'key', 'submission__inventory_id'
-        ).annotate(
-            min=Min('value'),
-            max=Max('value'),
-            mean=Avg('value'),
-            standard_deviation=StdDev('value')
+        # Get the min, max, mean, standard deviation and percentiles
+        # of every metric in the provided sessions that is not in
+        # the excludes list or VIA.
+        data['metrics_analysis'] = metrics_analysis(
+            sessions,
+            excludes + [Via.inventory_id]
         )
 
+    # Load the metrics of every user in the sessions
+    engine = DATA_ENGINES.get(settings.STATISTICS_DATA_ENGINE)
+    if (engine is None):
+        raise ImproperlyConfigured(
+            'Unknown STATISTICS_DATA_ENGINE {!r}.'.format(settings.STATISTICS_DATA_ENGINE)
+        )
+    data['users'] = engine(sessions, excludes)
+
+    return data
+
+def metrics_analysis(sessions, excludes):
+    """ Return the staff analysis of every metric key in the sessions.
+        The min, max, mean and standard deviation are combined from the
+        per session rollups, and the PERCENTILES are added to each row.
+    """
+    analysis = rollup.metrics_analysis(sessions, excludes)
+    metric_percentiles = percentiles.metric_percentiles(sessions, excludes)
+
+    for row in analysis:
+        row.update(metric_percentiles[(row['submission__inventory_id'], row['key'])])
+
+    return analysis
+
+def prefetch_users(sessions, excludes):
+    """ Load users as model instances with prefetched submissions and
+        metrics. Each user is annotated with its organization_name and
+        session_name.
+    """
+
     # Get all users, filtered by users that are in in the
     # selected sessions. Prefetch all submissions by
     # user.submission_set as the reverse many to one foreign
     # key relationship held by Submission. Prefetch all metrics
     # by submission_set.metric_set as the reverse many to one
-    # foreign key relationship held by Metric. Select organization
-    # and session to pre cache values. Order by organization and
-    # then by session
+    # foreign key relationship held by Metric. Annotate organization
+    # and session names to pre cache values. Order by organization
+    # and then by session
     metrics = Prefetch('metric_set',
         to_attr='metrics',
         queryset=Metric.objects.all()
@@ -141,17 +171,97 @@ def generate_data_from_sessions(sessions, user):
             metric__isnull=True
         ).prefetch_related(metrics)
     )
-    data['users'] = User.objects.prefetch_related(
+    return User.objects.prefetch_related(
         submissions
-    ).select_related(
-        'leaduserinfo__organization', 'leaduserinfo__session'
+    ).annotate(
+        organization_name=F('leaduserinfo__organization__name'),
+        session_name=F('leaduserinfo__session__name')
     ).filter(
         leaduserinfo__session__in=sessions
     ).order_by(
         'leaduserinfo__organization', 'leaduserinfo__session'
     )
 
-    return data
+def user_metric_rows(sessions, excludes=()):
+    """ Return the metrics of all users in the sessions as a values_list
+        of (user id, organization name, session name, submission id,
+        inventory id, key id, value) tuples. Rows are ordered by
+        organization, session, user and then submission, so the rows of
+        each user and submission are contiguous.
+    """
+
+    return Metric.objects.filter(
+        submission__user__leaduserinfo__session__in=sessions
+    ).exclude(
+        submission__inventory_id__in=excludes
+    ).order_by(
+        'submission__user__leaduserinfo__organization',
+        'submission__user__leaduserinfo__session',
+        'submission__user',
+        'submission',
+        'id'
+    ).values_list(
+        'submission__user',
+        'submission__user__leaduserinfo__organization__name',
+        'submission__user__leaduserinfo__session__name',
+        'submission',
+        'submission__inventory_id',
+        'metric_key',
+        'value'
+    )
+
+# Light weight records built by flat_users
+FlatUser = namedtuple('FlatUser', ('organization_name', 'session_name', 'submissions'))
+FlatSubmission = namedtuple('FlatSubmission', ('inventory_id', 'metrics'))
+FlatMetric = namedtuple('FlatMetric', ('key', 'value'))
+
+def flat_users(sessions, excludes):
+    """ Load users with a single query over user_metric_rows, pivoting
+        the rows into FlatUser, FlatSubmission and FlatMetric tuples.
+        These have the same attributes that the formatting functions
+        read from the users returned by prefetch_users.
+    """
+
+    users = []
+    user_id = submission_id = None
+
+    for row in user_metric_rows(sessions, excludes):
+        # Rows for the next user have started
+        if (row[0] != user_id):
+            user_id = row[0]
+            user = FlatUser(row[1], row[2], [])
+            users.append(user)
+
+        # Rows for the next submission have started
+        if (row[3] != submission_id):
+            submission_id = row[3]
+            submission = FlatSubmission(row[4], [])
+            user.submissions.append(submission)
+
+        submission.metrics.append(FlatMetric(MetricKey.key_for(row[5]), row[6]))
+
+    return users
+
+# Engines for loading user data, selected by STATISTICS_DATA_ENGINE
+DATA_ENGINES = {
+    'prefetch': prefetch_users,
+    'flat': flat_users,
+}
+
+def format_analysis(analysis):
+    """ Format one row of metrics_analysis as the list of statistics
+        displayed in the analysis table of the statistics page.
+    """
+    key = analysis['key']
+    return [
+        {'metric': key, 'type': 'min', 'value': analysis['min']},
+        {'metric': key, 'type': 'max', 'value': analysis['max']},
+        {'metric': key, 'type': 'mean', 'value': analysis['mean']},
+        {'metric': key, 'type': 'standard_deviation', 'value': analysis['standard_deviation']},
+    ] + [
+        {'metric': key, 'type': name, 'value': analysis[name]}
+        for name, fraction in percentiles.PERCENTILES
+    ]
 
 def format_graph_data(preformatted):
     """ Format data as needed for displaying graphs.
@@ -174,13 +284,7 @@ def format_graph_data(preformatted):
                 data[inventory.name]['analysis'] = {}
 
             # Add the analysis
-            key = analysis['key']
-            data[inventory.name]['analysis'][key] = [
-                {'metric': key, 'type': 'min', 'value': analysis['min']},
-                {'metric': key, 'type': 'max', 'value': analysis['max']},
-                {'metric': key, 'type': 'mean', 'value': analysis['mean']},
-                {'metric': key, 'type': 'standard_deviation', 'value': analysis['standard_deviation']},
-            ]
+            data[inventory.name]['analysis'][analysis['key']] = format_analysis(analysis)
 
     # Format the submission counts
     for inventory in preformatted['submission_counts']:
@@ -276,8 +380,8 @@ def format_file_data(preformatted):
     for user in preformatted['users']:
         if (user.submissions):
             user_data = {
-                'organization': user.leaduserinfo.organization.name,
-                'session': user.leaduserinfo.session.name
+                'organization': user.organization_name,
+                'session': user.session_name
             }
 
             # Process all submissions
@@ -0,0 +1,167 @@
+"""
+Streaming data exports for the statistics download.
+
+Metrics are read from a server side cursor ordered by user, so only one
+user's metrics are held in memory at a time. The rows are written to the
+output file in order, which lets xlsxwriter flush each row to disk as
+soon as it is complete.
+"""
+
+# Models
+from gl_site.models import MetricKey
+
+# Data
+from gl_site.statistics.data_generation import user_metric_rows
+
+# Inventories
+from gl_site.inventories import inventory_by_id
+from gl_site.statistics import inventory_keys
+
+# IO
+import csv
+import json
+import tempfile
+
+# Excel
+import xlsxwriter
+
+# Number of metric rows fetched from the cursor at a time
+CURSOR_CHUNK_SIZE = 2000
+
+# Leading spreadsheet columns, followed by one column per metric
+HEADERS = ('User ID', 'Organization', 'Session')
+
+def iter_users(sessions, excludes=()):
+    """ Yield one (organization, session, metrics) tuple per user in the
+        given sessions who has completed an inventory not in excludes.
+        metrics is a dict of inventory name to a dict of key to value.
+        Users are ordered by organization and then by session.
+    """
+
+    rows = user_metric_rows(
+        sessions, excludes
+    ).iterator(chunk_size=CURSOR_CHUNK_SIZE)
+
+    current_user = None
+    for user_id, organization, session, _, inventory_id, key_id, value in rows:
+        # Rows for the next user have started
+        if (user_id != current_user):
+            if (current_user is not None):
+                yield user
+
+            current_user = user_id
+            user = (organization, session, {})
+
+        inventory_name = inventory_by_id[inventory_id].name
+        user[2].setdefault(inventory_name, {})[MetricKey.key_for(key_id)] = value
+
+    if (current_user is not None):
+        yield user
+
+def metric_columns():
+    """ Return the (inventory name, key) pair for each metric column """
+    return [
+        (inventory['name'], key)
+        for inventory in inventory_keys
+        for key in inventory['keys']
+    ]
+
+def user_row(user_id, organization, session, metrics, columns):
+    """ Return the spreadsheet row for a user: ID, organization, session,
+        then the value of each metric column or None if it is missing.
+    """
+    row = [user_id, organization, session]
+    for inventory_name, key in columns:
+        row.append(metrics.get(inventory_name, {}).get(key))
+
+    return row
+
+def user_data(organization, session, metrics):
+    """ Return the entry of the JSON export built by format_file_data
+        for a user yielded by iter_users
+    """
+    data = {'organization': organization, 'session': session}
+    data.update(metrics)
+    return data
+
+def iter_ndjson(users):
+    """ Yield one line of JSON per user yielded by iter_users. Each line
+        matches an entry of the JSON export built by format_file_data.
+    """
+    for user in users:
+        yield json.dumps(user_data(*user)) + '\n'
+
+def iter_json(users):
+    """ Yield the JSON export built by format_file_data, a list with an
+        entry per user yielded by iter_users, one entry at a time.
+    """
+    separator = '['
+    for user in users:
+        yield separator + json.dumps(user_data(*user))
+        separator = ', '
+
+    yield '[]' if separator == '[' else ']'
+
+class _Echo:
+    """ File-like object that returns what is written to it, allowing
+        csv.writer to produce one line at a time.
+    """
+
+    def write(self, value):
+        return value
+
+def iter_csv(users):
+    """ Yield the lines of a CSV file with the same columns as the Excel
+        export, one line per user yielded by iter_users.
+    """
+    writer = csv.writer(_Echo())
+    columns = metric_columns()
+
+    yield writer.writerow(list(HEADERS) + [
+        '{} - {}'.format(inventory_name, key)
+        for inventory_name, key in columns
+    ])
+
+    for user_id, (organization, session, metrics) in enumerate(users, 1):
+        yield writer.writerow(
+            user_row(user_id, organization, session, metrics, columns)
+        )
+
+def write_xlsx(users):
+    """ Write the users yielded by iter_users to an Excel workbook.
+        Returns an open temporary file positioned at the start of the
+        workbook. The file is deleted when it is closed.
+    """
+
+    output = tempfile.TemporaryFile()
+
+    # In constant memory mode each row is flushed to disk once a
+    # later row is written, so rows must be written in order.
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    worksheet = workbook.add_worksheet()
+
+    # Header row: ID, Organization, Session, then Inventory - Metric
+    columns = metric_columns()
+    worksheet.write_row(0, 0, HEADERS)
+    worksheet.write_row(0, len(HEADERS), [
+        '{} - {}'.format(inventory_name, key)
+        for inventory_name, key in columns
+    ])
+
+    # One row per user. The user ID is the row number. Missing
+    # metrics are None, which leaves the cell empty.
+    for row, (organization, session, metrics) in enumerate(users, 1):
+        worksheet.write_row(
+            row, 0, user_row(row, organization, session, metrics, columns)
+        )
+
+    workbook.close()
+
+    output.seek(0)
+    return output
+
+# Line based export formats: file type -> (line generator, extension)
+STREAMING_EXPORTS = {
+    'text/csv': (iter_csv, '.csv'),
+    'application/x-ndjson': (iter_ndjson, '.ndjson'),
+}
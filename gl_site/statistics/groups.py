@@ -0,0 +1,143 @@
+"""
+Demographic cross tabulation of metrics.
+
+Metrics are grouped by a field of the submitting user's LeadUserInfo, and
+the count, mean and standard deviation of every metric key within each
+group are computed by a single GROUP BY query. Groups with too few
+submissions are suppressed for non staff users, following the same
+MINIMUM_SUBMISSIONS rule as whole inventories.
+"""
+
+from itertools import groupby
+
+# Models
+from gl_site.models import LeadUserInfo, Metric, MetricKey
+from django.db.models import Avg, Count, F, StdDev
+from django.db.models.functions import ExtractYear
+
+# Inventories
+from gl_site.inventories import inventory_by_id
+from gl_site.inventories.via import Via
+
+# Data
+from gl_site.statistics import rollup
+from gl_site.statistics.data_generation import MINIMUM_SUBMISSIONS, NO_DATA, get_excludes
+
+# Label of users who did not give a graduation date
+UNKNOWN = 'Unknown'
+
+# Group field name -> (expression over Metric, labels of the values)
+GROUP_FIELDS = {
+    'gender': (
+        F('submission__user__leaduserinfo__gender'),
+        dict(LeadUserInfo.gender_choices)
+    ),
+    'major': (
+        F('submission__user__leaduserinfo__major'),
+        dict(LeadUserInfo.major_choices)
+    ),
+    'education': (
+        F('submission__user__leaduserinfo__education'),
+        dict(LeadUserInfo.education_choices)
+    ),
+    'graduation_year': (
+        ExtractYear('submission__user__leaduserinfo__graduation_date'),
+        {}
+    ),
+}
+
+def group_label(group_by, value):
+    """ Display label of a group value """
+    if (value is None):
+        return UNKNOWN
+
+    labels = GROUP_FIELDS[group_by][1]
+    return labels.get(value, str(value))
+
+def group_statistics(sessions, group_by, excludes=()):
+    """ Return the count, mean and standard deviation of every metric key
+        within each group of users in the sessions, excluding the
+        inventory ids in excludes. Rows are dicts with group, inventory_id,
+        key, count, mean and standard_deviation, ordered by inventory,
+        group and key.
+    """
+
+    expression = GROUP_FIELDS[group_by][0]
+
+    rows = Metric.objects.filter(
+        submission__user__leaduserinfo__session__in=sessions
+    ).exclude(
+        submission__inventory_id__in=excludes
+    ).annotate(
+        group=expression
+    ).values(
+        'group', 'submission__inventory_id', 'metric_key'
+    ).annotate(
+        count=Count('value'),
+        mean=Avg('value'),
+        standard_deviation=StdDev('value')
+    ).order_by(
+        'submission__inventory_id', 'group', 'metric_key'
+    )
+
+    statistics = []
+    for _, group_rows in groupby(rows, lambda row: (row['submission__inventory_id'], row['group'])):
+        # Rows are grouped on the key id, so order each group's keys by name
+        group_rows = sorted(group_rows, key=lambda row: MetricKey.key_for(row['metric_key']))
+
+        for row in group_rows:
+            statistics.append({
+                'group': row['group'],
+                'inventory_id': row['submission__inventory_id'],
+                'key': MetricKey.key_for(row['metric_key']),
+                'count': row['count'],
+                'mean': row['mean'],
+                'standard_deviation': row['standard_deviation'],
+            })
+
+    return statistics
+
+def generate_grouped_data(sessions, user, group_by):
+    """ Generate the graph data for a set of selected sessions, with
+        metrics summarized per group. Returns a list of inventories in the
+        format of format_graph_data, where the data holds one
+        {'name': key, 'key': group, 'value': mean, 'count': count,
+        'standard_deviation': standard deviation} entry per metric and
+        group, and the inventory is marked with 'group_by': group_by.
+
+        For non staff users, groups with fewer than MINIMUM_SUBMISSIONS
+        submissions of an inventory are left out of that inventory.
+    """
+
+    submission_counts = rollup.submission_counts(sessions)
+    excludes = get_excludes(submission_counts, user)
+
+    data = {}
+    for row in submission_counts:
+        if (row['inventory_id'] not in excludes + [Via.inventory_id]):
+            data[row['inventory_id']] = {
+                'inventory': inventory_by_id[row['inventory_id']].name,
+                'count': row['count'],
+                'group_by': group_by,
+                'data': []
+            }
+
+    for row in group_statistics(sessions, group_by, excludes + [Via.inventory_id]):
+        # Every key of an inventory has the same count within a group
+        if (not user.is_staff and row['count'] < MINIMUM_SUBMISSIONS):
+            continue
+
+        data[row['inventory_id']]['data'].append({
+            'name': row['key'],
+            'key': group_label(group_by, row['group']),
+            'value': row['mean'],
+            'count': row['count'],
+            'standard_deviation': row['standard_deviation'],
+        })
+
+    # Inventories where every group was suppressed
+    data = {inventory_id: inventory for inventory_id, inventory in data.items() if inventory['data']}
+    if (not data):
+        raise LookupError(NO_DATA)
+
+    return sorted(data.values(), key=lambda k: k['inventory'])
@@ -0,0 +1,172 @@
+"""
+Histogram statistics computed in the database.
+
+Instead of returning every metric value, each metric is counted into bins
+derived from its inventory's metric scale, and VIA signature strengths are
+ranked and counted with a window function. The size of the result depends
+only on the number of bins, not on the number of users in the sample.
+"""
+
+# Models
+from gl_site.models import Metric, MetricKey
+from django.db import connection
+from django.db.models import Case, Count, F, FloatField, IntegerField, Value, When, Window
+from django.db.models.functions import Floor, Greatest, Least, RowNumber
+
+# Inventories
+from gl_site.inventories import inventory_by_id, numeric_inventory_cls_list
+from gl_site.inventories.via import Via
+
+# Data
+from gl_site.statistics import rollup, via_inverse
+from gl_site.statistics.data_generation import format_analysis, get_excludes, metrics_analysis
+
+def bin_count(scale):
+    """ Number of bins covering a (minimum, maximum, bin width) scale.
+        The last bin starts at the maximum.
+    """
+    minimum, maximum, width = scale
+    return int(round((maximum - minimum) / width)) + 1
+
+def bin_expression(scale):
+    """ Expression computing the bin index of Metric.value on a scale.
+        Values outside of the scale fall into the first or last bin.
+    """
+    minimum, maximum, width = scale
+    index = Floor(
+        (F('value') - Value(minimum, output_field=FloatField())) /
+        Value(width, output_field=FloatField())
+    )
+
+    return Greatest(
+        Value(0, output_field=FloatField()),
+        Least(Value(bin_count(scale) - 1, output_field=FloatField()), index)
+    )
+
+def metric_bins(sessions, excludes=()):
+    """ Count the metrics of the numeric inventories in each bin.
+        Returns a dict of (inventory id, key) to a list of bin counts.
+    """
+
+    # Choose the scale of each metric. Keys with their own scale
+    # come before the inventory's default scale.
+    whens = []
+    for inventory in numeric_inventory_cls_list:
+        if (inventory.inventory_id in excludes):
+            continue
+
+        for key, scale in inventory.metric_scales.items():
+            whens.append(When(
+                submission__inventory_id=inventory.inventory_id,
+                metric_key=MetricKey.id_for(key),
+                then=bin_expression(scale)
+            ))
+
+        whens.append(When(
+            submission__inventory_id=inventory.inventory_id,
+            then=bin_expression(inventory.metric_scale)
+        ))
+
+    counts = Metric.objects.filter(
+        submission__user__leaduserinfo__session__in=sessions
+    ).exclude(
+        submission__inventory_id__in=list(excludes) + [Via.inventory_id]
+    ).annotate(
+        bin=Case(*whens, output_field=IntegerField())
+    ).values(
+        'submission__inventory_id', 'metric_key', 'bin'
+    ).annotate(
+        count=Count('id')
+    ).order_by()
+
+    bins = {}
+    for row in counts:
+        inventory = inventory_by_id[row['submission__inventory_id']]
+        key = MetricKey.key_for(row['metric_key'])
+        group = (inventory.inventory_id, key)
+
+        if (group not in bins):
+            bins[group] = [0] * bin_count(inventory.get_metric_scale(key))
+
+        bins[group][int(row['bin'])] = row['count']
+
+    return bins
+
+def signature_strength_counts(sessions):
+    """ Count how many users in the sessions have each VIA strength as
+        one of their signature strengths. Returns a dict of key to count.
+    """
+
+    # Rank the strengths of each submission. Ties are broken by
+    # metric id, matching the stable sort used by format_graph_data.
+    ranked = Metric.objects.filter(
+        submission__user__leaduserinfo__session__in=sessions,
+        submission__inventory_id=Via.inventory_id
+    ).annotate(
+        rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('submission')],
+            order_by=[F('value').desc(), F('id').asc()]
+        )
+    ).values('metric_key', 'rank').order_by()
+
+    sql, params = ranked.query.sql_with_params()
+
+    # Window functions cannot be filtered directly, so count the top
+    # ranked strengths in an outer query.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT "metric_key_id", COUNT(*) FROM ({}) ranked '
+            'WHERE "rank" <= %s GROUP BY "metric_key_id"'.format(sql),
+            params + (Via.n_signature,)
+        )
+        return {MetricKey.key_for(key_id): count for key_id, count in cursor.fetchall()}
+
+def generate_histogram_data(sessions, user):
+    """ Generate the graph data for a set of selected sessions, with
+        metrics counted into bins. Returns a list in the same format as
+        format_graph_data, where the data of numeric inventories holds
+        one {'name': key, 'key': bin start, 'value': count} entry per bin
+        and the inventory is marked with 'histogram': True.
+    """
+
+    submission_counts = rollup.submission_counts(sessions)
+    excludes = get_excludes(submission_counts, user)
+
+    data = {}
+    for row in submission_counts:
+        if (row['inventory_id'] not in excludes):
+            data[row['inventory_id']] = {
+                'inventory': inventory_by_id[row['inventory_id']].name,
+                'count': row['count'],
+                'data': []
+            }
+
+    # Numeric inventories
+    for (inventory_id, key), counts in sorted(metric_bins(sessions, excludes).items()):
+        minimum, maximum, width = inventory_by_id[inventory_id].get_metric_scale(key)
+
+        data[inventory_id]['histogram'] = True
+        for i, count in enumerate(counts):
+            data[inventory_id]['data'].append({
+                'name': key,
+                'key': minimum + i * width,
+                'value': count
+            })
+
+    # VIA signature strengths
+    if (Via.inventory_id in data):
+        for strength, num_signature in signature_strength_counts(sessions).items():
+            data[Via.inventory_id]['data'].append({
+                'name': via_inverse[strength], # Via category
+                'key': strength,
+                'value': num_signature
+            })
+
+    # Staff analysis
+    if (user.is_staff):
+        for analysis in metrics_analysis(sessions, excludes + [Via.inventory_id]):
+            inventory = data[analysis['submission__inventory_id']]
+            inventory.setdefault('analysis', []).append(format_analysis(analysis))
+
+    return sorted(data.values(), key=lambda k: k['inventory'])
@@ -0,0 +1,270 @@
+"""
+Statistics exports generated in the background.
+
+The create_export_job view records each download as an ExportJob. The
+run_export_workers management command claims pending jobs and writes their
+files in a pool of worker processes, so CPU bound work like building an
+Excel workbook never blocks the web workers. The statistics page polls the
+job status and downloads the file once it is complete.
+
+Files are written to a Postgres large object in chunks as they are
+generated, and streamed back from it, so no process holds a whole export
+in memory and every dyno can serve the files of every worker.
+
+A claimed job is leased to its worker, which renews the lease with a
+heartbeat while it runs. Jobs whose worker stopped heartbeating, e.g.
+because its process was killed, are returned to the queue and fail after
+MAX_ATTEMPTS. Jobs not finished within JOB_TIMEOUT fail, so the page
+stops polling even if no worker is running.
+"""
+
+# Models
+from gl_site.models import ExportJob, LeadUserInfo
+from gl_site.db import large_objects
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Data
+from gl_site.statistics import export, rollup
+from gl_site.statistics.data_generation import get_excludes, validate_sessions
+
+# Logging
+import logging
+
+# Heartbeats
+from datetime import timedelta
+import threading
+
+logger = logging.getLogger(__name__)
+
+# File extension of each export format
+EXTENSIONS = {
+    'application/xlsx': '.xlsx',
+    'application/json': '.json',
+    'text/csv': '.csv',
+    'application/x-ndjson': '.ndjson',
+}
+
+# Number of users written between progress updates
+PROGRESS_INTERVAL = 500
+
+# Seconds between the heartbeats of a running job, and the time without
+# one after which its worker is presumed dead
+HEARTBEAT_INTERVAL = 30
+LEASE_TIMEOUT = timedelta(minutes=5)
+
+# Number of times a job is claimed before it fails for good
+MAX_ATTEMPTS = 3
+
+# Time after which an unfinished job fails
+JOB_TIMEOUT = timedelta(hours=1)
+
+# Errors of jobs that did not finish
+WORKER_STOPPED = 'The export worker stopped while generating the file.'
+TIMED_OUT = 'The export was not generated in time.'
+
+def claim(limit):
+    """ Mark up to limit pending jobs as running and return their ids,
+        oldest first. Jobs locked by another worker are skipped, so any
+        number of workers may claim jobs at the same time. Claiming
+        starts the lease of the job and counts an attempt.
+    """
+
+    with transaction.atomic():
+        ids = list(ExportJob.objects.select_for_update(
+            skip_locked=True
+        ).filter(
+            status=ExportJob.PENDING
+        ).order_by(
+            'created'
+        ).values_list('id', flat=True)[:limit])
+
+        ExportJob.objects.filter(id__in=ids).update(
+            status=ExportJob.RUNNING,
+            heartbeat=timezone.now(),
+            attempts=F('attempts') + 1
+        )
+
+    return ids
+
+def requeue_stale():
+    """ Return running jobs whose lease expired to the queue, or fail
+        them once they have been attempted MAX_ATTEMPTS times, and fail
+        jobs that timed out. Returns the number of requeued jobs.
+    """
+    now = timezone.now()
+
+    fail_timed_out(ExportJob.objects.all())
+
+    stale = ExportJob.objects.filter(
+        status=ExportJob.RUNNING,
+        heartbeat__lt=now - LEASE_TIMEOUT
+    )
+
+    release(
+        stale.filter(attempts__gte=MAX_ATTEMPTS),
+        status=ExportJob.FAILED,
+        error=WORKER_STOPPED,
+        finished=now
+    )
+
+    return release(stale, status=ExportJob.PENDING, processed=0)
+
+def fail_timed_out(jobs):
+    """ Fail the jobs of a queryset that are unfinished after JOB_TIMEOUT """
+    now = timezone.now()
+
+    return release(
+        jobs.filter(
+            status__in=(ExportJob.PENDING, ExportJob.RUNNING),
+            created__lt=now - JOB_TIMEOUT
+        ),
+        status=ExportJob.FAILED,
+        error=TIMED_OUT,
+        finished=now
+    )
+
+def is_timed_out(job):
+    """ Whether a job is unfinished after JOB_TIMEOUT """
+    return (
+        job.status in (ExportJob.PENDING, ExportJob.RUNNING) and
+        job.created < timezone.now() - JOB_TIMEOUT
+    )
+
+def release(jobs, **changes):
+    """ Take the jobs of a queryset away from their workers, applying
+        changes and deleting the partial files. Returns the number of jobs.
+    """
+    with transaction.atomic():
+        # Locking the jobs keeps their workers from renewing the lease
+        # in the meantime
+        locked = list(jobs.select_for_update().values_list('id', 'content_oid'))
+
+        large_objects.unlink([oid for job_id, oid in locked])
+
+        return ExportJob.objects.filter(
+            id__in=[job_id for job_id, oid in locked]
+        ).update(content_oid=None, **changes)
+
+def heartbeat(job_id, attempt, stop):
+    """ Renew the lease of a running job every HEARTBEAT_INTERVAL
+        seconds until stop (a threading.Event) is set
+    """
+    try:
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            ExportJob.objects.filter(
+                id=job_id,
+                attempts=attempt,
+                status=ExportJob.RUNNING
+            ).update(heartbeat=timezone.now())
+    finally:
+        # The connection belongs to this thread
+        connection.close()
+
+def run(job_id):
+    """ Generate the file of a claimed job into a large object that
+        the job references. Errors are logged and recorded as a failed
+        job. The result is dropped if the job was requeued meanwhile.
+    """
+
+    job = ExportJob.objects.select_related(
+        'user', 'organization', 'session'
+    ).get(id=job_id)
+
+    # Only the worker holding the lease of this attempt may finish it
+    leased = ExportJob.objects.filter(
+        id=job_id,
+        attempts=job.attempts,
+        status=ExportJob.RUNNING
+    )
+
+    # The job references the file from the start, so that the partial
+    # file is deleted with the job if this worker stops
+    oid = large_objects.create()
+    if (not leased.update(content_oid=oid)):
+        large_objects.unlink([oid])
+        logger.warning('Export job %s was requeued before it started', job_id)
+        return
+
+    stop = threading.Event()
+    beat = threading.Thread(target=heartbeat, args=(job_id, job.attempts, stop), daemon=True)
+    beat.start()
+
+    try:
+        large_objects.write(oid, generate(job))
+    except Exception as e:
+        logger.exception('Export job %s failed', job_id)
+
+        leased.update(
+            status=ExportJob.FAILED,
+            error=str(e),
+            finished=timezone.now(),
+            content_oid=None
+        )
+        large_objects.unlink([oid])
+        return
+    finally:
+        stop.set()
+        beat.join()
+
+    # Otherwise requeuing the job deleted the file
+    if (not leased.update(
+        status=ExportJob.COMPLETE,
+        finished=timezone.now()
+    )):
+        logger.warning('Export job %s was requeued before it finished', job_id)
+
+def generate(job):
+    """ Yield the contents of the file requested by a job as byte strings """
+
+    # An empty file is returned if there is no data to export
+    try:
+        sessions = validate_sessions(job.organization, job.session, job.user)
+        excludes = get_excludes(rollup.submission_counts(sessions), job.user)
+    except LookupError:
+        sessions = []
+        excludes = []
+
+    # Users without submissions are not exported, so the total is
+    # an upper bound on the number of users written.
+    total = LeadUserInfo.objects.filter(session__in=sessions).count() if sessions else 0
+    ExportJob.objects.filter(id=job.id).update(total=total)
+
+    users = track_progress(job.id, export.iter_users(sessions, excludes))
+
+    if (job.file_type == 'application/xlsx'):
+        with export.write_xlsx(users) as output:
+            yield from iter(lambda: output.read(large_objects.CHUNK_SIZE), b'')
+    elif (job.file_type in export.STREAMING_EXPORTS):
+        iter_lines, extension = export.STREAMING_EXPORTS[job.file_type]
+        for line in iter_lines(users):
+            yield line.encode()
+    else:
+        for chunk in export.iter_json(users):
+            yield chunk.encode()
+
+def track_progress(job_id, users):
+    """ Yield the users yielded by iter_users, recording the number
+        written in the job every PROGRESS_INTERVAL users.
+    """
+    processed = 0
+    for processed, user in enumerate(users, 1):
+        yield user
+
+        if (processed % PROGRESS_INTERVAL == 0):
+            ExportJob.objects.filter(id=job_id).update(processed=processed)
+
+    ExportJob.objects.filter(id=job_id).update(processed=processed)
+
+def iter_content(job):
+    """ Yield the file of a complete job in chunks """
+    return large_objects.read(job.content_oid)
+
+def delete_expired(max_age):
+    """ Delete jobs that finished more than max_age (a timedelta) ago,
+        along with their files
+    """
+    return ExportJob.objects.filter(
+        finished__lt=timezone.now() - max_age
+    ).delete()
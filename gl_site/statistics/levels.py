@@ -0,0 +1,186 @@
+"""
+Statistics of a session compared with its organization and the program.
+
+The count, mean, standard deviation, min and max of every metric key are
+computed at three levels: the selected session, its organization and all
+organizations. On Postgres a single GROUPING SETS query computes every
+level. Other backends aggregate all levels in one pass over the metrics.
+"""
+
+from math import sqrt
+
+# Models
+from gl_site.models import LeadUserInfo, Metric, MetricKey, Submission
+from django.db import connection
+
+# Inventories
+from gl_site.inventories import inventory_by_id
+from gl_site.inventories.via import Via
+
+# Data
+from gl_site.statistics.data_generation import NO_DATA
+
+# Levels from the widest to the narrowest
+ALL = 'all'
+ORGANIZATION = 'organization'
+SESSION = 'session'
+LEVELS = (ALL, ORGANIZATION, SESSION)
+
+# Label of the widest level
+ALL_LABEL = 'All organizations'
+
+# Level of each value of GROUPING(organization_id, session_id). A bit is
+# set for each column that is not part of the row's grouping set.
+GROUPING_LEVELS = {3: ALL, 1: ORGANIZATION, 2: SESSION}
+
+LEVEL_SQL = """
+    SELECT
+        GROUPING(info.organization_id, info.session_id),
+        submission.inventory_id,
+        metric.metric_key_id,
+        COUNT(metric.value),
+        AVG(metric.value),
+        STDDEV_POP(metric.value),
+        MIN(metric.value),
+        MAX(metric.value)
+    FROM {metric} metric
+    JOIN {submission} submission ON submission.id = metric.submission_id
+    JOIN {info} info ON info.user_id = submission.user_id
+    WHERE NOT (submission.inventory_id = ANY(%s::integer[]))
+    GROUP BY GROUPING SETS (
+        (submission.inventory_id, metric.metric_key_id),
+        (info.organization_id, submission.inventory_id, metric.metric_key_id),
+        (info.session_id, submission.inventory_id, metric.metric_key_id)
+    )
+    HAVING GROUPING(info.organization_id, info.session_id) = 3
+        OR info.organization_id = %s
+        OR info.session_id = %s
+""".format(
+    metric=Metric._meta.db_table,
+    submission=Submission._meta.db_table,
+    info=LeadUserInfo._meta.db_table
+)
+
+def level_statistics(organization=None, session=None, excludes=(), in_database=None):
+    """ Return the statistics of every metric key for all organizations,
+        the given organization and the given session, excluding the
+        inventory ids in excludes. Either level may be None to leave it
+        out. Returns a dict of (level, inventory id, key) to a dict with
+        count, mean, standard_deviation, min and max.
+
+        The statistics are computed in the database on Postgres, unless
+        in_database is given.
+    """
+
+    if (in_database is None):
+        in_database = connection.vendor == 'postgresql'
+
+    organization_id = organization.id if organization else None
+    session_id = session.id if session else None
+
+    if (in_database):
+        with connection.cursor() as cursor:
+            cursor.execute(LEVEL_SQL, [list(excludes), organization_id, session_id])
+            rows = cursor.fetchall()
+
+        return {
+            (GROUPING_LEVELS[grouping], inventory_id, MetricKey.key_for(key_id)): {
+                'count': count,
+                'mean': mean,
+                'standard_deviation': standard_deviation,
+                'min': minimum,
+                'max': maximum,
+            }
+            for grouping, inventory_id, key_id, count, mean, standard_deviation, minimum, maximum in rows
+        }
+
+    rows = Metric.objects.filter(
+        submission__user__leaduserinfo__isnull=False
+    ).exclude(
+        submission__inventory_id__in=excludes
+    ).values_list(
+        'submission__user__leaduserinfo__organization_id',
+        'submission__user__leaduserinfo__session_id',
+        'submission__inventory_id',
+        'metric_key',
+        'value'
+    ).order_by()
+
+    # Count, sum, sum of squares, min and max of each level and key
+    totals = {}
+    for row_organization, row_session, inventory_id, key_id, value in rows.iterator():
+        levels = [ALL]
+        if (row_organization == organization_id):
+            levels.append(ORGANIZATION)
+        if (row_session == session_id):
+            levels.append(SESSION)
+
+        for level in levels:
+            total = totals.get((level, inventory_id, key_id))
+            if (total is None):
+                totals[(level, inventory_id, key_id)] = [1, value, value * value, value, value]
+            else:
+                total[0] += 1
+                total[1] += value
+                total[2] += value * value
+                total[3] = min(total[3], value)
+                total[4] = max(total[4], value)
+
+    statistics = {}
+    for (level, inventory_id, key_id), (count, total, sum_of_squares, minimum, maximum) in totals.items():
+        mean = total / count
+        statistics[(level, inventory_id, MetricKey.key_for(key_id))] = {
+            'count': count,
+            'mean': mean,
+
+            # Rounding can leave a tiny negative variance for constant values
+            'standard_deviation': sqrt(max(sum_of_squares / count - mean * mean, 0.0)),
+            'min': minimum,
+            'max': maximum,
+        }
+
+    return statistics
+
+def generate_level_data(organization, session):
+    """ Generate the graph data comparing the selected session with its
+        organization and all organizations. Returns a list of inventories
+        in the format of format_graph_data, where the data holds one
+        {'name': level label, 'key': metric key, 'value': mean, 'level':
+        level, ...statistics} entry per level and key, and 'levels' lists
+        the labels of the levels from the widest to the narrowest.
+    """
+
+    # The session implies its organization
+    if (session is not None):
+        organization = session.organization
+
+    labels = {
+        ALL: ALL_LABEL,
+        ORGANIZATION: organization.name if organization else None,
+        SESSION: session.name if session else None,
+    }
+
+    statistics = level_statistics(organization, session, [Via.inventory_id])
+
+    data = {}
+    for (level, inventory_id, key), values in sorted(
+        statistics.items(),
+        key=lambda item: (item[0][1], item[0][2], LEVELS.index(item[0][0]))
+    ):
+        inventory = data.setdefault(inventory_id, {
+            'inventory': inventory_by_id[inventory_id].name,
+            'count': 0,
+            'levels': [labels[level] for level in LEVELS if labels[level]],
+            'data': []
+        })
+
+        # Users in the narrowest level, which comes last
+        inventory['count'] = values['count']
+
+        point = dict(values, name=labels[level], key=key, value=values['mean'], level=level)
+        inventory['data'].append(point)
+
+    if (not data):
+        raise LookupError(NO_DATA)
+
+    return sorted(data.values(), key=lambda k: k['inventory'])
@@ -0,0 +1,108 @@
+"""
+Percentiles of every metric key for the staff analysis.
+
+Percentiles can't be combined from the per session rollups, so they are
+computed from the Metric table. On Postgres each percentile is an ordered
+set aggregate and only the results leave the database. Other backends
+load the values and interpolate with NumPy, using the same continuous
+(linear) definition as percentile_cont.
+"""
+
+# Models
+from gl_site.models import Metric, MetricKey
+from django.db import connection
+from django.db.models import Aggregate, FloatField
+
+# Fallback
+import numpy
+
+# Name and fraction of each reported percentile
+PERCENTILES = (
+    ('p10', 0.10),
+    ('p25', 0.25),
+    ('median', 0.50),
+    ('p75', 0.75),
+    ('p90', 0.90),
+)
+
+class PercentileCont(Aggregate):
+    """ Postgres percentile_cont ordered set aggregate """
+
+    function = 'PERCENTILE_CONT'
+    name = 'PercentileCont'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, fraction, **extra):
+        super().__init__(
+            expression,
+            fraction=float(fraction),
+            output_field=FloatField(),
+            **extra
+        )
+
+def metric_percentiles(sessions, excludes=(), in_database=None):
+    """ Return the PERCENTILES of every metric key in the given sessions,
+        excluding the inventory ids in excludes. Returns a dict of
+        (inventory id, key) to a dict of percentile name to value.
+
+        Percentiles are computed in the database on Postgres, unless
+        in_database is given.
+    """
+
+    if (in_database is None):
+        in_database = connection.vendor == 'postgresql'
+
+    metrics = Metric.objects.filter(
+        submission__user__leaduserinfo__session__in=sessions
+    ).exclude(
+        submission__inventory_id__in=excludes
+    )
+
+    if (in_database):
+        rows = metrics.values(
+            'submission__inventory_id', 'metric_key'
+        ).annotate(**{
+            name: PercentileCont('value', fraction)
+            for name, fraction in PERCENTILES
+        }).order_by()
+
+        return {
+            (row['submission__inventory_id'], MetricKey.key_for(row['metric_key'])): {
+                name: row[name] for name, fraction in PERCENTILES
+            }
+            for row in rows
+        }
+
+    rows = list(metrics.values_list(
+        'submission__inventory_id', 'metric_key', 'value'
+    ).order_by(
+        'submission__inventory_id', 'metric_key', 'value'
+    ))
+
+    if (not rows):
+        return {}
+
+    groups = [(inventory_id, key_id) for inventory_id, key_id, value in rows]
+    values = numpy.array([value for inventory_id, key_id, value in rows], dtype=float)
+
+    # Rows are sorted by group and then value, so each group is a
+    # sorted run of values starting at an offset.
+    starts = [0] + [i for i in range(1, len(groups)) if groups[i] != groups[i - 1]]
+    starts = numpy.array(starts)
+    counts = numpy.diff(numpy.append(starts, len(values)))
+
+    # Fractional position of each percentile within each group
+    fractions = numpy.array([fraction for name, fraction in PERCENTILES])
+    positions = starts[:, None] + fractions[None, :] * (counts[:, None] - 1)
+
+    lower = numpy.floor(positions).astype(int)
+    upper = numpy.ceil(positions).astype(int)
+    weights = positions - lower
+    results = values[lower] + (values[upper] - values[lower]) * weights
+
+    return {
+        (groups[start][0], MetricKey.key_for(groups[start][1])): {
+            name: float(value) for (name, fraction), value in zip(PERCENTILES, result)
+        }
+        for start, result in zip(starts, results)
+    }
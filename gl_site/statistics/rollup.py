@@ -0,0 +1,306 @@
+"""
+Maintenance of and queries against the MetricRollup table.
+
+Each MetricRollup row holds the count, sum, sum of squares, min and max of
+one metric key for one inventory within one session. Because these values
+add together, the statistics for any set of sessions can be computed by
+summing rollup rows instead of aggregating every Metric.
+"""
+
+from math import sqrt
+
+# Models
+from gl_site.models import LeadUserInfo, Metric, MetricKey, MetricRollup, Session, Submission
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Avg, Count, F, Max, Min, StdDev, Sum
+
+def record_metrics(submission, metrics):
+    """ Add the metrics of a completed submission to the rollup table.
+        Expects metrics to be a dict of metric key to value. Users
+        without a LeadUserInfo (e.g. admins) belong to no session and
+        are skipped. Uses the same number of queries for any number
+        of metrics.
+    """
+
+    try:
+        session_id = submission.user.leaduserinfo.session_id
+    except LeadUserInfo.DoesNotExist:
+        return
+
+    metrics = {key: float(value) for key, value in metrics.items()}
+
+    try:
+        with transaction.atomic():
+            _add_to_rollups(session_id, submission.inventory_id, metrics)
+    except IntegrityError:
+        # Another submission created one of the missing rows
+        # first. It exists now, so update it instead.
+        with transaction.atomic():
+            _add_to_rollups(session_id, submission.inventory_id, metrics)
+
+def _add_to_rollups(session_id, inventory_id, metrics):
+    """ Add metric values to the rollup rows of a session and inventory,
+        creating missing rows. Must be called in a transaction. Existing
+        rows are locked so that concurrent submissions in the same
+        session do not overwrite each other.
+    """
+
+    rollups = MetricRollup.objects.select_for_update().filter(
+        session_id=session_id,
+        inventory_id=inventory_id,
+        key__in=list(metrics)
+    )
+    existing = {rollup.key: rollup for rollup in rollups}
+
+    created = []
+    for key, value in metrics.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            created.append(MetricRollup(
+                session_id=session_id,
+                inventory_id=inventory_id,
+                key=key,
+                count=1,
+                sum=value,
+                sum_of_squares=value * value,
+                min=value,
+                max=value
+            ))
+        else:
+            rollup.count += 1
+            rollup.sum += value
+            rollup.sum_of_squares += value * value
+            rollup.min = min(rollup.min, value)
+            rollup.max = max(rollup.max, value)
+
+    if existing:
+        MetricRollup.objects.bulk_update(
+            existing.values(),
+            ['count', 'sum', 'sum_of_squares', 'min', 'max']
+        )
+
+    if created:
+        MetricRollup.objects.bulk_create(created)
+
+def refresh(sessions=None, inventory_ids=None):
+    """ Recompute the rollup rows of the given sessions, which may be
+        Session instances or ids, from the Metric table. Limited to the
+        given inventory ids if any. No sessions means every session.
+        Bumps the data version of the sessions and returns the number
+        of rows created.
+
+        Used when metrics leave a session: their submission is deleted,
+        or their user is deleted or moved to another session, and when
+        metrics are rescored.
+    """
+    rollups = MetricRollup.objects.all()
+    versions = Session.objects.all()
+    conditions = []
+    params = []
+
+    if (sessions is not None):
+        session_ids = [getattr(s, 'id', s) for s in sessions]
+        rollups = rollups.filter(session_id__in=session_ids)
+        versions = versions.filter(id__in=session_ids)
+        conditions.append('info.session_id = ANY(%s)')
+        params.append(session_ids)
+
+    if (inventory_ids is not None):
+        rollups = rollups.filter(inventory_id__in=inventory_ids)
+        conditions.append('submission.inventory_id = ANY(%s)')
+        params.append(list(inventory_ids))
+
+    with transaction.atomic():
+        n_rows = _replace_rollups(rollups, conditions, params)
+
+        # Cached statistics may have been computed from the old rows
+        versions.update(data_version=F('data_version') + 1)
+
+    return n_rows
+
+def _replace_rollups(rollups, conditions, params):
+    """ Delete the rollups and insert the aggregates of the metrics
+        matching the SQL conditions in their place. Must be called in
+        a transaction.
+
+        The table is locked first, which waits for the submissions that
+        have updated the rollup to commit, so that their metrics are
+        aggregated, and makes later ones wait to add theirs to the new
+        rows. Plain reads of the table are not blocked.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('LOCK TABLE {} IN EXCLUSIVE MODE'.format(MetricRollup._meta.db_table))
+
+        rollups.delete()
+
+        cursor.execute(
+            """
+            INSERT INTO {rollup} (session_id, inventory_id, key, count, sum, sum_of_squares, min, max)
+            SELECT
+                info.session_id,
+                submission.inventory_id,
+                metric_key.key,
+                COUNT(metric.value),
+                SUM(metric.value),
+                SUM(metric.value * metric.value),
+                MIN(metric.value),
+                MAX(metric.value)
+            FROM {metric} metric
+            JOIN {submission} submission ON submission.id = metric.submission_id
+            JOIN {info} info ON info.user_id = submission.user_id
+            JOIN {metric_key} metric_key ON metric_key.id = metric.metric_key_id
+            WHERE {conditions}
+            GROUP BY info.session_id, submission.inventory_id, metric_key.key
+            """.format(
+                rollup=MetricRollup._meta.db_table,
+                metric=Metric._meta.db_table,
+                submission=Submission._meta.db_table,
+                info=LeadUserInfo._meta.db_table,
+                metric_key=MetricKey._meta.db_table,
+                conditions=' AND '.join(conditions) or 'TRUE'
+            ),
+            params
+        )
+
+        return cursor.rowcount
+
+def submission_counts(sessions):
+    """ Return the number of completed submissions per inventory in the
+        given sessions as a list of {'inventory_id', 'count'} dicts.
+    """
+
+    # Every submission of an inventory stores each of its keys once,
+    # so the largest key count in a session is its submission count.
+    per_session = MetricRollup.objects.filter(
+        session__in=sessions
+    ).values(
+        'session_id', 'inventory_id'
+    ).annotate(
+        submissions=Max('count')
+    )
+
+    counts = {}
+    for row in per_session:
+        inventory_id = row['inventory_id']
+        counts[inventory_id] = counts.get(inventory_id, 0) + row['submissions']
+
+    return [
+        {'inventory_id': inventory_id, 'count': count}
+        for inventory_id, count in sorted(counts.items())
+    ]
+
+def metrics_analysis(sessions, excludes=()):
+    """ Return min, max, mean and standard deviation for every metric key
+        in the given sessions, excluding the inventory ids in excludes.
+        Rows match the format of a values/annotate query over Metric.
+    """
+
+    combined = MetricRollup.objects.filter(
+        session__in=sessions
+    ).exclude(
+        inventory_id__in=excludes
+    ).values(
+        'key', 'inventory_id'
+    ).annotate(
+        total_count=Sum('count'),
+        total_sum=Sum('sum'),
+        total_sum_of_squares=Sum('sum_of_squares'),
+        total_min=Min('min'),
+        total_max=Max('max')
+    ).order_by(
+        'inventory_id', 'key'
+    )
+
+    analysis = []
+    for row in combined:
+        analysis.append({
+            'key': row['key'],
+            'submission__inventory_id': row['inventory_id'],
+            'min': row['total_min'],
+            'max': row['total_max'],
+            'mean': row['total_sum'] / row['total_count'],
+            'standard_deviation': _standard_deviation(
+                row['total_count'],
+                row['total_sum'],
+                row['total_sum_of_squares']
+            )
+        })
+
+    return analysis
+
+def _standard_deviation(count, total, sum_of_squares):
+    """ Population standard deviation, matching the database StdDev """
+    mean = total / count
+    variance = sum_of_squares / count - mean * mean
+
+    # Rounding can leave a tiny negative variance for constant values
+    return sqrt(max(variance, 0.0))
+
+def _live_aggregates():
+    """ Aggregate the Metric table per session, inventory and key id """
+    return Metric.objects.filter(
+        submission__user__leaduserinfo__isnull=False
+    ).values(
+        'submission__user__leaduserinfo__session_id',
+        'submission__inventory_id',
+        'metric_key'
+    ).order_by()
+
+def rebuild():
+    """ Replace the contents of the rollup table with aggregates computed
+        directly from the Metric table. Returns the number of rows created.
+    """
+    return refresh()
+
+def verify(tolerance=1e-6):
+    """ Compare the rollup table against aggregates computed directly from
+        the Metric table. Returns a list of (session_id, inventory_id, key,
+        field, expected, actual) tuples, one per mismatch.
+    """
+
+    live = {}
+    for row in _live_aggregates().annotate(
+        count=Count('value'),
+        min=Min('value'),
+        max=Max('value'),
+        mean=Avg('value'),
+        standard_deviation=StdDev('value')
+    ).iterator():
+        group = (
+            row['submission__user__leaduserinfo__session_id'],
+            row['submission__inventory_id'],
+            MetricKey.key_for(row['metric_key'])
+        )
+        live[group] = row
+
+    mismatches = []
+    for rollup in MetricRollup.objects.iterator():
+        group = (rollup.session_id, rollup.inventory_id, rollup.key)
+        expected = live.pop(group, None)
+
+        if expected is None:
+            mismatches.append(group + ('count', 0, rollup.count))
+            continue
+
+        if rollup.count != expected['count']:
+            mismatches.append(group + ('count', expected['count'], rollup.count))
+            continue
+
+        actual = {
+            'min': rollup.min,
+            'max': rollup.max,
+            'mean': rollup.sum / rollup.count,
+            'standard_deviation': _standard_deviation(
+                rollup.count, rollup.sum, rollup.sum_of_squares
+            )
+        }
+
+        for field, value in actual.items():
+            if abs(value - expected[field]) > tolerance * max(1.0, abs(expected[field])):
+                mismatches.append(group + (field, expected[field], value))
+
+    # Groups with metrics but no rollup row
+    for group, expected in live.items():
+        mismatches.append(group + ('count', expected['count'], 0))
+
+    return mismatches
@@ -1,3 +1,8 @@
+"""
+Random inventory answers, used to generate sample submissions for the
+tests and the statistics benchmarks.
+"""
+
 import random
 
 def _get_answers(n_questions, min, max):
@@ -52,6 +52,30 @@ class statistics_request_form(forms.Form):
     # The session being requested
     session = forms.ModelChoiceField(queryset=None, required=False, widget=SessionWidget)
 
+    # How the graphs display metrics. Histograms count metrics into bins,
+    # which keeps the response small for large samples. Levels compare
+    # the sample with its organization and all organizations (staff only).
+    POINTS = 'points'
+    BINS = 'bins'
+    LEVELS = 'levels'
+    modes = (
+        (POINTS, 'Individual scores'),
+        (BINS, 'Histograms'),
+        (LEVELS, 'Compare with organization and program')
+    )
+    mode = forms.ChoiceField(choices=modes, required=False, label='Display')
+
+    # Demographic field to summarize metrics by. Takes precedence over
+    # the display mode.
+    group_by_choices = (
+        ('', 'None'),
+        ('gender', 'Gender'),
+        ('major', 'Major / Career'),
+        ('education', 'Education'),
+        ('graduation_year', 'Graduation year')
+    )
+    group_by = forms.ChoiceField(choices=group_by_choices, required=False, label='Group by')
+
     def __init__(self, organizations, sessions, *args, **kwargs):
         """ Override init to set field querysets manually """
 
@@ -80,7 +104,9 @@ class statistics_download_form(statistics_request_form):
     # Download choices
     choices = (
         ('application/xlsx', 'Excel spreadsheet (for typical use)'),
-        ('application/json', 'JSON (for technical users)')
+        ('application/json', 'JSON (for technical users)'),
+        ('text/csv', 'CSV (for large samples)'),
+        ('application/x-ndjson', 'Newline delimited JSON (for large samples)')
     )
     file_type = forms.ChoiceField(choices=choices)
 
@@ -91,3 +117,7 @@ class statistics_download_form(statistics_request_form):
 
         self.fields['organization'].widget = forms.HiddenInput()
         self.fields['session'].widget = forms.HiddenInput()
+
+        # Downloads always contain individual scores
+        del self.fields['mode']
+        del self.fields['group_by']
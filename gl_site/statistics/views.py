@@ -1,33 +1,43 @@
 # View imports
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, JsonResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.urls import reverse
 from gl_site.custom_auth import login_required
 
 # Forms
 from gl_site.statistics.statistics_form import  statistics_request_form, statistics_download_form
 
 # Data
-from .data_generation import format_graph_data, format_file_data, generate_data_from_sessions, get_queryset, validate_sessions
-from gl_site.statistics import inventory_keys
+from .data_generation import format_graph_data, format_file_data, generate_data_from_sessions, get_excludes, get_queryset, validate_sessions
+from .histograms import generate_histogram_data
+from .groups import generate_grouped_data
+from .levels import generate_level_data
+from gl_site.statistics import cache, export, jobs, rollup
+
+# Models
+from gl_site.models import ExportJob, Session
 
 # IO
 from django.core.files.base import ContentFile
-from io import BytesIO
 
 # JSON
 import json
 
-# Excel
-import xlsxwriter
-
 # Response statuses
+ACCEPTED = 202
 BAD_REQUEST = 400
 FORBIDDEN = 403
+NOT_FOUND = 404
 METHOD_NOT_ALLOWED = 405
+CONFLICT = 409
 
 # Error messages
 METHOD_NOT_ALLOWED_MESSAGE = "Method not allowed."
 INVALID_DATA_SELECTION = "Invalid data selection."
+LEVELS_STAFF_ONLY = "Only LEAD Lab admins can compare with other organizations."
+EXPORT_NOT_FOUND = "Export not found."
+EXPORT_NOT_COMPLETE = "The export has not finished."
+EXPORT_FAILED = "The export failed. Please try again later."
 
 @login_required
 def view_statistics(request):
@@ -80,16 +90,53 @@ def load_data(request):
             request.user
         )
 
-        # Generate and format the data
-        data = generate_data_from_sessions(sessions, request.user)
-        data = format_graph_data(data)
+        mode = form.cleaned_data['mode']
+        group_by = form.cleaned_data['group_by']
+
+        # Levels show statistics of every organization
+        levels = (mode == statistics_request_form.LEVELS and not group_by)
+        if (levels and not request.user.is_staff):
+            return JsonResponse([LEVELS_STAFF_ONLY], status=FORBIDDEN, safe=False)
+
+        def generate():
+            """ Generate, format and encode the data """
+            if (group_by):
+                data = generate_grouped_data(sessions, request.user, group_by)
+            elif (levels):
+                data = generate_level_data(
+                    form.cleaned_data['organization'],
+                    form.cleaned_data['session']
+                )
+            elif (mode == statistics_request_form.BINS):
+                data = generate_histogram_data(sessions, request.user)
+            else:
+                data = generate_data_from_sessions(sessions, request.user)
+                data = format_graph_data(data)
+
+            return json.dumps(data)
+
+        # Encoded responses are cached until the data of a session changes
+        content = cache.get_or_generate(
+            cache.cache_key(
+                request.user,
+                form.cleaned_data['organization'],
+                form.cleaned_data['session'],
+                'group_by:' + group_by if group_by else mode,
+
+                # Levels depend on the data of every session
+                Session.objects.all() if levels else sessions
+            ),
+            generate
+        )
 
         # Return the JSON encoded response
-        return JsonResponse(data, safe=False)
+        return HttpResponse(content, content_type='application/json')
     except LookupError as e:
         return JsonResponse([str(e)], status=BAD_REQUEST, safe=False)
 
 def download_data(request):
+    """ Returns a file containing the metrics of every user in the sample """
+
     # Get the querysets accessable by the user
     querysets = get_queryset(request.user)
 
@@ -101,100 +148,147 @@ def download_data(request):
         auto_id='id_downloads_%s'
     )
 
-    # If it is a valid choice
-    if (downloads.is_valid()):
-        data = []
-        try:
-            # Validate sessions
-            sessions = validate_sessions(
-                downloads.cleaned_data['organization'],
-                downloads.cleaned_data['session'],
-                request.user
-            )
-
-            # Generate the data
-            data = generate_data_from_sessions(sessions, request.user)
-            data = format_file_data(data)
-        except LookupError:
-            pass
+    # Deny invalid selections
+    if (not downloads.is_valid()):
+        return JsonResponse([INVALID_DATA_SELECTION], status=FORBIDDEN, safe=False)
 
-    else:
-        data_file = ContentFile('')
+    # An empty file is returned if there is no data to export
+    sessions = []
+    excludes = []
+    try:
+        # Validate sessions
+        sessions = validate_sessions(
+            downloads.cleaned_data['organization'],
+            downloads.cleaned_data['session'],
+            request.user
+        )
+
+        # Inventories the user is not allowed to view
+        excludes = get_excludes(rollup.submission_counts(sessions), request.user)
+    except LookupError:
+        sessions = []
 
     # Finalize the output
-    if (downloads.cleaned_data['file_type'] == 'application/xlsx'):
-        # Create an excel workbook wrapped around python byte io.
-        # Use in memory to prevent the use of temp files.
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-
-        # Create a worksheet.
-        worksheet = workbook.add_worksheet()
-
-        # Set ID, Organization, and Session headers
-        worksheet.write('A1', 'User ID')
-        worksheet.write('B1', 'Organization')
-        worksheet.write('C1', 'Session')
-
-        # Add all user IDs (row number), organization, and session information
-        row = 2
-        for user in data:
-            worksheet.write('A{}'.format(row), row - 1)
-            worksheet.write('B{}'.format(row), user['organization'])
-            worksheet.write('C{}'.format(row), user['session'])
-            row += 1
-
-        # Print inventory data starting at column D
-        prefix = ''
-        column = ord('D')
-        for inventory in inventory_keys:
-            # Print all metrics within the inventory
-            for key in inventory['keys']:
-                # If column is greater than 'Z' move to 'AA'
-                if (column > ord('Z')):
-                    prefix = 'A'
-                    column = ord('A')
-
-                # Write the column header: Inventory - Metric
-                worksheet.write(prefix + chr(column) + '1', inventory['name'] + ' - ' + key)
-
-                # Print metric data for each user
-                row = 2
-                for user in data:
-                    inventory_name = inventory['name']
-                    # Only print if the user has data for this inventory
-                    if (inventory_name in user and key in user[inventory_name]):
-                        cell = (prefix + chr(column) + '{}').format(row)
-                        worksheet.write(cell, user[inventory['name']][key])
-
-                    # Move on to the next row
-                    row += 1
-
-                # Move on to the next column
-                column += 1
-
-        # Close the workbook
-        workbook.close()
-
-        # Get the output bytes for creating a django file
-        output = output.getvalue()
-
-        # Set the appropriate application extension
-        extension = '.xlsx'
+    file_type = downloads.cleaned_data['file_type']
+    if (file_type == 'application/xlsx'):
+        # Write the workbook a row at a time to a temporary file,
+        # which is streamed to the client and deleted afterwards.
+        output = export.write_xlsx(export.iter_users(sessions, excludes))
+
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename='statistics.xlsx',
+            content_type=file_type
+        )
+    elif (file_type in export.STREAMING_EXPORTS):
+        # Stream one line per user straight from the database cursor
+        iter_lines, extension = export.STREAMING_EXPORTS[file_type]
+
+        response = StreamingHttpResponse(
+            iter_lines(export.iter_users(sessions, excludes)),
+            content_type=file_type
+        )
+        response['Content-Disposition'] = 'attachment; filename=statistics{}'.format(extension)
+        return response
     else:
         # Generate the JSON output string
+        data = []
+        if (sessions):
+            data = generate_data_from_sessions(sessions, request.user)
+            data = format_file_data(data)
+
         output = json.dumps(data)
 
-        # Set the appropriate application extension
-        extension = '.json'
+        # Create the response containing the file
+        response = HttpResponse(
+            ContentFile(output),
+            content_type=file_type
+        )
+        response['Content-Disposition'] = 'attachment; filename=statistics.json'
+        return response
+
+def describe_export_job(job):
+    """ JSON serializable status of an export job """
+    status = {
+        'id': job.id,
+        'status': job.status,
+        'progress': job.progress(),
+        'processed': job.processed,
+        'total': job.total,
+        'status_url': reverse('export_job_status', args=[job.id]),
+    }
+
+    if (job.status == ExportJob.COMPLETE):
+        status['download_url'] = reverse('download_export_job', args=[job.id])
+    elif (job.status == ExportJob.FAILED):
+        status['error'] = EXPORT_FAILED
+
+    return status
+
+@login_required
+def create_export_job(request):
+    """ Queue a download to be generated by the export workers.
+        Responds with the status of the new job.
+    """
+
+    # Deny non POST requests
+    if (request.method != 'POST'):
+        return JsonResponse([METHOD_NOT_ALLOWED_MESSAGE], status=METHOD_NOT_ALLOWED, safe=False)
+
+    # Get the querysets accessable by the user
+    querysets = get_queryset(request.user)
+
+    # Get the selected downloads
+    downloads = statistics_download_form(
+        querysets['organizations'],
+        querysets['sessions'],
+        request.POST,
+        auto_id='id_downloads_%s'
+    )
+
+    # Deny invalid selections
+    if (not downloads.is_valid()):
+        return JsonResponse([INVALID_DATA_SELECTION], status=FORBIDDEN, safe=False)
+
+    job = ExportJob.objects.create(
+        user=request.user,
+        organization=downloads.cleaned_data['organization'],
+        session=downloads.cleaned_data['session'],
+        file_type=downloads.cleaned_data['file_type']
+    )
+
+    return JsonResponse(describe_export_job(job), status=ACCEPTED)
+
+@login_required
+def export_job_status(request, job_id):
+    """ Returns the status of one of the user's export jobs. A job that
+        timed out fails here too, in case no worker is running.
+    """
+
+    job = ExportJob.objects.filter(id=job_id, user=request.user).first()
+    if (job is None):
+        return JsonResponse([EXPORT_NOT_FOUND], status=NOT_FOUND, safe=False)
+
+    if (jobs.is_timed_out(job)):
+        jobs.fail_timed_out(ExportJob.objects.filter(id=job.id))
+        job.refresh_from_db()
+
+    return JsonResponse(describe_export_job(job))
+
+@login_required
+def download_export_job(request, job_id):
+    """ Returns the file generated by one of the user's export jobs """
+
+    job = ExportJob.objects.filter(id=job_id, user=request.user).first()
+    if (job is None):
+        return JsonResponse([EXPORT_NOT_FOUND], status=NOT_FOUND, safe=False)
 
-    # Generate the data file
-    data_file = ContentFile(output)
+    if (job.status != ExportJob.COMPLETE):
+        return JsonResponse([EXPORT_NOT_COMPLETE], status=CONFLICT, safe=False)
 
-    # Create the response containing the file
-    response = HttpResponse(
-        data_file,
-        content_type=downloads.cleaned_data['file_type']
+    response = StreamingHttpResponse(jobs.iter_content(job), content_type=job.file_type)
+    response['Content-Disposition'] = 'attachment; filename=statistics{}'.format(
+        jobs.EXTENSIONS[job.file_type]
     )
-    response['Content-Disposition'] = 'attachment; filename=statistics{}'.format(extension)
     return response
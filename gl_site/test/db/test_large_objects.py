@@ -0,0 +1,34 @@
+# Import test case
+from django.test import TestCase
+from unittest import mock
+
+# Database
+from gl_site.db import large_objects
+
+# Test case verifying large objects are written and read in chunks
+class LargeObjectTest(TestCase):
+
+    def test_chunks(self):
+        oid = large_objects.create()
+
+        with mock.patch.object(large_objects, 'CHUNK_SIZE', 4):
+            self.assertEqual(10, large_objects.write(oid, [b'ab', b'cde', b'', b'fghij']))
+            self.assertEqual([b'abcd', b'efgh', b'ij'], list(large_objects.read(oid)))
+
+    def test_empty(self):
+        oid = large_objects.create()
+
+        self.assertEqual(0, large_objects.write(oid, []))
+        self.assertEqual([], list(large_objects.read(oid)))
+
+    def test_unlink(self):
+        first = large_objects.create()
+        second = large_objects.create()
+
+        large_objects.unlink([first, None])
+        self.assertFalse(large_objects.exists(first))
+        self.assertTrue(large_objects.exists(second))
+
+        # Missing objects are ignored
+        large_objects.unlink([first, second])
+        self.assertFalse(large_objects.exists(second))
@@ -0,0 +1,93 @@
+# Import test case
+from django.test import SimpleTestCase
+from unittest import mock
+
+# Database
+from django.db import connection
+from gl_site.db import notify
+from gl_site.db.notify import Listener
+
+import psycopg2
+import time
+
+def wait_for(condition, timeout=5):
+    """ Wait until condition() is true, failing after timeout seconds """
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('Timed out waiting for the listener')
+        time.sleep(0.01)
+
+# Test case verifying the listener with notifications
+# sent over a connection of its own
+class ListenerTest(SimpleTestCase):
+
+    def setUp(self):
+        self.payloads = []
+        self.connects = []
+
+        self.listener = Listener(
+            'test_channel',
+            self.payloads.append,
+            on_connect=lambda: self.connects.append(True)
+        )
+
+        self.sender = psycopg2.connect(**connection.get_connection_params())
+        self.sender.autocommit = True
+        self.addCleanup(self.sender.close)
+
+    def send(self, payload):
+        self.sender.cursor().execute('SELECT pg_notify(%s, %s)', ['test_channel', payload])
+
+    def test_notify(self):
+        self.listener.start()
+        self.addCleanup(self.listener.stop)
+        wait_for(lambda: self.listener.listening)
+
+        self.send('first')
+        self.send('second')
+        wait_for(lambda: len(self.payloads) == 2)
+
+        self.assertEqual(['first', 'second'], self.payloads)
+        self.assertEqual(1, len(self.connects))
+
+    def test_handler_error(self):
+        """ A failing handler does not stop the listener """
+        handler = self.listener.handler = mock.Mock(side_effect=[ValueError('broken'), None])
+
+        self.listener.start()
+        self.addCleanup(self.listener.stop)
+        wait_for(lambda: self.listener.listening)
+
+        with self.assertLogs('gl_site.db.notify', 'ERROR'):
+            self.send('first')
+            wait_for(lambda: handler.call_count == 1)
+
+        self.send('second')
+        wait_for(lambda: handler.call_count == 2)
+
+    @mock.patch.object(notify, 'RECONNECT_DELAY', 0.01)
+    def test_reconnect(self):
+        self.listener.start()
+        self.addCleanup(self.listener.stop)
+        wait_for(lambda: self.listener.listening)
+
+        # Terminate the listener's connection
+        with self.assertLogs('gl_site.db.notify', 'ERROR'):
+            self.sender.cursor().execute(
+                'SELECT pg_terminate_backend(%s)',
+                [self.listener.connection.get_backend_pid()]
+            )
+            wait_for(lambda: len(self.connects) == 2)
+
+        wait_for(lambda: self.listener.listening)
+        self.send('after')
+        wait_for(lambda: self.payloads == ['after'])
+
+    def test_stop(self):
+        self.listener.start()
+        wait_for(lambda: self.listener.listening)
+
+        self.listener.stop()
+        self.assertFalse(self.listener.listening)
+        self.assertIsNone(self.listener.connection)
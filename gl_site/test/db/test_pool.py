@@ -0,0 +1,226 @@
+# Import test case
+from django.test import SimpleTestCase, TestCase
+from unittest import skipUnless
+
+# Database
+from django.db import connection, OperationalError
+from gl_site.db import green
+from gl_site.db.pool import ConnectionPool, PoolTimeout
+from gl_site.db.postgresql.base import DatabaseWrapper
+
+import psycopg2
+from psycopg2 import extensions
+import threading
+import time
+
+try:
+    import gevent
+except ImportError:
+    gevent = None
+
+class FakeConnection:
+    """ Stands in for a psycopg2 connection """
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+# Test case verifying the pool with fake connections
+class ConnectionPoolTest(SimpleTestCase):
+
+    def test_reuse(self):
+        pool = ConnectionPool(size=2, timeout=1)
+
+        first = pool.checkout(FakeConnection)
+        second = pool.checkout(FakeConnection)
+        pool.checkin(first)
+        pool.checkin(second)
+
+        # The most recently returned connection is reused first
+        self.assertIs(second, pool.checkout(FakeConnection))
+        self.assertIs(first, pool.checkout(FakeConnection))
+
+        stats = pool.stats()
+        self.assertEqual(2, stats['created'])
+        self.assertEqual(4, stats['checkouts'])
+        self.assertEqual(2, stats['in_use'])
+        self.assertEqual(0, stats['idle'])
+
+    def test_timeout(self):
+        pool = ConnectionPool(size=1, timeout=0.05)
+        pool.checkout(FakeConnection)
+
+        with self.assertLogs('gl_site.db.pool', 'WARNING'):
+            with self.assertRaises(PoolTimeout):
+                pool.checkout(FakeConnection)
+
+        self.assertEqual(1, pool.stats()['timeouts'])
+
+    def test_wait(self):
+        pool = ConnectionPool(size=1, timeout=5)
+        connection = pool.checkout(FakeConnection)
+
+        checked_out = []
+        waiter = threading.Thread(target=lambda: checked_out.append(pool.checkout(FakeConnection)))
+        waiter.start()
+
+        time.sleep(0.05)
+        self.assertEqual([], checked_out)
+
+        pool.checkin(connection)
+        waiter.join()
+
+        self.assertEqual([connection], checked_out)
+        self.assertEqual(1, pool.stats()['waits'])
+        self.assertGreater(pool.stats()['max_wait_seconds'], 0)
+
+    def test_discard(self):
+        pool = ConnectionPool(size=1, timeout=0.05)
+
+        connection = pool.checkout(FakeConnection)
+        pool.checkin(connection, discard=True)
+        self.assertTrue(connection.closed)
+
+        # Connections closed while idle are replaced
+        replacement = pool.checkout(FakeConnection)
+        self.assertIsNot(connection, replacement)
+        pool.checkin(replacement)
+        replacement.closed = True
+        self.assertIsNot(replacement, pool.checkout(FakeConnection))
+
+        self.assertEqual(2, pool.stats()['discarded'])
+        self.assertEqual(3, pool.stats()['created'])
+
+    def test_failed_connect(self):
+        pool = ConnectionPool(size=1, timeout=0.05)
+
+        def connect():
+            raise psycopg2.OperationalError('Connection refused')
+
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.checkout(connect)
+
+        # The failed connection does not take a place in the pool
+        self.assertEqual(0, pool.stats()['in_use'])
+        pool.checkout(FakeConnection)
+
+# Test case verifying the database backend returns
+# connections to the pool when Django closes them
+class PooledBackendTest(TestCase):
+
+    # Pools are shared by connection parameters, so each
+    # test connects with its own application name
+    def create_wrapper(self, **settings):
+        options = dict(connection.settings_dict['OPTIONS'], application_name=self.id())
+        wrapper = DatabaseWrapper(
+            dict(connection.settings_dict, OPTIONS=options, **settings),
+            alias='pool_test'
+        )
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_reuse(self):
+        wrapper = self.create_wrapper(POOL_SIZE=1)
+        wrapper.ensure_connection()
+        server_connection = wrapper.connection
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TEMPORARY TABLE pool_test (id integer)')
+
+        wrapper.close()
+        self.assertIn(server_connection, wrapper.pool.idle)
+
+        # The connection is reused without its temporary table
+        wrapper.ensure_connection()
+        self.assertIs(server_connection, wrapper.connection)
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('pool_test')")
+            self.assertIsNone(cursor.fetchone()[0])
+
+    def test_session_state(self):
+        wrapper = self.create_wrapper(POOL_SIZE=1)
+
+        with wrapper.cursor() as cursor:
+            cursor.execute("SET statement_timeout = '5s'")
+            cursor.execute('SELECT pg_advisory_lock(1)')
+            cursor.execute('PREPARE pool_test AS SELECT 1')
+
+        server_connection = wrapper.connection
+        wrapper.close()
+        wrapper.ensure_connection()
+        self.assertIs(server_connection, wrapper.connection)
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SHOW statement_timeout')
+            self.assertEqual('0', cursor.fetchone()[0])
+
+            cursor.execute(
+                "SELECT COUNT(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid()"
+            )
+            self.assertEqual(0, cursor.fetchone()[0])
+
+            cursor.execute('SELECT COUNT(*) FROM pg_prepared_statements')
+            self.assertEqual(0, cursor.fetchone()[0])
+
+    def test_rollback(self):
+        wrapper = self.create_wrapper(POOL_SIZE=1)
+        wrapper.ensure_connection()
+        wrapper.set_autocommit(False)
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        self.assertNotEqual(
+            extensions.TRANSACTION_STATUS_IDLE,
+            wrapper.connection.get_transaction_status()
+        )
+
+        server_connection = wrapper.connection
+        wrapper.close()
+
+        self.assertEqual(
+            extensions.TRANSACTION_STATUS_IDLE,
+            server_connection.get_transaction_status()
+        )
+        self.assertIn(server_connection, wrapper.pool.idle)
+
+    def test_timeout(self):
+        first = self.create_wrapper(POOL_SIZE=1, POOL_TIMEOUT=0)
+        second = self.create_wrapper(POOL_SIZE=1, POOL_TIMEOUT=0)
+        first.ensure_connection()
+
+        with self.assertLogs('gl_site.db.pool', 'WARNING'):
+            with self.assertRaises(OperationalError):
+                second.ensure_connection()
+
+        first.close()
+        second.ensure_connection()
+
+# Test case verifying that queries yield to other
+# greenlets with the gevent wait callback
+@skipUnless(gevent, 'gevent is not installed')
+class GreenTest(SimpleTestCase):
+
+    def setUp(self):
+        callback = extensions.get_wait_callback()
+        self.addCleanup(extensions.set_wait_callback, callback)
+
+        green.make_psycopg_green()
+
+    def test_concurrent_queries(self):
+        params = connection.get_connection_params()
+
+        def sleep():
+            server_connection = psycopg2.connect(**params)
+            try:
+                server_connection.cursor().execute('SELECT pg_sleep(0.2)')
+            finally:
+                server_connection.close()
+
+        start = time.monotonic()
+        gevent.joinall([gevent.spawn(sleep) for i in range(5)], raise_error=True)
+
+        self.assertTrue(green.is_psycopg_green())
+        self.assertLess(time.monotonic() - start, 0.2 * 5 / 2)
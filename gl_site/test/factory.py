@@ -9,7 +9,7 @@ from datetime import date
 
 # Inventories
 from gl_site.inventories import inventory_cls_list as all_inventory_classes
-from .statistics.inventory_answers import get_answers
+from gl_site.statistics.sample_data import get_answers
 
 class Factory:
     """ Factory class for creating commonly used objects in testing """
@@ -170,6 +170,7 @@ class Factory:
         inventory.save_metrics()
 
         # Mark the submission as complete
+        submission.add_answers(inventory.answers)
         submission.current_page = None
         submission.save()
 
@@ -0,0 +1,137 @@
+# Import test case
+from django.test import TestCase
+from django import forms
+from django.template import Context, Template
+from django.template.loader import get_template
+
+# Import models and inventories
+from gl_site.models import Submission
+from gl_site.inventories import inventory_cls_list, Via
+from gl_site.inventories.shared import get_form_class, render_questions
+
+# The questions of take_inventory.html as they were rendered
+# before render_questions.
+FORM_LOOP = """                    {% for field in form %}
+                        <div class="form-group {% if field.errors %} has-error {% endif %}">
+                            <label class="control-label"> {{ field.label }} </label>
+                            <span class="form-control-feedback"> {{ field.errors }} </span>
+                            {{ field }}
+                        </div>
+                    {% endfor %}
+"""
+
+# The questions of take_inventory.html as rendered now
+QUESTIONS_LOOP = """                    {% for question in questions %}
+                        {{ question }}
+                    {% endfor %}
+"""
+
+# Returns an inventory set up on the given page
+def get_inventory(inventory_cls, page):
+    inventory = inventory_cls()
+    submission = None
+    if page > 0:
+        submission = Submission(inventory_id=inventory.inventory_id, current_page=page)
+    inventory.set_submission(submission)
+
+    return inventory
+
+# Test case verifying the form classes cached for each page
+# of an inventory.
+class InventoryFormClassTest(TestCase):
+
+    # Returns a form built from the page's questions on
+    # every request, as the forms were before caching.
+    def build_form(self, inventory, *args):
+        form = forms.Form(*args)
+        for question in inventory.questions:
+            form.fields[str(question.question_id)] = question.get_field()
+
+        return form
+
+    def test_cached_per_page(self):
+        first = get_form_class(get_inventory(Via, 0))
+        second = get_form_class(get_inventory(Via, 1))
+
+        self.assertIs(first, get_form_class(get_inventory(Via, 0)))
+        self.assertIsNot(first, second)
+        self.assertEqual(['1', '2'], list(first.base_fields)[:2])
+        self.assertEqual(['21', '22'], list(second.base_fields)[:2])
+
+    def test_same_rendering(self):
+        for inventory_cls in inventory_cls_list:
+            for page in range(inventory_cls().n_pages):
+                inventory = get_inventory(inventory_cls, page)
+                form_cls = get_form_class(inventory)
+
+                self.assertEqual(str(self.build_form(inventory)), str(form_cls()))
+
+                # Bound to a partial answer, with errors for the others
+                data = {str(inventory.questions[0].question_id): '1'}
+                self.assertEqual(str(self.build_form(inventory, data)), str(form_cls(data)))
+
+    def test_forms_independent(self):
+        inventory = get_inventory(Via, 0)
+        form_cls = get_form_class(inventory)
+
+        invalid = form_cls({})
+        self.assertFalse(invalid.is_valid())
+
+        # Errors of one form are not seen by the next
+        form = form_cls()
+        self.assertEqual(str(self.build_form(inventory)), str(form))
+
+        # Fields added to one form are not added to the class
+        form.fields['extra'] = forms.CharField()
+        self.assertNotIn('extra', form_cls().fields)
+
+# Test case verifying that the questions rendered from cached
+# markup are identical to rendering the form every time.
+class RenderQuestionsTest(TestCase):
+
+    def setUp(self):
+        source = get_template('take_inventory.html').template.source
+        self.assertIn(QUESTIONS_LOOP, source)
+
+        self.template = Template(source)
+        self.expected_template = Template(source.replace(QUESTIONS_LOOP, FORM_LOOP))
+
+    # Verifies the page rendered with render_questions
+    # is identical to the page rendered from the form
+    def assertSamePage(self, inventory, form):
+        context = {'inventory': inventory, 'form': form, 'is_final_page': False}
+        expected = self.expected_template.render(Context(context))
+
+        # Render twice to use the cached markup
+        for i in range(2):
+            context['questions'] = render_questions(form)
+            self.assertEqual(expected, self.template.render(Context(context)))
+
+    def test_unbound(self):
+        for inventory_cls in inventory_cls_list:
+            for page in range(inventory_cls().n_pages):
+                inventory = get_inventory(inventory_cls, page)
+                self.assertSamePage(inventory, get_form_class(inventory)())
+
+    def test_bound(self):
+        for inventory_cls in inventory_cls_list:
+            for page in range(inventory_cls().n_pages):
+                inventory = get_inventory(inventory_cls, page)
+                form_cls = get_form_class(inventory)
+                questions = inventory.questions
+
+                # Every answer, then some questions unanswered
+                for answer in range(questions[0].minimum, questions[0].maximum + 1):
+                    data = {str(question.question_id): str(answer) for question in questions}
+                    self.assertSamePage(inventory, form_cls(data))
+
+                    del data[str(questions[0].question_id)]
+                    self.assertSamePage(inventory, form_cls(data))
+
+    def test_invalid_answer(self):
+        inventory = get_inventory(Via, 0)
+        form = get_form_class(inventory)({'1': '9', '2': '<b>2</b>', '3': '3'})
+
+        self.assertSamePage(inventory, form)
+        self.assertIn('has-error', render_questions(form)[0])
+        self.assertNotIn('has-error', render_questions(form)[2])
@@ -0,0 +1,160 @@
+# Import test case
+from django.test import TestCase
+from django.core.management import call_command
+
+from io import StringIO
+
+# Object factory
+from gl_site.test.factory import Factory
+
+# Import models and inventories
+from gl_site.models import Metric, MetricRollup, Session, Submission, pack_answers
+from gl_site.inventories import inventory_cls_list, BigFive, FiroB
+from gl_site.inventories.rescore import rescore
+from gl_site.statistics import rollup
+
+# Test case verifying that rescoring recomputes the stored
+# metrics from the answers.
+class RescoreTest(TestCase):
+
+    def setUp(self):
+        self.user, self.info = Factory.create_user()
+        self.other_user, self.other_info = Factory.create_user()
+
+        for user in (self.user, self.other_user):
+            Factory.create_set_of_submissions(user)
+
+    # Returns the metrics of a user's submission of an inventory
+    def get_metrics(self, user, inventory_cls):
+        return dict(Metric.objects.filter(
+            submission__user=user,
+            submission__inventory_id=inventory_cls.inventory_id
+        ).values_list('metric_key__key', 'value'))
+
+    # Changes the stored metrics of a user's Big Five submission
+    def corrupt_metrics(self, user):
+        submission = Submission.objects.get(user=user, inventory_id=BigFive.inventory_id)
+
+        Metric.objects.filter(submission=submission, metric_key__key='openness').update(value=0)
+        Metric.objects.filter(submission=submission, metric_key__key='extraversion').delete()
+        Metric.objects.create(submission=submission, key='score', value=1)
+
+    def test_unchanged(self):
+        expected = {cls: self.get_metrics(self.user, cls) for cls in inventory_cls_list}
+
+        totals = rescore([cls.inventory_id for cls in inventory_cls_list], batch_size=2)
+
+        self.assertEqual(
+            {'updates': 0, 'creates': 0, 'deletes': 0, 'scored': 12, 'skipped': []},
+            totals
+        )
+        for cls in inventory_cls_list:
+            self.assertEqual(expected[cls], self.get_metrics(self.user, cls))
+
+    def test_changed(self):
+        expected = self.get_metrics(self.user, BigFive)
+        self.corrupt_metrics(self.user)
+
+        rollup.rebuild()
+        extraversion = MetricRollup.objects.filter(session=self.info.session, key='extraversion')
+        self.assertFalse(extraversion.exists())
+
+        totals = rescore([BigFive.inventory_id])
+
+        self.assertEqual((1, 1, 1), (totals['updates'], totals['creates'], totals['deletes']))
+        self.assertEqual(expected, self.get_metrics(self.user, BigFive))
+        self.assertEqual(10, Metric.objects.filter(submission__inventory_id=BigFive.inventory_id).count())
+
+        # The rollups are rebuilt from the new metrics
+        self.assertEqual([], rollup.verify())
+        self.assertTrue(extraversion.exists())
+
+    def test_dry_run(self):
+        self.corrupt_metrics(self.user)
+        corrupted = self.get_metrics(self.user, BigFive)
+
+        totals = rescore([BigFive.inventory_id], dry_run=True)
+
+        self.assertEqual((1, 1, 1), (totals['updates'], totals['creates'], totals['deletes']))
+        self.assertEqual(corrupted, self.get_metrics(self.user, BigFive))
+
+    def test_session_filter(self):
+        session = Factory.create_session(self.info.organization, self.user)
+        self.other_info.session = session
+        self.other_info.save()
+
+        self.corrupt_metrics(self.user)
+        self.corrupt_metrics(self.other_user)
+
+        totals = rescore([BigFive.inventory_id], session=self.info.session)
+        self.assertEqual(1, totals['scored'])
+
+        # Only the submission in the session was rescored
+        self.assertIn('extraversion', self.get_metrics(self.user, BigFive))
+        self.assertNotIn('extraversion', self.get_metrics(self.other_user, BigFive))
+
+    def test_session_rollups(self):
+        session = Factory.create_session(self.info.organization, self.user)
+        self.other_info.session = session
+        self.other_info.save()
+
+        rollup.rebuild()
+        self.corrupt_metrics(self.user)
+
+        other_rollups = list(MetricRollup.objects.filter(session=session).values())
+        self.info.session.refresh_from_db()
+        session.refresh_from_db()
+
+        rescore([BigFive.inventory_id], session=self.info.session)
+
+        # Only the rollups and data version of the session are refreshed
+        self.assertEqual([], rollup.verify())
+        self.assertEqual(other_rollups, list(MetricRollup.objects.filter(session=session).values()))
+        self.assertEqual(
+            self.info.session.data_version + 1,
+            Session.objects.get(id=self.info.session.id).data_version
+        )
+        self.assertEqual(session.data_version, Session.objects.get(id=session.id).data_version)
+
+    def test_organization_filter(self):
+        organization = Factory.create_organization(self.user)
+        self.other_info.organization = organization
+        self.other_info.save()
+
+        totals = rescore([BigFive.inventory_id], organization=organization)
+        self.assertEqual(1, totals['scored'])
+
+    def test_missing_answers(self):
+        submission = Submission.objects.get(user=self.user, inventory_id=FiroB.inventory_id)
+        answers = submission.get_answers()
+        del answers[1]
+        submission.packed_answers = pack_answers(answers)
+        submission.save()
+        expected = self.get_metrics(self.user, FiroB)
+
+        totals = rescore([FiroB.inventory_id])
+
+        self.assertEqual([submission.id], totals['skipped'])
+        self.assertEqual(1, totals['scored'])
+        self.assertEqual(expected, self.get_metrics(self.user, FiroB))
+
+    def test_unknown_answers(self):
+        submission = Submission.objects.get(user=self.user, inventory_id=BigFive.inventory_id)
+        submission.add_answers({11: 1})
+        submission.save()
+
+        totals = rescore([BigFive.inventory_id])
+        self.assertEqual([submission.id], totals['skipped'])
+
+    def test_command(self):
+        self.corrupt_metrics(self.user)
+        out = StringIO()
+
+        call_command('rescore', '--dry-run', '--processes', '0', stdout=out)
+        self.assertIn('Dry run. Scored 12 submissions: 1 metrics updated, 1 created, 1 deleted.', out.getvalue())
+        self.assertNotIn('extraversion', self.get_metrics(self.user, BigFive))
+
+        # Scored in a worker process
+        call_command('rescore', '--inventory', str(BigFive.inventory_id), '--processes', '1', stdout=out)
+        self.assertIn('Scored 2 submissions: 1 metrics updated, 1 created, 1 deleted.', out.getvalue())
+        self.assertIn('extraversion', self.get_metrics(self.user, BigFive))
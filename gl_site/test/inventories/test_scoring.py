@@ -0,0 +1,186 @@
+# Import test case
+from django.test import SimpleTestCase
+
+import random
+
+# Import models and inventories
+from gl_site.models import Submission
+from gl_site.inventories import (
+    inventory_cls_list, BigFive, CoreSelf, CareerCommitment, Ambiguity, FiroB, Via
+)
+from gl_site.inventories.scoring import Count, Mean, Scoring, Sum, Total
+
+# Number of random submissions scored for each inventory
+N_SUBMISSIONS = 500
+
+# Scoring of each inventory before the scoring rules, computing
+# the metrics of a dict of answers one submission at a time.
+
+def score_big_five(answers):
+    def reverse(s):
+        return 8 - int(s)
+
+    metrics = {
+        'extraversion': int(answers[1]) + reverse(answers[6]),
+        'agreeableness': reverse(answers[2]) + int(answers[7]),
+        'conscientiousness': int(answers[3]) + reverse(answers[8]),
+        'emotional_stability': reverse(answers[4]) + int(answers[9]),
+        'openness': int(answers[5]) + reverse(answers[10]),
+    }
+    for key in metrics:
+        metrics[key] /= 2
+
+    return metrics
+
+def score_core_self(answers):
+    score = 0
+    for qid, value in answers.items():
+        if qid % 2 == 0:
+            score += 6 - int(value)
+        else:
+            score += int(value)
+
+    return {'score': score / 12.}
+
+def score_career_commitment(answers):
+    def reverse(s):
+        return 6 - int(s)
+
+    return {
+        'identity': (int(answers[1]) + int(answers[2]) +
+            reverse(answers[3]) + int(answers[4]))/4.,
+        'planning': (reverse(answers[5]) + int(answers[6]) +
+            reverse(answers[7]) + reverse(answers[8]))/4.
+    }
+
+def score_ambiguity(answers):
+    score = 0
+    for qid, answer in answers.items():
+        if qid % 2 == 0:
+            score += 8 - int(answer)
+        else:
+            score += int(answer)
+
+    return {'score': score}
+
+def score_firo_b(answers):
+    metrics = {}
+    for metric_name, items in FiroB.scoring_table.items():
+        score = 0
+        for qid, a, b in items:
+            ans = int(answers[qid])
+            if a <= ans and ans <= b:
+                score += 1
+        metrics[metric_name] = score
+
+    modifiers = ('expressed', 'wanted')
+    categories = ('inclusion', 'control', 'affection')
+
+    metrics['social_interaction_index'] = 0
+    for modifier in modifiers:
+        key = 'total_' + modifier
+        metrics[key] = 0
+        for category in categories:
+            metrics[key] += metrics[modifier + '_' + category]
+        metrics['social_interaction_index'] += metrics[key]
+
+    for category in categories:
+        key = 'total_' + category
+        metrics[key] = 0
+        for modifier in modifiers:
+            metrics[key] += metrics[modifier + '_' + category]
+
+    return metrics
+
+def score_via(answers):
+    metrics = {}
+    for key, qids in Via().scoring_dict.items():
+        metrics[key] = sum(int(answers[qid]) for qid in qids)
+
+    return metrics
+
+reference_scoring = {
+    BigFive: score_big_five,
+    CoreSelf: score_core_self,
+    CareerCommitment: score_career_commitment,
+    Ambiguity: score_ambiguity,
+    FiroB: score_firo_b,
+    Via: score_via,
+}
+
+# Returns random answers to every question of an inventory,
+# as the strings saved by the inventory forms.
+def random_answers(inventory_cls, rng):
+    inventory = inventory_cls()
+    answers = {}
+    for page in range(inventory.n_pages):
+        inventory.set_submission(Submission(current_page=page))
+
+        for question in inventory.questions:
+            answer = rng.randint(question.minimum, question.maximum)
+            answers[question.question_id] = str(answer)
+
+    return answers
+
+# Test case verifying the scoring rules of every inventory
+# against the scoring they replaced.
+class ScoringTest(SimpleTestCase):
+
+    def setUp(self):
+        self.rng = random.Random(16)
+
+    def test_compute_metrics(self):
+        for inventory_cls in inventory_cls_list:
+            for i in range(N_SUBMISSIONS):
+                answers = random_answers(inventory_cls, self.rng)
+
+                inventory = inventory_cls()
+                inventory.answers = answers
+                inventory.compute_metrics()
+
+                expected = reference_scoring[inventory_cls](answers)
+                self.assertEqual(expected, inventory.metrics)
+                self.assertEqual(list(expected), list(inventory.metrics))
+
+                # Types are kept, ints are saved for undivided metrics
+                for key, value in expected.items():
+                    self.assertIs(type(value), type(inventory.metrics[key]))
+
+    def test_batch(self):
+        for inventory_cls in inventory_cls_list:
+            scoring = inventory_cls().scoring
+            answers = [random_answers(inventory_cls, self.rng) for i in range(N_SUBMISSIONS)]
+
+            scores = scoring.score(scoring.answer_matrix(answers))
+            self.assertEqual((N_SUBMISSIONS, len(scoring.keys)), scores.shape)
+
+            for row, submission in zip(scores.tolist(), answers):
+                expected = reference_scoring[inventory_cls](submission)
+                self.assertEqual(expected, dict(zip(scoring.keys, row)))
+
+    def test_empty_batch(self):
+        scoring = FiroB.scoring
+        scores = scoring.score(scoring.answer_matrix([]))
+        self.assertEqual((0, len(scoring.keys)), scores.shape)
+
+    def test_rules(self):
+        scoring = Scoring((
+            Sum('sum', (1, 2, 3), reverse=(3,), reverse_from=6),
+            Mean('mean', (2, 4)),
+            Count('count', ((1, 1, 2), (4, 4, 5))),
+            Total('total', ('sum', 'count')),
+        ))
+
+        self.assertEqual((1, 2, 3, 4), scoring.question_ids)
+        self.assertEqual(
+            {'sum': 1 + 2 + (6 - 5), 'mean': 2.5, 'count': 1, 'total': 5},
+            scoring.metrics({1: '1', 2: 2, 3: '5', 4: 3})
+        )
+
+    def test_nested_total(self):
+        with self.assertRaises(ValueError):
+            Scoring((
+                Sum('sum', (1,)),
+                Total('total', ('sum',)),
+                Total('total_of_total', ('total',)),
+            ))
@@ -0,0 +1,181 @@
+# Import test case
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+
+# Object factory and answers
+from gl_site.test.factory import Factory
+from gl_site.statistics.sample_data import get_answers
+
+# Import models and inventories
+from django.contrib.auth.models import User
+from gl_site.models import Metric, MetricKey, MetricRollup, Submission, pack_answers, unpack_answers
+from gl_site.inventories import inventory_cls_list
+from gl_site.inventories.shared import get_form_class
+from gl_site.statistics import rollup
+
+# Queries made by submitting a page that does not complete the inventory:
+# savepoint, the submission with its answers and release.
+PAGE_QUERIES = 3
+
+# Queries made by submitting the final page. In addition to the above:
+# metrics, the user's LeadUserInfo, a savepoint, locking the rollup rows,
+# either updating or creating them, a release and bumping the session's
+# data version.
+FINAL_PAGE_QUERIES = 10
+
+# Test case verifying that submitting an inventory page takes
+# the same number of queries however many questions and
+# metrics the inventory has.
+class SubmitQueryCountTest(TestCase):
+
+    def setUp(self):
+        self.user, self.info = Factory.create_user()
+
+    # Submits one page of an inventory like the take_inventory
+    # view does, returning the number of queries made by submit.
+    def submit_page(self, inventory_cls, answers):
+        # The request user is loaded without its LeadUserInfo
+        user = User.objects.get(id=self.user.id)
+
+        inventory = inventory_cls()
+        inventory.set_submission(Submission.objects.filter(
+            user=user, inventory_id=inventory.inventory_id
+        ).first())
+
+        data = {
+            str(question.question_id): answers[question.question_id]
+            for question in inventory.questions
+        }
+        form = get_form_class(inventory)(data)
+        self.assertTrue(form.is_valid())
+
+        with CaptureQueriesContext(connection) as queries:
+            inventory.submit(user, form)
+
+        return len(queries), inventory
+
+    # Submits every page of an inventory, verifying the number
+    # of queries of each page.
+    def submit_inventory(self, inventory_cls):
+        answers = get_answers(inventory_cls.__name__)
+        n_pages = inventory_cls().n_pages
+
+        for page in range(n_pages):
+            n_queries, inventory = self.submit_page(inventory_cls, answers)
+
+            if page < n_pages - 1:
+                self.assertEqual(PAGE_QUERIES, n_queries)
+            else:
+                self.assertEqual(FINAL_PAGE_QUERIES, n_queries)
+
+        return inventory
+
+    def test_query_count(self):
+        for inventory_cls in inventory_cls_list:
+            inventory = self.submit_inventory(inventory_cls)
+            submission = inventory.submission
+
+            self.assertTrue(submission.is_complete())
+            self.assertEqual(
+                len(get_answers(inventory_cls.__name__)),
+                len(Submission.objects.get(id=submission.id).get_answers())
+            )
+            self.assertEqual(
+                len(inventory.metrics),
+                Metric.objects.filter(submission=submission).count()
+            )
+
+    # Later submissions update the existing rollup rows with
+    # the same number of queries.
+    def test_rollup_update(self):
+        for inventory_cls in inventory_cls_list:
+            self.submit_inventory(inventory_cls)
+
+        self.user, self.info = Factory.create_user(self.info.session)
+        for inventory_cls in inventory_cls_list:
+            self.submit_inventory(inventory_cls)
+
+        self.assertEqual(
+            {2},
+            set(MetricRollup.objects.values_list('count', flat=True))
+        )
+        self.assertEqual([], rollup.verify())
+
+    # A first page posted twice at once creates one submission,
+    # and the second post continues from it.
+    def test_concurrent_first_page(self):
+        inventory_cls = inventory_cls_list[0]
+        answers = get_answers(inventory_cls.__name__)
+
+        n_queries, inventory = self.submit_page(inventory_cls, answers)
+        submission = inventory.submission
+
+        inventory = inventory_cls()
+        inventory.set_submission(None)
+        form = get_form_class(inventory)({
+            str(question.question_id): answers[question.question_id]
+            for question in inventory.questions
+        })
+        self.assertTrue(form.is_valid())
+        inventory.submit(self.user, form)
+
+        self.assertEqual(submission.id, inventory.submission.id)
+        self.assertEqual(
+            submission.current_page,
+            Submission.objects.get(id=submission.id).current_page
+        )
+
+# Test case verifying the answers packed in a submission
+class PackedAnswersTest(TestCase):
+
+    def test_round_trip(self):
+        answers = {1: 3, 2: 7, 5: 1, 120: 5}
+        packed = pack_answers(answers)
+
+        self.assertEqual(120, len(packed))
+        self.assertEqual(answers, unpack_answers(packed))
+        self.assertEqual({}, unpack_answers(pack_answers({})))
+
+    def test_invalid_answers(self):
+        for answer in (0, 256, -1):
+            with self.assertRaises(ValueError):
+                pack_answers({1: answer})
+
+    def test_pages(self):
+        user, info = Factory.create_user()
+        submission = Submission.objects.create(user=user, inventory_id=0)
+
+        submission.add_answers({1: '2', 2: '3'})
+        submission.save()
+        submission.add_answers({3: 4, 1: 5})
+        submission.save()
+
+        submission = Submission.objects.get(id=submission.id)
+        self.assertEqual({1: 5, 2: 3, 3: 4}, submission.get_answers())
+
+# Test case verifying that metrics expose their key
+# through the cached MetricKey ids
+class MetricKeyTest(TestCase):
+
+    def test_inventory_keys(self):
+        keys = set(MetricKey.objects.values_list('key', flat=True))
+        for inventory_cls in inventory_cls_list:
+            self.assertLessEqual(set(inventory_cls().scoring.keys), keys)
+
+    def test_key(self):
+        user, info = Factory.create_user()
+        submission = Submission.objects.create(user=user, inventory_id=0)
+        MetricKey.load()
+
+        with self.assertNumQueries(1):
+            metric = Metric.objects.create(submission=submission, key='openness', value=4)
+
+        self.assertEqual('openness', metric.key)
+        self.assertEqual(MetricKey.objects.get(key='openness').id, metric.metric_key_id)
+
+        with self.assertNumQueries(1):
+            self.assertEqual('openness', Metric.objects.get(id=metric.id).key)
+
+        metric.key = 'score'
+        self.assertEqual(MetricKey.id_for('score'), metric.metric_key_id)
@@ -16,6 +16,25 @@ class ViaTest(InventoryScoringTest):
     def test_scoring_dict(self):
         self.assertEqual(len(Via().scoring_dict), 24)
 
+    def test_item_bank_shared(self):
+        first = Via()
+        second = Via()
+
+        # The item file is parsed once and shared by every instance
+        self.assertIs(first.item_bank, second.item_bank)
+
+        # Shared state must not be modified by an instance
+        with self.assertRaises(TypeError):
+            first.scoring_dict['creativity'] = ()
+        with self.assertRaises(TypeError):
+            first.strength_dict['creativity'] = 'Creativity'
+
+        # Every item is on a page and scored for exactly one strength
+        qids = [qid for page in first.item_bank.pages for qid, text in page]
+        scored = sorted(qid for qids in first.scoring_dict.values() for qid in qids)
+        self.assertEqual(sorted(qids), scored)
+        self.assertEqual(first.n_pages, 6)
+
     def test0(self):
         answers = (
             4, 4, 5, 2, 1, 2, 4, 3, 2, 4,
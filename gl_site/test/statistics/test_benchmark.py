@@ -0,0 +1,145 @@
+# Benchmark functions
+from gl_site.statistics import benchmark
+
+# Test imports
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+# Models
+from gl_site.models import LeadUserInfo, Metric, Organization, Session, Submission
+from gl_site.inventories import FiroB
+
+# IO
+from io import StringIO
+import json
+import os
+import tempfile
+
+class TestBenchmark(TestCase):
+    """ Test case for the statistics benchmark suite """
+
+    def test_seed_organizations(self):
+        """ Sessions and users are spread across organizations """
+
+        sessions = benchmark.seed(12, n_sessions=4, n_organizations=2)
+
+        self.assertEqual(2, len({session.organization_id for session in sessions}))
+        for session in sessions:
+            users = LeadUserInfo.objects.filter(session=session)
+            self.assertEqual(3, users.count())
+            self.assertFalse(users.exclude(organization=session.organization).exists())
+
+    def test_seed_inventories(self):
+        """ Any subset of the inventories can be seeded """
+
+        sessions = benchmark.seed(3, inventory_cls_list=(FiroB,))
+
+        submissions = Submission.objects.filter(user__leaduserinfo__session=sessions[0])
+        self.assertEqual({FiroB.inventory_id}, set(submissions.values_list('inventory_id', flat=True)))
+        self.assertEqual(3, submissions.count())
+        self.assertTrue(Metric.objects.filter(submission__in=submissions).exists())
+
+    def test_seeded(self):
+        """ The sample and its staff user are rolled back afterwards """
+
+        organizations = Organization.objects.count()
+
+        with benchmark.seeded(4, n_sessions=2) as (sessions, staff):
+            self.assertTrue(staff.is_staff)
+            self.assertEqual(sessions[0], staff.leaduserinfo.session)
+            self.assertEqual(organizations + 2, Organization.objects.count())
+
+        self.assertEqual(organizations, Organization.objects.count())
+        self.assertFalse(LeadUserInfo.objects.filter(user_id=staff.id).exists())
+
+    def test_engines_command(self):
+        """ The engines command runs against a seeded sample """
+
+        output = StringIO()
+        call_command('benchmark_statistics_engines', users=[4], stdout=output)
+        self.assertIn('graph', output.getvalue())
+
+    def test_benchmark(self):
+        """ Benchmark returns the result and records statistics """
+
+        measure = benchmark.Benchmark(rounds=2)
+        self.assertEqual(Session.objects.count(), measure(Session.objects.count))
+
+        stats = measure.stats
+        self.assertEqual(2, stats['rounds'])
+        self.assertEqual(1, stats['queries'])
+        self.assertLessEqual(stats['min'], stats['median'])
+        self.assertLessEqual(stats['median'], stats['max'])
+
+    def test_run_suite(self):
+        """ Every stage is measured and the data is rolled back """
+
+        organizations = Organization.objects.count()
+
+        stages = []
+        report = benchmark.run_suite(
+            [12],
+            rounds=1,
+            n_sessions=2,
+            callback=lambda size, stage, stats: stages.append(stage)
+        )
+
+        self.assertEqual(['12'], list(report['results']))
+        self.assertEqual(stages, list(report['results']['12']))
+        self.assertIn('load_data', stages)
+        self.assertIn('download_data_xlsx', stages)
+        self.assertEqual('postgresql', report['database'])
+
+        # The report is JSON serializable
+        json.dumps(report)
+
+        self.assertEqual(organizations, Organization.objects.count())
+
+    def test_compare(self):
+        """ Slower stages, more memory and more queries are regressions """
+
+        def report(median, peak_memory, queries):
+            return {'results': {'10': {'stage': {
+                'median': median, 'peak_memory': peak_memory, 'queries': queries
+            }}}}
+
+        baseline = report(1.0, 100, 3)
+
+        self.assertEqual([], benchmark.compare(baseline, report(1.2, 120, 3)))
+        self.assertEqual([], benchmark.compare(baseline, {'results': {'20': {}}}))
+        self.assertEqual(
+            [(10, 'stage', 'median', 1.0, 2.0), (10, 'stage', 'queries', 3, 4)],
+            benchmark.compare(baseline, report(2.0, 100, 4))
+        )
+        self.assertEqual(
+            [(10, 'stage', 'peak_memory', 100, 200)],
+            benchmark.compare(baseline, report(1.0, 200, 3), threshold=0.5)
+        )
+
+    def test_command(self):
+        """ The command writes a report and compares against a baseline """
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.json')
+
+            call_command(
+                'benchmark_statistics', users=[12], sessions=2, rounds=1,
+                output=path, stdout=StringIO()
+            )
+
+            with open(path) as report_file:
+                report = json.load(report_file)
+            self.assertIn('12', report['results'])
+
+            # Make the baseline impossibly fast
+            for stats in report['results']['12'].values():
+                stats['median'] = 0
+            with open(path, 'w') as report_file:
+                json.dump(report, report_file)
+
+            with self.assertRaises(CommandError):
+                call_command(
+                    'benchmark_statistics', users=[12], sessions=2, rounds=1,
+                    compare=path, stdout=StringIO()
+                )
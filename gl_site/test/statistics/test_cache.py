@@ -0,0 +1,147 @@
+# Cache functions
+from gl_site.statistics import cache
+from django.core.cache import caches
+
+# Test imports
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from gl_site.test.factory import Factory
+from gl_site.statistics.sample_data import get_answers
+
+# Models
+from gl_site.models import Organization, Session, Submission
+
+# Admin
+from django.contrib.admin import site
+from gl_site.admin import OrganizationAdmin
+
+# Inventories
+from gl_site.inventories.big_five import BigFive
+
+class CleanedForm:
+    """ Stand in for a validated inventory page form """
+
+    def __init__(self, cleaned_data):
+        self.cleaned_data = cleaned_data
+
+class TestStatisticsCache(TestCase):
+    """ Test case for the load_data response cache """
+
+    def setUp(self):
+        """ Create a staff user with submissions and log in """
+
+        caches[cache.CACHE_ALIAS].clear()
+
+        self.user, self.info = Factory.create_user()
+        self.user.is_staff = True
+        self.user.save()
+
+        Factory.create_set_of_submissions(self.user)
+
+        self.data = {
+            'organization': self.info.organization.id,
+            'session': self.info.session.id
+        }
+
+        self.client.login(username=self.user.username, password=Factory.default_password)
+
+    def load(self, **kwargs):
+        """ Request the statistics of the user's session """
+        data = dict(self.data, **kwargs)
+        return self.client.get('/statistics/load_data', data)
+
+    def get_data_version(self):
+        """ Current data version of the user's session """
+        return Session.objects.get(id=self.info.session.id).data_version
+
+    def test_cached_response(self):
+        """ The second request returns the cached response """
+
+        with CaptureQueriesContext(connection) as generated:
+            first = self.load()
+
+        with CaptureQueriesContext(connection) as cached:
+            second = self.load()
+
+        self.assertEqual(200, second.status_code)
+        self.assertEqual(first.content, second.content)
+        self.assertLess(len(cached), len(generated))
+        self.assertEqual(1, len(caches[cache.CACHE_ALIAS]._cache))
+
+    def test_key_includes_mode(self):
+        """ Points and bins are cached separately """
+
+        points = self.load()
+        bins = self.load(mode='bins')
+
+        self.assertNotEqual(points.content, bins.content)
+        self.assertEqual(2, len(caches[cache.CACHE_ALIAS]._cache))
+
+    def test_key_includes_staff_flag(self):
+        """ Staff and non staff responses use separate keys """
+
+        staff_key = cache.cache_key(self.user, self.info.organization, self.info.session, '', [self.info.session])
+
+        self.user.is_staff = False
+        user_key = cache.cache_key(self.user, self.info.organization, self.info.session, '', [self.info.session])
+
+        self.assertNotEqual(staff_key, user_key)
+
+    def test_bump_changes_key(self):
+        """ Bumping the data version of a session changes its keys """
+
+        sessions = [self.info.session]
+        before = cache.cache_key(self.user, None, None, '', sessions)
+
+        cache.bump_data_version(Session.objects.filter(id=self.info.session.id))
+        self.assertEqual(1, self.get_data_version())
+
+        cache.bump_data_version([self.info.session.id])
+        self.assertEqual(2, self.get_data_version())
+
+        self.assertNotEqual(before, cache.cache_key(self.user, None, None, '', sessions))
+
+    def test_submit_bumps_version(self):
+        """ Completing a submission invalidates the session's statistics """
+
+        first = self.load()
+
+        # Another user of the session submits the final page
+        # of a Big Five inventory
+        user, info = Factory.create_user(self.info.session)
+        inventory = BigFive()
+        submission = Submission.objects.create(
+            inventory_id=inventory.inventory_id,
+            user=user,
+            current_page=inventory.n_pages - 1
+        )
+        inventory.set_submission(submission)
+
+        answers = get_answers('BigFive')
+        inventory.submit(user, CleanedForm({str(k): v for k, v in answers.items()}))
+
+        self.assertTrue(submission.is_complete())
+        self.assertEqual(1, self.get_data_version())
+
+        second = self.load()
+        self.assertNotEqual(first.json(), second.json())
+
+    def test_errors_not_cached(self):
+        """ Sessions without data are not cached """
+
+        session = Factory.create_session(self.info.organization, self.user)
+
+        response = self.load(session=session.id)
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(0, len(caches[cache.CACHE_ALIAS]._cache))
+
+    def test_admin_change_bumps_version(self):
+        """ Changing an organization invalidates its sessions' statistics """
+
+        admin = OrganizationAdmin(Organization, site)
+        request = RequestFactory().post('/')
+        request.user = self.user
+
+        admin.save_model(request, self.info.organization, None, True)
+        self.assertEqual(1, self.get_data_version())
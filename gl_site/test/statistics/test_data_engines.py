@@ -0,0 +1,79 @@
+# Data generation functions
+from gl_site.statistics.data_generation import (
+    generate_data_from_sessions, format_graph_data, format_file_data
+)
+
+# Test imports
+from django.test import TestCase, override_settings
+from django.core.exceptions import ImproperlyConfigured
+from gl_site.test.factory import Factory
+
+class TestDataEngines(TestCase):
+    """ The flat data engine produces the same output as prefetching """
+
+    def setUp(self):
+        """ Create two sessions with submissions and a staff user """
+
+        self.admin = Factory.create_admin()
+        self.org = Factory.create_organization(self.admin)
+        self.sessions = [
+            Factory.create_session(self.org, self.admin),
+            Factory.create_session(self.org, self.admin)
+        ]
+
+        for session in self.sessions:
+            for i in range(3):
+                user, info = Factory.create_user(session)
+                Factory.create_set_of_submissions(user)
+
+    def generate(self, engine, format_function):
+        """ Generate and format the data using the given engine """
+        with override_settings(STATISTICS_DATA_ENGINE=engine):
+            data = generate_data_from_sessions(self.sessions, self.admin)
+            return format_function(data)
+
+    def normalize_graph_data(self, data):
+        """ Remove the generated metric names, which depend on user order """
+        for inventory in data:
+            for point in inventory['data']:
+                if (point['name'].startswith('Metric-')):
+                    del point['name']
+
+            inventory['data'].sort(key=lambda point: sorted(point.items()))
+
+        return data
+
+    def test_graph_data(self):
+        """ Graph data matches between engines """
+
+        prefetch = self.generate('prefetch', format_graph_data)
+        flat = self.generate('flat', format_graph_data)
+
+        self.assertEqual(
+            self.normalize_graph_data(prefetch),
+            self.normalize_graph_data(flat)
+        )
+
+    def test_file_data(self):
+        """ File data matches between engines """
+
+        prefetch = self.generate('prefetch', format_file_data)
+        flat = self.generate('flat', format_file_data)
+
+        self.assertEqual(6, len(flat))
+        self.assertCountEqual(prefetch, flat)
+
+    def test_flat_query_count(self):
+        """ The flat engine loads all users in a single query """
+
+        with override_settings(STATISTICS_DATA_ENGINE='flat'):
+            data = generate_data_from_sessions(self.sessions, self.admin)
+
+        with self.assertNumQueries(0):
+            format_file_data(data)
+
+    def test_unknown_engine(self):
+        """ An unknown engine is a configuration error """
+
+        with self.assertRaises(ImproperlyConfigured):
+            self.generate('unknown', format_file_data)
@@ -1,5 +1,6 @@
 # Import the generate_data function
 from gl_site.statistics.data_generation import generate_data_from_sessions
+from gl_site.statistics.percentiles import PERCENTILES
 
 # Test imports
 from django.test import TestCase
@@ -7,7 +8,7 @@ from gl_site.test.factory import Factory
 
 # Models
 from gl_site.models import Metric, Submission
-from django.db.models import Count, Min, Max, Avg, StdDev
+from django.db.models import Count, Min, Max, Avg, StdDev, F
 
 # Inventories
 from gl_site.inventories import inventory_cls_list
@@ -110,16 +111,16 @@ class TestGenerateData(TestCase):
         # That does not belong to Via.
         correct_count = Metric.objects.exclude(
             submission__inventory_id=Via.inventory_id
-        ).distinct('key', 'submission__inventory_id').count()
+        ).distinct('metric_key', 'submission__inventory_id').count()
         self.assertEqual(len(data['metrics_analysis']), correct_count)
 
         # Verify that the metric analysis for each inventory is correct
         for analysis in data['metrics_analysis']:
             correct_analysis = Metric.objects.filter(
-                key=analysis['key'],
+                metric_key__key=analysis['key'],
                 submission__inventory_id=analysis['submission__inventory_id']
             ).values(
-                'key', 'submission__inventory_id'
+                'submission__inventory_id', key=F('metric_key__key')
             ).annotate(
                 min=Min('value'),
                 max=Max('value'),
@@ -127,7 +128,15 @@ class TestGenerateData(TestCase):
                 standard_deviation=StdDev('value')
             )
 
-            self.assertDictEqual(analysis, correct_analysis[0])
+            # The analysis is combined from per session rollups, so
+            # floating point values may differ in the last few digits
+            correct_analysis = correct_analysis[0]
+            self.assertEqual(
+                set(analysis.keys()),
+                set(correct_analysis.keys()) | {name for name, fraction in PERCENTILES}
+            )
+            for field, value in correct_analysis.items():
+                self.assertAlmostEqual(analysis[field], value)
 
         # Verify that the user data is correct
         for user in data['users']:
@@ -0,0 +1,115 @@
+# Group functions
+from gl_site.statistics.groups import (
+    GROUP_FIELDS, UNKNOWN, generate_grouped_data, group_label, group_statistics
+)
+from gl_site.statistics.data_generation import MINIMUM_SUBMISSIONS, NO_DATA
+
+# Test imports
+from django.test import TestCase
+from gl_site.test.factory import Factory
+
+# Models
+from gl_site.models import LeadUserInfo, Metric
+from django.db.models import Avg, Count, StdDev
+
+# Inventories
+from gl_site.inventories.big_five import BigFive
+from gl_site.inventories.via import Via
+
+class TestGroups(TestCase):
+    """ Test case for demographic cross tabulation """
+
+    def setUp(self):
+        """ Create a session of users with varied demographics """
+
+        self.admin = Factory.create_admin()
+        self.org = Factory.create_organization(self.admin)
+        self.session = Factory.create_session(self.org, self.admin)
+        self.sessions = [self.session]
+
+        # Enough women to be shown, too few men and one user without
+        # a graduation date
+        for gender in ['F'] * MINIMUM_SUBMISSIONS + ['M'] * 2:
+            user, info = Factory.create_user(self.session)
+            info.gender = gender
+            info.save()
+            Factory.create_set_of_submissions(user, [BigFive, Via])
+
+        info.graduation_date = None
+        info.save()
+
+        self.user = info.user
+
+    def test_single_query(self):
+        """ Every group is computed by one query """
+
+        for group_by in GROUP_FIELDS:
+            with self.assertNumQueries(1):
+                group_statistics(self.sessions, group_by)
+
+    def test_group_statistics(self):
+        """ Group statistics match aggregates over each group """
+
+        rows = group_statistics(self.sessions, 'gender', [Via.inventory_id])
+        keys = Metric.objects.filter(submission__user=self.user, submission__inventory_id=BigFive.inventory_id)
+        self.assertEqual(2 * keys.count(), len(rows))
+
+        for row in rows:
+            expected = Metric.objects.filter(
+                submission__user__leaduserinfo__gender=row['group'],
+                submission__inventory_id=row['inventory_id'],
+                metric_key__key=row['key']
+            ).aggregate(
+                count=Count('value'),
+                mean=Avg('value'),
+                standard_deviation=StdDev('value')
+            )
+
+            self.assertEqual(expected['count'], row['count'])
+            self.assertAlmostEqual(expected['mean'], row['mean'])
+            self.assertAlmostEqual(expected['standard_deviation'], row['standard_deviation'])
+
+    def test_graduation_year(self):
+        """ Users are grouped by graduation year, or as unknown """
+
+        rows = group_statistics(self.sessions, 'graduation_year', [Via.inventory_id])
+        labels = {group_label('graduation_year', row['group']) for row in rows}
+
+        year = LeadUserInfo.objects.exclude(graduation_date=None).first().graduation_date.year
+        self.assertEqual({str(year), UNKNOWN}, labels)
+
+    def test_labels(self):
+        """ Groups are labelled with their display names """
+
+        self.assertEqual('Female', group_label('gender', 'F'))
+        self.assertEqual('Undergraduate - Freshman', group_label('education', 'FR'))
+        self.assertEqual(LeadUserInfo.OTHER, group_label('major', LeadUserInfo.OTHER))
+
+    def test_small_cells_suppressed(self):
+        """ Non staff users do not see groups with too few submissions """
+
+        data = generate_grouped_data(self.sessions, self.user, 'gender')
+
+        self.assertEqual([BigFive.name], [inventory['inventory'] for inventory in data])
+        self.assertEqual({'Female'}, {point['key'] for point in data[0]['data']})
+        for point in data[0]['data']:
+            self.assertEqual(MINIMUM_SUBMISSIONS, point['count'])
+
+    def test_staff_see_small_cells(self):
+        """ Staff see every group """
+
+        data = generate_grouped_data(self.sessions, self.admin, 'gender')
+
+        self.assertEqual({'Female', 'Male'}, {point['key'] for point in data[0]['data']})
+        self.assertEqual('gender', data[0]['group_by'])
+
+    def test_all_suppressed(self):
+        """ No data is shown if every group is suppressed """
+
+        # Split the users into two groups that are both too small
+        for i, info in enumerate(LeadUserInfo.objects.filter(session=self.session)):
+            info.gender = 'F' if i % 2 else 'M'
+            info.save()
+
+        with self.assertRaisesMessage(LookupError, NO_DATA):
+            generate_grouped_data(self.sessions, self.user, 'gender')
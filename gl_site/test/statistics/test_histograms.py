@@ -0,0 +1,111 @@
+# Histogram functions
+from gl_site.statistics.histograms import (
+    bin_count, metric_bins, signature_strength_counts, generate_histogram_data
+)
+from gl_site.statistics.data_generation import generate_data_from_sessions, format_graph_data
+
+# Test imports
+from django.test import TestCase
+from gl_site.test.factory import Factory
+from gl_site.statistics.sample_data import get_answers
+
+# Models
+from gl_site.models import Metric
+
+# Inventories
+from gl_site.inventories import numeric_inventory_cls_list
+from gl_site.inventories.firo_b import FiroB
+from gl_site.inventories.via import Via
+
+class TestMetricScales(TestCase):
+    """ Inventory metric scales cover every possible metric value """
+
+    def test_metrics_within_scale(self):
+        """ Metrics computed from random answers lie within their scale """
+
+        for inventory_cls in numeric_inventory_cls_list:
+            inventory = inventory_cls()
+
+            for i in range(50):
+                inventory.answers = get_answers(inventory_cls.__name__)
+                inventory.compute_metrics()
+
+                for key, value in inventory.metrics.items():
+                    minimum, maximum, width = inventory_cls.get_metric_scale(key)
+                    self.assertGreaterEqual(value, minimum)
+                    self.assertLessEqual(value, maximum)
+
+    def test_key_scales(self):
+        """ Keys may have their own scale """
+
+        self.assertEqual((0, 9, 1), FiroB.get_metric_scale('wanted_control'))
+        self.assertEqual((0, 54, 6), FiroB.get_metric_scale('social_interaction_index'))
+        self.assertEqual(10, bin_count(FiroB.get_metric_scale('wanted_control')))
+
+class TestHistograms(TestCase):
+    """ Test case for histogram statistics """
+
+    def setUp(self):
+        """ Create a session with submissions """
+
+        self.admin = Factory.create_admin()
+        self.org = Factory.create_organization(self.admin)
+        self.session = Factory.create_session(self.org, self.admin)
+        self.sessions = [self.session]
+
+        for i in range(5):
+            user, info = Factory.create_user(self.session)
+            Factory.create_set_of_submissions(user)
+
+    def test_metric_bins(self):
+        """ Every metric is counted in the bin containing its value """
+
+        bins = metric_bins(self.sessions)
+
+        for metric in Metric.objects.exclude(submission__inventory_id=Via.inventory_id):
+            inventory_id = metric.submission.inventory_id
+            self.assertIn((inventory_id, metric.key), bins)
+
+        for (inventory_id, key), counts in bins.items():
+            metrics = Metric.objects.filter(submission__inventory_id=inventory_id, metric_key__key=key)
+            self.assertEqual(metrics.count(), sum(counts))
+
+            inventory = numeric_inventory_cls_list[inventory_id]
+            minimum, maximum, width = inventory.get_metric_scale(key)
+            for metric in metrics:
+                index = min(int((metric.value - minimum) // width), len(counts) - 1)
+                self.assertGreater(counts[index], 0)
+
+    def test_signature_strengths(self):
+        """ Signature strengths match the counts of format_graph_data """
+
+        data = format_graph_data(generate_data_from_sessions(self.sessions, self.admin))
+        via = [inventory for inventory in data if inventory['inventory'] == Via.name][0]
+        expected = {point['key']: point['value'] for point in via['data']}
+
+        self.assertEqual(expected, signature_strength_counts(self.sessions))
+        self.assertEqual(5 * Via.n_signature, sum(expected.values()))
+
+    def test_generate_histogram_data(self):
+        """ Histogram data has the format of the graph data """
+
+        histograms = generate_histogram_data(self.sessions, self.admin)
+        graphs = format_graph_data(generate_data_from_sessions(self.sessions, self.admin))
+
+        self.assertEqual(
+            [inventory['inventory'] for inventory in graphs],
+            [inventory['inventory'] for inventory in histograms]
+        )
+
+        for histogram, graph in zip(histograms, graphs):
+            self.assertEqual(graph['count'], histogram['count'])
+            self.assertEqual(len(graph.get('analysis', [])), len(histogram.get('analysis', [])))
+
+            if (histogram['inventory'] == Via.name):
+                self.assertNotIn('histogram', histogram)
+            else:
+                self.assertTrue(histogram['histogram'])
+                self.assertEqual(
+                    len(graph['data']),
+                    sum(point['value'] for point in histogram['data'])
+                )
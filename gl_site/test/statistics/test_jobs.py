@@ -0,0 +1,282 @@
+# Job functions
+from gl_site.statistics import export, jobs
+from gl_site.statistics.data_generation import format_file_data, generate_data_from_sessions
+
+# Test imports
+from django.test import TestCase
+from django.core.management import call_command
+from gl_site.test.factory import Factory
+
+# Models
+from gl_site.models import ExportJob
+from gl_site.db import large_objects
+from django.utils import timezone
+
+# IO
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+from zipfile import ZipFile
+import json
+
+class TestExportJobs(TestCase):
+    """ Test case for background statistics exports """
+
+    def setUp(self):
+        """ Create a staff user and a session with submissions """
+
+        self.user, self.info = Factory.create_user()
+        self.user.is_staff = True
+        self.user.save()
+
+        Factory.create_set_of_submissions(self.user)
+        for i in range(2):
+            user, info = Factory.create_user(self.info.session)
+            Factory.create_set_of_submissions(user)
+
+    def create_job(self, file_type):
+        """ Queue an export of the user's session """
+        return ExportJob.objects.create(
+            user=self.user,
+            organization=self.info.organization,
+            session=self.info.session,
+            file_type=file_type
+        )
+
+    def run_job(self, job):
+        """ Claim and run a job, returning it reloaded """
+        self.assertEqual([job.id], jobs.claim(1))
+        jobs.run(job.id)
+        return ExportJob.objects.get(id=job.id)
+
+    def content(self, job):
+        """ The file generated by a job """
+        return b''.join(jobs.iter_content(job))
+
+    def test_claim(self):
+        """ Pending jobs are claimed once, oldest first """
+
+        first = self.create_job('text/csv')
+        second = self.create_job('text/csv')
+
+        self.assertEqual([first.id], jobs.claim(1))
+        self.assertEqual([second.id], jobs.claim(5))
+        self.assertEqual([], jobs.claim(5))
+
+        self.assertEqual(ExportJob.RUNNING, ExportJob.objects.get(id=first.id).status)
+
+    def test_csv(self):
+        """ CSV exports have a header and one line per user """
+
+        job = self.run_job(self.create_job('text/csv'))
+
+        self.assertEqual(ExportJob.COMPLETE, job.status)
+        self.assertEqual(100, job.progress())
+        self.assertEqual(3, job.processed)
+        self.assertEqual(3, job.total)
+        self.assertEqual(4, len(self.content(job).decode().splitlines()))
+
+    def test_ndjson(self):
+        """ Newline delimited JSON exports have one line per user """
+
+        job = self.run_job(self.create_job('application/x-ndjson'))
+
+        lines = self.content(job).decode().splitlines()
+        self.assertEqual(3, len(lines))
+        self.assertEqual(self.info.session.name, json.loads(lines[0])['session'])
+
+    def test_xlsx(self):
+        """ Excel exports are complete workbooks """
+
+        job = self.run_job(self.create_job('application/xlsx'))
+
+        with ZipFile(BytesIO(self.content(job))) as workbook:
+            sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+
+        self.assertEqual(4, sheet.count('<row '))
+
+    def test_json(self):
+        """ JSON exports hold the file data of every user """
+
+        job = self.run_job(self.create_job('application/json'))
+
+        expected = format_file_data(generate_data_from_sessions([self.info.session], self.user))
+        key = lambda user: json.dumps(user, sort_keys=True)
+        self.assertEqual(
+            sorted(expected, key=key),
+            sorted(json.loads(self.content(job).decode()), key=key)
+        )
+
+        # One chunk per user, then the closing bracket
+        with mock.patch.object(large_objects, 'write') as write:
+            job = self.run_job(self.create_job('application/json'))
+
+        chunks = list(write.call_args[0][1])
+        self.assertEqual(4, len(chunks))
+        self.assertEqual(3, len(json.loads(b''.join(chunks).decode())))
+
+    def test_empty_json(self):
+        """ JSON exports without users are empty lists """
+
+        self.assertEqual([], list(export.iter_users([])))
+        self.assertEqual('[]', ''.join(export.iter_json([])))
+
+    def test_progress(self):
+        """ Progress is recorded while users are written """
+
+        job = self.create_job('text/csv')
+        job.total = 3
+        job.save()
+
+        with mock.patch.object(jobs, 'PROGRESS_INTERVAL', 2):
+            users = jobs.track_progress(job.id, iter(range(3)))
+
+            next(users)
+            next(users)
+            next(users)
+            job.refresh_from_db()
+            self.assertEqual(2, job.processed)
+            self.assertEqual(66, job.progress())
+
+            self.assertEqual([], list(users))
+            job.refresh_from_db()
+            self.assertEqual(3, job.processed)
+
+    def test_failed(self):
+        """ Errors are recorded in the job """
+
+        job = self.create_job('text/csv')
+
+        def fail(job):
+            # The partial file exists until the job fails
+            self.oid = ExportJob.objects.get(id=job.id).content_oid
+            raise ValueError('broken')
+
+        with mock.patch.object(jobs, 'generate', side_effect=fail):
+            with self.assertLogs(jobs.logger, 'ERROR'):
+                job = self.run_job(job)
+
+        self.assertEqual(ExportJob.FAILED, job.status)
+        self.assertEqual('broken', job.error)
+        self.assertIsNone(job.content_oid)
+        self.assertFalse(large_objects.exists(self.oid))
+
+    def test_lease(self):
+        """ Claiming leases the job and the heartbeat renews the lease """
+
+        job = self.create_job('text/csv')
+        jobs.claim(1)
+
+        job.refresh_from_db()
+        self.assertEqual(1, job.attempts)
+        self.assertIsNotNone(job.heartbeat)
+
+        claimed = job.heartbeat
+        stop = mock.Mock(wait=mock.Mock(side_effect=[False, True]))
+        with mock.patch.object(jobs.connection, 'close'):
+            jobs.heartbeat(job.id, 1, stop)
+
+        job.refresh_from_db()
+        self.assertGreater(job.heartbeat, claimed)
+
+    def test_requeue_stale(self):
+        """ Jobs whose worker stopped are requeued, then fail """
+
+        job = self.create_job('text/csv')
+        jobs.claim(1)
+
+        # The lease is still valid
+        self.assertEqual(0, jobs.requeue_stale())
+
+        for attempt in range(1, jobs.MAX_ATTEMPTS):
+            # A partial file was written when the worker stopped
+            oid = large_objects.create()
+            ExportJob.objects.update(
+                heartbeat=timezone.now() - 2 * jobs.LEASE_TIMEOUT,
+                processed=10,
+                content_oid=oid
+            )
+            self.assertEqual(1, jobs.requeue_stale())
+
+            job.refresh_from_db()
+            self.assertEqual(ExportJob.PENDING, job.status)
+            self.assertEqual(0, job.processed)
+            self.assertIsNone(job.content_oid)
+            self.assertFalse(large_objects.exists(oid))
+            self.assertEqual([job.id], jobs.claim(1))
+
+        ExportJob.objects.update(heartbeat=timezone.now() - 2 * jobs.LEASE_TIMEOUT)
+        self.assertEqual(0, jobs.requeue_stale())
+
+        job.refresh_from_db()
+        self.assertEqual(ExportJob.FAILED, job.status)
+        self.assertEqual(jobs.WORKER_STOPPED, job.error)
+        self.assertIsNotNone(job.finished)
+
+    def test_timed_out(self):
+        """ Jobs unfinished after the timeout fail """
+
+        pending = self.create_job('text/csv')
+        recent = self.create_job('text/csv')
+        ExportJob.objects.filter(id=pending.id).update(created=timezone.now() - 2 * jobs.JOB_TIMEOUT)
+
+        jobs.requeue_stale()
+
+        pending.refresh_from_db()
+        self.assertEqual(ExportJob.FAILED, pending.status)
+        self.assertEqual(jobs.TIMED_OUT, pending.error)
+        self.assertEqual(ExportJob.PENDING, ExportJob.objects.get(id=recent.id).status)
+
+    def test_lease_lost(self):
+        """ A worker whose job was requeued doesn't finish it """
+
+        job = self.create_job('text/csv')
+        jobs.claim(1)
+
+        def requeue(job):
+            jobs.release(ExportJob.objects.all(), status=ExportJob.PENDING)
+            return []
+
+        with mock.patch.object(jobs, 'generate', side_effect=requeue):
+            with self.assertLogs(jobs.logger, 'WARNING'):
+                jobs.run(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(ExportJob.PENDING, job.status)
+        self.assertIsNone(job.content_oid)
+
+    def test_delete_expired(self):
+        """ Jobs are deleted once they have been finished long enough """
+
+        old = self.create_job('text/csv')
+        old.status = ExportJob.COMPLETE
+        old.finished = timezone.now() - timedelta(days=2)
+        old.save()
+
+        recent = self.run_job(self.create_job('text/csv'))
+        pending = self.create_job('text/csv')
+
+        jobs.delete_expired(timedelta(days=1))
+
+        self.assertEqual(
+            {recent.id, pending.id},
+            set(ExportJob.objects.values_list('id', flat=True))
+        )
+
+        # Files are deleted with their jobs
+        oid = recent.content_oid
+        self.assertTrue(large_objects.exists(oid))
+        jobs.delete_expired(timedelta(0))
+        self.assertFalse(large_objects.exists(oid))
+
+    def test_command(self):
+        """ The worker command runs every pending job """
+
+        first = self.create_job('text/csv')
+        second = self.create_job('application/json')
+
+        output = StringIO()
+        call_command('run_export_workers', processes=0, once=True, stdout=output)
+
+        self.assertEqual(2, ExportJob.objects.filter(status=ExportJob.COMPLETE).count())
+        self.assertIn('Started export job {}'.format(second.id), output.getvalue())
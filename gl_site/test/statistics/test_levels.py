@@ -0,0 +1,122 @@
+# Level functions
+from gl_site.statistics.levels import (
+    ALL, ALL_LABEL, ORGANIZATION, SESSION, generate_level_data, level_statistics
+)
+from gl_site.statistics.data_generation import NO_DATA
+
+# Test imports
+from django.test import TestCase
+from gl_site.test.factory import Factory
+
+# Models
+from gl_site.models import Metric
+from django.db.models import Avg, Count, Max, Min, StdDev
+
+# Inventories
+from gl_site.inventories.big_five import BigFive
+from gl_site.inventories.core_self import CoreSelf
+from gl_site.inventories.via import Via
+
+class TestLevels(TestCase):
+    """ Test case for multi level statistics """
+
+    def setUp(self):
+        """ Create two organizations, one with two sessions """
+
+        self.admin = Factory.create_admin()
+        self.org = Factory.create_organization(self.admin)
+        self.session = Factory.create_session(self.org, self.admin)
+        self.other_session = Factory.create_session(self.org, self.admin)
+        self.other_org = Factory.create_organization(self.admin)
+
+        for session, n_users in (
+            (self.session, 2),
+            (self.other_session, 3),
+            (Factory.create_session(self.other_org, self.admin), 4)
+        ):
+            for i in range(n_users):
+                user, info = Factory.create_user(session)
+                Factory.create_set_of_submissions(user, [BigFive, CoreSelf, Via])
+
+    def expected(self, level, inventory_id, key):
+        """ Statistics of a level aggregated directly """
+
+        metrics = Metric.objects.filter(
+            submission__user__leaduserinfo__isnull=False,
+            submission__inventory_id=inventory_id,
+            metric_key__key=key
+        )
+        if (level == ORGANIZATION):
+            metrics = metrics.filter(submission__user__leaduserinfo__organization=self.org)
+        elif (level == SESSION):
+            metrics = metrics.filter(submission__user__leaduserinfo__session=self.session)
+
+        return metrics.aggregate(
+            count=Count('value'),
+            mean=Avg('value'),
+            standard_deviation=StdDev('value'),
+            min=Min('value'),
+            max=Max('value')
+        )
+
+    def assert_statistics(self, statistics):
+        """ Verify every level of every key """
+
+        keys = Metric.objects.exclude(
+            submission__inventory_id=Via.inventory_id
+        ).values_list('submission__inventory_id', 'metric_key__key').distinct()
+
+        self.assertEqual(
+            {(level, inventory_id, key) for level in (ALL, ORGANIZATION, SESSION) for inventory_id, key in keys},
+            set(statistics)
+        )
+
+        for (level, inventory_id, key), values in statistics.items():
+            expected = self.expected(level, inventory_id, key)
+            self.assertEqual(expected['count'], values['count'])
+            for field in ('mean', 'standard_deviation', 'min', 'max'):
+                self.assertAlmostEqual(expected[field], values[field])
+
+    def test_in_database(self):
+        """ The GROUPING SETS query computes every level in one query """
+
+        with self.assertNumQueries(1):
+            statistics = level_statistics(self.org, self.session, [Via.inventory_id], in_database=True)
+
+        self.assert_statistics(statistics)
+
+    def test_fallback(self):
+        """ The fallback computes every level in one query """
+
+        with self.assertNumQueries(1):
+            statistics = level_statistics(self.org, self.session, [Via.inventory_id], in_database=False)
+
+        self.assert_statistics(statistics)
+
+    def test_organization_only(self):
+        """ Without a session only the organization and all levels exist """
+
+        for in_database in (True, False):
+            statistics = level_statistics(self.org, None, [Via.inventory_id], in_database)
+            self.assertEqual({ALL, ORGANIZATION}, {level for level, inventory_id, key in statistics})
+
+    def test_generate_level_data(self):
+        """ Level data overlays the session, organization and program """
+
+        data = generate_level_data(None, self.session)
+
+        self.assertEqual([BigFive.name, CoreSelf.name], [inventory['inventory'] for inventory in data])
+        for inventory in data:
+            self.assertEqual([ALL_LABEL, self.org.name, self.session.name], inventory['levels'])
+            self.assertEqual(2, inventory['count'])
+
+            names = [point['name'] for point in inventory['data']]
+            self.assertEqual(len(inventory['data']) // 3, names.count(self.session.name))
+
+    def test_no_data(self):
+        """ No data raises a LookupError """
+
+        Metric.objects.all().delete()
+
+        with self.assertRaisesMessage(LookupError, NO_DATA):
+            generate_level_data(self.org, None)
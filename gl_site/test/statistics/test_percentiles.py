@@ -0,0 +1,97 @@
+# Percentile functions
+from gl_site.statistics.percentiles import PERCENTILES, metric_percentiles
+from gl_site.statistics.data_generation import generate_data_from_sessions, format_graph_data
+
+# Test imports
+from django.test import TestCase
+from gl_site.test.factory import Factory
+
+# Models
+from gl_site.models import Metric
+
+# Inventories
+from gl_site.inventories.via import Via
+
+# Expected values
+import numpy
+
+class TestPercentiles(TestCase):
+    """ Test case for metric percentiles """
+
+    def setUp(self):
+        """ Create two sessions with submissions """
+
+        self.admin = Factory.create_admin()
+        self.org = Factory.create_organization(self.admin)
+        self.sessions = [
+            Factory.create_session(self.org, self.admin),
+            Factory.create_session(self.org, self.admin)
+        ]
+
+        for session in self.sessions:
+            for i in range(4):
+                user, info = Factory.create_user(session)
+                Factory.create_set_of_submissions(user)
+
+    def expected(self, inventory_id, key):
+        """ Percentiles of a metric computed by NumPy """
+        values = Metric.objects.filter(
+            submission__inventory_id=inventory_id,
+            metric_key__key=key
+        ).values_list('value', flat=True)
+
+        return numpy.percentile(
+            list(values),
+            [fraction * 100 for name, fraction in PERCENTILES]
+        )
+
+    def assert_percentiles(self, percentiles):
+        """ Verify percentiles against NumPy """
+
+        metrics = Metric.objects.values_list('submission__inventory_id', 'metric_key__key').distinct()
+        self.assertEqual(set(metrics), set(percentiles))
+
+        for (inventory_id, key), values in percentiles.items():
+            expected = self.expected(inventory_id, key)
+            for (name, fraction), value in zip(PERCENTILES, expected):
+                self.assertAlmostEqual(value, values[name])
+
+    def test_in_database(self):
+        """ percentile_cont matches NumPy """
+        self.assert_percentiles(metric_percentiles(self.sessions, in_database=True))
+
+    def test_fallback(self):
+        """ The NumPy fallback matches NumPy """
+        self.assert_percentiles(metric_percentiles(self.sessions, in_database=False))
+
+    def test_fallback_query_count(self):
+        """ The fallback loads the values with a single query """
+        with self.assertNumQueries(1):
+            metric_percentiles(self.sessions, in_database=False)
+
+    def test_excludes(self):
+        """ Excluded inventories have no percentiles """
+
+        for in_database in (True, False):
+            percentiles = metric_percentiles(self.sessions, [Via.inventory_id], in_database)
+            self.assertTrue(percentiles)
+            self.assertNotIn(Via.inventory_id, {group[0] for group in percentiles})
+
+    def test_empty(self):
+        """ Sessions without metrics have no percentiles """
+
+        session = Factory.create_session(self.org, self.admin)
+
+        self.assertEqual({}, metric_percentiles([session], in_database=True))
+        self.assertEqual({}, metric_percentiles([session], in_database=False))
+
+    def test_graph_analysis(self):
+        """ Percentiles are shown in the analysis of the graph data """
+
+        data = format_graph_data(generate_data_from_sessions(self.sessions, self.admin))
+        names = [name for name, fraction in PERCENTILES]
+
+        for inventory in data:
+            for analysis in inventory.get('analysis', []):
+                types = [statistic['type'] for statistic in analysis]
+                self.assertEqual(names, types[4:])
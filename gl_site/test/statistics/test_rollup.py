@@ -0,0 +1,162 @@
+# Rollup functions
+from gl_site.statistics import rollup
+
+# Test imports
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from gl_site.test.factory import Factory
+
+# Models
+from gl_site.models import LeadUserInfo, Metric, MetricRollup, Submission
+
+# Inventories
+from gl_site.inventories.big_five import BigFive
+from gl_site.inventories.via import Via
+
+# IO
+from io import StringIO
+
+class TestRollup(TestCase):
+    """ Test case for the statistics rollup table """
+
+    def setUp(self):
+        """ Create two sessions with submissions """
+
+        self.admin = Factory.create_admin()
+        self.org = Factory.create_organization(self.admin)
+        self.session1 = Factory.create_session(self.org, self.admin)
+        self.session2 = Factory.create_session(self.org, self.admin)
+        self.sessions = [self.session1, self.session2]
+
+        for session in self.sessions:
+            for i in range(3):
+                user, info = Factory.create_user(session)
+                Factory.create_set_of_submissions(user)
+
+    def test_rollup_updated_on_submission(self):
+        """ Saving metrics adds them to the rollup of the user's session """
+
+        user, info = Factory.create_user(self.session1)
+        Factory.create_submission(user, BigFive)
+
+        rollup_row = MetricRollup.objects.get(
+            session=self.session1,
+            inventory_id=BigFive.inventory_id,
+            key='openness'
+        )
+        values = Metric.objects.filter(
+            submission__user__leaduserinfo__session=self.session1,
+            submission__inventory_id=BigFive.inventory_id,
+            metric_key__key='openness'
+        ).values_list('value', flat=True)
+
+        self.assertEqual(rollup_row.count, 4)
+        self.assertAlmostEqual(rollup_row.sum, sum(values))
+        self.assertAlmostEqual(rollup_row.sum_of_squares, sum(v * v for v in values))
+        self.assertEqual(rollup_row.min, min(values))
+        self.assertEqual(rollup_row.max, max(values))
+
+    def test_admin_submission_skipped(self):
+        """ Users without a session are not added to any rollup """
+
+        count = MetricRollup.objects.count()
+        Factory.create_submission(self.admin, BigFive)
+
+        self.assertEqual(count, MetricRollup.objects.count())
+
+    def test_submission_counts_combine_sessions(self):
+        """ Submission counts are summed across sessions """
+
+        counts = rollup.submission_counts(self.sessions)
+
+        self.assertEqual(6, len(counts))
+        for row in counts:
+            correct_count = Submission.objects.filter(
+                inventory_id=row['inventory_id']
+            ).count()
+            self.assertEqual(row['count'], correct_count)
+
+    def test_metrics_analysis_excludes(self):
+        """ Excluded inventories are left out of the analysis """
+
+        analysis = rollup.metrics_analysis(self.sessions, [Via.inventory_id])
+
+        for row in analysis:
+            self.assertNotEqual(row['submission__inventory_id'], Via.inventory_id)
+
+    def test_refresh(self):
+        """ Refreshing recomputes the rows of the given sessions only """
+
+        MetricRollup.objects.all().update(count=0)
+        version = self.session1.data_version
+
+        rollup.refresh([self.session1], [BigFive.inventory_id])
+
+        mismatched = {(row[0], row[1]) for row in rollup.verify()}
+        self.assertNotIn((self.session1.id, BigFive.inventory_id), mismatched)
+        self.assertIn((self.session1.id, Via.inventory_id), mismatched)
+        self.assertIn((self.session2.id, BigFive.inventory_id), mismatched)
+
+        self.session1.refresh_from_db()
+        self.assertEqual(version + 1, self.session1.data_version)
+
+    def test_user_deleted(self):
+        """ Deleting a user removes their metrics from the rollup """
+
+        info = LeadUserInfo.objects.filter(session=self.session1).first()
+        info.user.delete()
+
+        self.assertEqual([], rollup.verify())
+        for row in rollup.submission_counts([self.session1]):
+            self.assertEqual(2, row['count'])
+
+    def test_submission_deleted(self):
+        """ Deleting a submission removes its metrics from the rollup """
+
+        Submission.objects.filter(
+            user__leaduserinfo__session=self.session1,
+            inventory_id=BigFive.inventory_id
+        ).first().delete()
+
+        self.assertEqual([], rollup.verify())
+        counts = {row['inventory_id']: row['count'] for row in rollup.submission_counts([self.session1])}
+        self.assertEqual(2, counts[BigFive.inventory_id])
+        self.assertEqual(3, counts[Via.inventory_id])
+
+    def test_user_moved(self):
+        """ Moving a user to another session moves their metrics """
+
+        info = LeadUserInfo.objects.filter(session=self.session1).first()
+        info.session = self.session2
+        info.save()
+
+        self.assertEqual([], rollup.verify())
+        counts = rollup.submission_counts([self.session1]) + rollup.submission_counts([self.session2])
+        self.assertEqual([2] * 6 + [4] * 6, [row['count'] for row in counts])
+
+        # Saves that keep the session leave the rollup alone
+        with self.assertNumQueries(2):
+            info.save()
+
+    def test_rebuild_and_verify(self):
+        """ Rebuilding recreates the rollups from the metrics """
+
+        MetricRollup.objects.all().update(count=0)
+        self.assertNotEqual([], rollup.verify())
+
+        expected = MetricRollup.objects.count()
+        self.assertEqual(expected, rollup.rebuild())
+        self.assertEqual([], rollup.verify())
+
+    def test_command(self):
+        """ The management command rebuilds and fails on mismatches """
+
+        MetricRollup.objects.all().delete()
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_statistics_rollup', verify_only=True,
+                stdout=StringIO(), stderr=StringIO())
+
+        call_command('rebuild_statistics_rollup', stdout=StringIO())
+        self.assertEqual([], rollup.verify())
@@ -0,0 +1,45 @@
+# Import test case
+from django.test import SimpleTestCase
+from unittest import mock, skipUnless
+
+# Hashers
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+from gl_site import hashers
+from gl_site.hashers import OffloadedPBKDF2PasswordHasher
+
+import threading
+
+try:
+    import gevent
+except ImportError:
+    gevent = None
+
+# Test case verifying the offloaded hasher
+class OffloadedHasherTest(SimpleTestCase):
+
+    def test_compatible(self):
+        """ Hashes verify with Django's hasher and the other way round """
+        offloaded = OffloadedPBKDF2PasswordHasher()
+        default = PBKDF2PasswordHasher()
+
+        encoded = offloaded.encode('password', 'salt')
+        self.assertEqual(default.encode('password', 'salt'), encoded)
+        self.assertTrue(default.verify('password', encoded))
+        self.assertTrue(offloaded.verify('password', default.encode('password', 'salt')))
+        self.assertFalse(offloaded.verify('incorrect', encoded))
+
+    def test_settings(self):
+        """ New passwords are hashed with the offloaded hasher """
+        with mock.patch.object(hashers, 'run_in_thread', wraps=hashers.run_in_thread) as run_in_thread:
+            encoded = make_password('password')
+            self.assertTrue(check_password('password', encoded))
+
+        self.assertEqual(2, run_in_thread.call_count)
+
+    @skipUnless(gevent, 'gevent is not installed')
+    def test_thread(self):
+        """ Under gevent the hashing runs in another thread """
+        with mock.patch.object(hashers, 'is_gevent_patched', return_value=True):
+            ident = hashers.run_in_thread(threading.get_ident)
+
+        self.assertNotEqual(threading.get_ident(), ident)
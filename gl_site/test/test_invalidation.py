@@ -0,0 +1,215 @@
+# Import test case
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.core.cache import caches
+from django.core.cache.backends.base import CacheKeyWarning
+from unittest import mock
+
+# Object factory
+from gl_site.test.factory import Factory
+
+# Invalidation
+from gl_site import invalidation, signals
+from gl_site.db.notify import Listener
+from gl_site.invalidation import TwoLevelCache
+from gl_site.config_models import ConfigVersion, DashboardText, SiteConfig
+from gl_site.inventories import BigFive
+from gl_site.models import Submission
+
+import time
+import warnings
+
+# Test case verifying the two level cache
+@mock.patch.object(invalidation, 'is_listening', return_value=True)
+class TwoLevelCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.topic = 'test_{}'.format(self.id())
+        self.loads = []
+        caches['default'].clear()
+
+    def tearDown(self):
+        del invalidation.handlers[self.topic]
+
+    def load(self, value='value'):
+        def load():
+            self.loads.append(value)
+            return value
+        return load
+
+    def test_cached(self, is_listening):
+        cache = TwoLevelCache(self.topic)
+
+        self.assertEqual('value', cache.get('key', self.load()))
+        self.assertEqual('value', cache.get('key', self.load()))
+        self.assertEqual(['value'], self.loads)
+
+    def test_not_shared(self, is_listening):
+        """ Without a shared cache each worker loads its own values """
+        cache = TwoLevelCache(self.topic)
+        other_worker = TwoLevelCache(self.topic)
+
+        cache.get('key', self.load())
+        other_worker.get('key', self.load())
+        self.assertEqual(['value', 'value'], self.loads)
+        self.assertIsNone(caches['default'].get(invalidation.token_key(self.topic)))
+
+    @override_settings(INVALIDATION_SHARED_CACHE='default')
+    def test_shared(self, is_listening):
+        """ Values loaded by one worker are shared with the others """
+        cache = TwoLevelCache(self.topic)
+        other_worker = TwoLevelCache(self.topic)
+
+        cache.get('key', self.load())
+        self.assertEqual('value', other_worker.get('key', self.load()))
+        self.assertEqual(['value'], self.loads)
+
+    @override_settings(INVALIDATION_SHARED_CACHE='default')
+    def test_shared_keys(self, is_listening):
+        """ Shared keys are valid memcached keys whatever the key """
+        cache = TwoLevelCache(self.topic, version=lambda: 3)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            cache.get('base url', self.load())
+
+        key = cache.shared_key(caches['default'], (3, 'base url'))
+        self.assertRegex(key, r'^[\x21-\x7e]+$')
+        self.assertEqual('value', caches['default'].get(key))
+
+    def test_notified(self, is_listening):
+        """ Notifications evict the values """
+        cache = TwoLevelCache(self.topic)
+        cache.get('key', self.load('old'))
+
+        invalidation.handle(self.topic)
+        self.assertEqual('new', cache.get('key', self.load('new')))
+
+        invalidation.handle('{}:key'.format(self.topic))
+        self.assertEqual('newer', cache.get('key', self.load('newer')))
+
+    @override_settings(INVALIDATION_SHARED_CACHE='default')
+    @mock.patch.object(invalidation, 'notify')
+    def test_publish(self, notify, is_listening):
+        """ Only publishing replaces the token of the shared cache """
+        cache = TwoLevelCache(self.topic)
+        other_worker = TwoLevelCache(self.topic)
+        cache.get('key', self.load('old'))
+        token = caches['default'].get(invalidation.token_key(self.topic))
+
+        # Notified workers evict their own values only
+        invalidation.handle(self.topic)
+        invalidation.dispatch_all()
+        self.assertEqual(token, caches['default'].get(invalidation.token_key(self.topic)))
+        self.assertEqual('old', cache.get('key', self.load('new')))
+
+        invalidation.publish(self.topic)
+        notify.assert_called_once_with(invalidation.CHANNEL, self.topic)
+        self.assertNotEqual(token, caches['default'].get(invalidation.token_key(self.topic)))
+
+        self.assertEqual('new', cache.get('key', self.load('new')))
+        self.assertEqual('new', other_worker.get('key', self.load('newer')))
+
+    def test_evicted_while_loading(self, is_listening):
+        """ Values loaded while the cache is evicted are not kept """
+        cache = TwoLevelCache(self.topic)
+
+        def load():
+            invalidation.handle(self.topic)
+            return 'stale'
+
+        self.assertEqual('stale', cache.get('key', load))
+        self.assertEqual('fresh', cache.get('key', self.load('fresh')))
+
+    def test_lru(self, is_listening):
+        cache = TwoLevelCache(self.topic, maxsize=2)
+
+        cache.get('first', self.load())
+        cache.get('second', self.load())
+        cache.get('first', self.load())
+        cache.get('third', self.load())
+
+        self.assertEqual(['first', 'third'], list(cache.local))
+
+    def test_not_listening(self, is_listening):
+        """ Without the listener nothing would evict the values """
+        is_listening.return_value = False
+        cache = TwoLevelCache(self.topic)
+
+        cache.get('key', self.load())
+        cache.get('key', self.load())
+        self.assertEqual(['value', 'value'], self.loads)
+
+    def test_version(self, is_listening):
+        """ Versioned values are cached until the version changes,
+            whether or not the process is listening
+        """
+        is_listening.return_value = False
+        version = mock.Mock(return_value=1)
+        cache = TwoLevelCache(self.topic, version=version)
+
+        cache.get('key', self.load('old'))
+        self.assertEqual('old', cache.get('key', self.load('new')))
+
+        version.return_value = 2
+        self.assertEqual('new', cache.get('key', self.load('new')))
+        self.assertEqual(['old', 'new'], self.loads)
+
+# Test case verifying that published topics reach the
+# listener. Runs outside a transaction, which would
+# hold the notifications back.
+class PublishTest(SimpleTestCase):
+    allow_database_queries = True
+
+    def test_publish(self):
+        received = []
+        invalidation.subscribe('test_publish', received.append)
+        self.addCleanup(invalidation.handlers.pop, 'test_publish')
+
+        listener = Listener(invalidation.CHANNEL, invalidation.handle)
+        listener.start()
+        self.addCleanup(listener.stop)
+
+        deadline = time.monotonic() + 5
+        while not listener.listening and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        invalidation.publish('test_publish', 1)
+
+        # Once at once, once on commit, once notified
+        while len(received) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(['1', '1', '1'], [str(key) for key in received])
+
+# Test case verifying the models that publish changes
+@mock.patch.object(signals, 'publish')
+class SignalsTest(TestCase):
+
+    def test_models(self, publish):
+        text = DashboardText.objects.get()
+        text.save()
+        publish.assert_called_with('dashboard_text', text.id)
+
+        config = SiteConfig.objects.create(base_url='http://testserver')
+        publish.assert_called_with('site_config', config.id)
+
+    def test_unsubscribed_models(self, publish):
+        """ Nothing caches these models, so they aren't published """
+        user, info = Factory.create_user()
+
+        submission = Submission.objects.create(user=user, inventory_id=BigFive.inventory_id, current_page=0)
+        submission.current_page = None
+        submission.save()
+
+        info.delete()
+        info.session.delete()
+        publish.assert_not_called()
+
+    def test_config_version(self, publish):
+        """ Saving the configuration bumps its version """
+        version = ConfigVersion.current()
+
+        text = DashboardText.objects.get()
+        text.save()
+
+        self.assertEqual(version + 1, ConfigVersion.current())
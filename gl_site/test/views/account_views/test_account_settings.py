@@ -28,6 +28,19 @@ class TestAccountSettings(TestCase, AccountFormValidator):
         self.organization = self.info.organization
         self.session = self.info.session
 
+    def testQueryCount(self):
+        """ Account Settings - Query count.
+            The session and the user with their organization and
+            session are the only queries made to show the page.
+        """
+        self.client.login(username = self.user.username, password = Factory.default_password)
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/account-settings')
+
+        self.assertEqual(response.context['organization'], self.organization)
+        self.assertEqual(response.context['session'], self.session)
+
     def testLoginRequired(self):
         """ Account Settings - Log in required.
             Verify that the user cannot navigate to this page
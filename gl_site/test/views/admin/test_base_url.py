@@ -19,3 +19,6 @@ class TestBaseURL(TestCase):
 
             site_config = query[0]
             self.assertEqual(site_config.base_url, 'http://' + host_name)
+
+            # The cached base url is invalidated
+            self.assertEqual(SiteConfig.cached_base_url(), 'http://' + host_name)
@@ -30,6 +30,16 @@ class testInventoryViews_ReviewInventory(TestCase):
                 '10': '1',
             }, follow = True)
 
+    def testQueryCount(self):
+        """
+        Verify the review page loads the session, the user,
+        the submission and its metrics
+        """
+        with self.assertNumQueries(4):
+            response = self.client.get('/inventory/review/0')
+
+        self.assertEqual(response.status_code, 200)
+
     def testLoginRequired(self):
         """
         Verify must be logged in to
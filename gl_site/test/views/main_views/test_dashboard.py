@@ -4,6 +4,20 @@ from django.test import TestCase
 # Object factory
 from gl_site.test.factory import Factory
 
+# Models and inventories
+from gl_site.models import Submission
+from gl_site.config_models import ConfigVersion, DashboardText
+from django.db.models import F
+
+# Cache invalidation
+from gl_site import invalidation
+from gl_site.inventories import BigFive, FiroB, Via
+
+# Queries made by loading the dashboard: the session, the user with
+# their LeadUserInfo, the user's submissions and the configuration
+# version, once the dashboard text is cached.
+DASHBOARD_QUERIES = 4
+
 class TestDashboard(TestCase):
     """ Test class for the dashboard view """
 
@@ -39,3 +53,70 @@ class TestDashboard(TestCase):
         self.assertTrue('inventories' in response.context)
         self.assertEquals(len(response.context['inventories']), 6)
         self.assertTrue('quotes' in response.context)
+
+    def testQueryCount(self):
+        """ The dashboard takes the same queries however many inventories are started """
+
+        self.client.login(username = self.user.username, password = Factory.default_password)
+        self.client.get('/')
+
+        with self.assertNumQueries(DASHBOARD_QUERIES):
+            self.client.get('/')
+
+        Factory.create_set_of_submissions(self.user)
+
+        with self.assertNumQueries(DASHBOARD_QUERIES):
+            self.client.get('/')
+
+    def testProgress(self):
+        """ Started inventories show their completion and current page """
+
+        Factory.create_submission(self.user, BigFive)
+        Submission.objects.create(user = self.user, inventory_id = Via.inventory_id, current_page = 1)
+        Submission.objects.create(user = self.user, inventory_id = FiroB.inventory_id, current_page = 2)
+
+        self.client.login(username = self.user.username, password = Factory.default_password)
+        response = self.client.get('/')
+
+        entries = {entry['inventory_id']: entry for entry in response.context['inventories']}
+
+        big_five = entries[BigFive.inventory_id]
+        self.assertTrue(big_five['is_complete'])
+        self.assertTrue(big_five['is_started'])
+
+        via = entries[Via.inventory_id]
+        self.assertFalse(via['is_complete'])
+        self.assertTrue(via['is_started'])
+        self.assertEqual(2, via['page'])
+
+        not_started = [entry for entry in entries.values() if not entry['is_started']]
+        self.assertEqual(3, len(not_started))
+        for entry in not_started:
+            self.assertFalse(entry['is_complete'])
+
+        self.assertContains(response, 'page 2 of {}'.format(Via().n_pages))
+        self.assertContains(response, 'page 3 of {}'.format(FiroB().n_pages))
+
+    def testTextCached(self):
+        """ The dashboard text is cached until the configuration version changes """
+
+        self.client.login(username = self.user.username, password = Factory.default_password)
+        self.client.get('/')
+
+        DashboardText.objects.update(about_panel_title = 'Changed title')
+        self.assertNotContains(self.client.get('/'), 'Changed title')
+
+        # Another worker bumping the version is seen by the next request,
+        # before its notification arrives
+        ConfigVersion.objects.update(version = F('version') + 1)
+        self.assertContains(self.client.get('/'), 'Changed title')
+
+        # Saving in this process
+        text = DashboardText.objects.get()
+        text.about_panel_title = 'Saved title'
+        text.save()
+        self.assertContains(self.client.get('/'), 'Saved title')
+
+        # Notifications evict the old values
+        invalidation.handle('dashboard_text:1')
+        self.assertContains(self.client.get('/'), 'Saved title')
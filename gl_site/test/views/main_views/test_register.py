@@ -1,5 +1,6 @@
 # Import test case
 from django.test import TestCase
+from unittest import mock
 
 # Import user for authentication
 from django.contrib.auth.models import User
@@ -10,6 +11,9 @@ from gl_site.test.factory import Factory
 # Import use info for testing account creation
 from gl_site.models import LeadUserInfo
 
+# Password hashing
+from gl_site import hashers
+
 # Regex parser
 import re
 
@@ -304,3 +308,24 @@ class TestRegister(TestCase, AccountFormValidator):
 
         # Verify the user is redirected to the dashboard
         self.assertTemplateUsed(response, 'dashboard.html')
+
+    def testPasswordHashedOnce(self):
+        """
+        Verify that registration hashes the password
+        once and still logs the new user in
+        """
+
+        # Get the POST dict
+        registration_form = Factory.create_user_registration_post_dict(self.organization)
+
+        # Make the post request, counting hashes
+        with mock.patch.object(hashers, 'run_in_thread', wraps=hashers.run_in_thread) as run_in_thread:
+            response = self.client.post('/register/{}'.format(self.info.session.uuid),
+                registration_form, follow = True)
+
+        self.assertEqual(run_in_thread.call_count, 1)
+
+        # Verify the user is logged in with the registered password
+        self.assertTrue(response.context['user'].is_authenticated)
+        self.assertEqual(response.context['user'].username, registration_form['username'])
+        self.assertTrue(response.context['user'].check_password(registration_form['password1']))
@@ -0,0 +1,51 @@
+# Import test case
+from django.test import TestCase
+
+# Object factory
+from gl_site.test.factory import Factory
+
+class TestUserContext(TestCase):
+    """ Test case for gl_site.middleware.UserContextMiddleware """
+
+    def setUp(self):
+        """ Create an account and log in """
+        self.user, self.info = Factory.create_user()
+        self.client.login(username = self.user.username, password = Factory.default_password)
+
+    def testContextLoadedWithUser(self):
+        """
+        The user, their LeadUserInfo, organization and session
+        are loaded by a single query after the session
+        """
+        with self.assertNumQueries(2):
+            response = self.client.get('/account-settings')
+
+        user = response.context['user']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.info.id, user.leaduserinfo.id)
+            self.assertEqual(self.info.organization.name, user.leaduserinfo.organization.name)
+            self.assertEqual(self.info.session.name, user.leaduserinfo.session.name)
+
+    def testLogoutRequired(self):
+        """ Logged in users are redirected from the login page """
+        with self.assertNumQueries(2):
+            response = self.client.get('/login')
+
+        self.assertRedirects(response, '/')
+
+    def testPasswordChanged(self):
+        """ Changing the password ends other sessions """
+        self.user.set_password('another password')
+        self.user.save()
+
+        response = self.client.get('/', follow = True)
+        self.assertRedirects(response, '/login')
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def testInactiveUser(self):
+        """ Deactivated users are logged out """
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get('/', follow = True)
+        self.assertRedirects(response, '/login')
@@ -0,0 +1,144 @@
+# Import test case
+from django.test import TestCase
+
+# Object factory
+from gl_site.test.factory import Factory
+
+# Views and exports
+from gl_site.statistics import views as stats
+from gl_site.statistics import export
+
+# Excel
+from xlsxwriter.utility import xl_col_to_name
+
+# IO
+from io import BytesIO, StringIO
+from zipfile import ZipFile
+import csv
+import json
+
+class TestDownloadData(TestCase):
+    """ Test for the download data view """
+
+    def setUp(self):
+        """ Set up a staff user and a session with submissions """
+
+        self.user, self.info = Factory.create_user()
+        self.user.is_staff = True
+        self.user.save()
+
+        Factory.create_set_of_submissions(self.user)
+        for i in range(2):
+            user, info = Factory.create_user(self.info.session)
+            Factory.create_set_of_submissions(user)
+
+        # Login
+        self.client.login(username=self.user.username, password=Factory.default_password)
+
+        self.data = {
+            'organization': self.info.organization.id,
+            'session': self.info.session.id
+        }
+
+    def get_sheet(self, response):
+        """ Return the worksheet XML of a streamed workbook """
+        content = b''.join(response.streaming_content)
+        with ZipFile(BytesIO(content)) as workbook:
+            return workbook.read('xl/worksheets/sheet1.xml').decode()
+
+    def test_xlsx(self):
+        """ The workbook has a header row and one row per user """
+
+        self.data['file_type'] = 'application/xlsx'
+        response = self.client.get('/statistics/download_data', self.data)
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/xlsx', response['Content-Type'])
+        self.assertIn('statistics.xlsx', response['Content-Disposition'])
+
+        sheet = self.get_sheet(response)
+        self.assertEqual(4, sheet.count('<row '))
+
+        # Every metric column has a header
+        n_columns = len(export.HEADERS) + len(export.metric_columns())
+        last_column = xl_col_to_name(n_columns - 1)
+        self.assertIn('r="{}1"'.format(last_column), sheet)
+
+    def test_xlsx_no_data(self):
+        """ Users who may not view the data receive only the headers """
+
+        self.user.is_staff = False
+        self.user.save()
+
+        self.data['file_type'] = 'application/xlsx'
+        response = self.client.get('/statistics/download_data', self.data)
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, self.get_sheet(response).count('<row '))
+
+    def test_json(self):
+        """ The JSON export contains one entry per user """
+
+        self.data['file_type'] = 'application/json'
+        response = self.client.get('/statistics/download_data', self.data)
+
+        self.assertEqual(200, response.status_code)
+        data = json.loads(response.content.decode())
+        self.assertEqual(3, len(data))
+
+    def test_ndjson(self):
+        """ The NDJSON export streams one JSON object per user """
+
+        self.data['file_type'] = 'application/x-ndjson'
+        response = self.client.get('/statistics/download_data', self.data)
+
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.streaming)
+        self.assertIn('statistics.ndjson', response['Content-Disposition'])
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(3, len(lines))
+
+        # Lines match the entries of the JSON export
+        self.data['file_type'] = 'application/json'
+        response = self.client.get('/statistics/download_data', self.data)
+        expected = json.loads(response.content.decode())
+
+        self.assertCountEqual(expected, [json.loads(line) for line in lines])
+
+    def test_csv(self):
+        """ The CSV export streams a header and one line per user """
+
+        self.data['file_type'] = 'text/csv'
+        response = self.client.get('/statistics/download_data', self.data)
+
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.streaming)
+        self.assertIn('statistics.csv', response['Content-Disposition'])
+
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.reader(StringIO(content)))
+
+        self.assertEqual(4, len(rows))
+        self.assertEqual(list(export.HEADERS), rows[0][:len(export.HEADERS)])
+        for row in rows:
+            self.assertEqual(len(export.HEADERS) + len(export.metric_columns()), len(row))
+
+    def test_forbidden(self):
+        """ Bad selections respond as forbidden """
+
+        self.data['file_type'] = 'application/pdf'
+        response = self.client.get('/statistics/download_data', self.data)
+
+        self.assertEqual(stats.FORBIDDEN, response.status_code)
+
+    def test_iter_users(self):
+        """ Each user's metrics are grouped into a single entry """
+
+        users = list(export.iter_users([self.info.session]))
+
+        self.assertEqual(3, len(users))
+        for organization, session, metrics in users:
+            self.assertEqual(self.info.organization.name, organization)
+            self.assertEqual(self.info.session.name, session)
+            self.assertEqual(6, len(metrics))
@@ -0,0 +1,156 @@
+# Import test case
+from django.test import TestCase
+
+# Object factory
+from gl_site.test.factory import Factory
+
+# Views and jobs
+from gl_site.statistics import views as stats
+from gl_site.statistics import jobs
+
+# Models
+from gl_site.models import ExportJob
+from django.utils import timezone
+
+class TestExportJobs(TestCase):
+    """ Test for the export job views """
+
+    def setUp(self):
+        """ Set up a staff user with submissions """
+
+        self.user, self.info = Factory.create_user()
+        self.user.is_staff = True
+        self.user.save()
+
+        Factory.create_set_of_submissions(self.user)
+
+        # Login
+        self.client.login(username=self.user.username, password=Factory.default_password)
+
+        self.data = {
+            'organization': self.info.organization.id,
+            'session': self.info.session.id,
+            'file_type': 'text/csv'
+        }
+
+    def create(self):
+        """ Queue an export and return the response """
+        return self.client.post('/statistics/export_jobs', self.data)
+
+    def test_login_required(self):
+        """ User must be logged in to queue an export """
+
+        self.client.logout()
+        response = self.create()
+
+        self.assertRedirects(response, '/login', fetch_redirect_response=False)
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_create(self):
+        """ Queueing an export records a pending job """
+
+        response = self.create()
+        self.assertEqual(stats.ACCEPTED, response.status_code)
+
+        job = ExportJob.objects.get()
+        self.assertEqual(self.user, job.user)
+        self.assertEqual(self.info.session, job.session)
+        self.assertEqual('text/csv', job.file_type)
+
+        status = response.json()
+        self.assertEqual(ExportJob.PENDING, status['status'])
+        self.assertEqual(0, status['progress'])
+        self.assertEqual('/statistics/export_jobs/{}'.format(job.id), status['status_url'])
+        self.assertNotIn('download_url', status)
+
+    def test_method_not_allowed(self):
+        """ Exports are queued with POST """
+
+        response = self.client.get('/statistics/export_jobs', self.data)
+        self.assertEqual(stats.METHOD_NOT_ALLOWED, response.status_code)
+
+    def test_forbidden(self):
+        """ Invalid selections are not queued """
+
+        self.data['file_type'] = 'application/zip'
+        response = self.create()
+
+        self.assertEqual(stats.FORBIDDEN, response.status_code)
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_status_and_download(self):
+        """ Completed jobs can be downloaded """
+
+        status_url = self.create().json()['status_url']
+        job = ExportJob.objects.get()
+
+        # Not finished yet
+        response = self.client.get('/statistics/export_jobs/{}/download'.format(job.id))
+        self.assertEqual(stats.CONFLICT, response.status_code)
+
+        jobs.claim(1)
+        jobs.run(job.id)
+
+        status = self.client.get(status_url).json()
+        self.assertEqual(ExportJob.COMPLETE, status['status'])
+        self.assertEqual(100, status['progress'])
+
+        response = self.client.get(status['download_url'])
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('text/csv', response['Content-Type'])
+        self.assertIn('statistics.csv', response['Content-Disposition'])
+        self.assertEqual(2, len(b''.join(response.streaming_content).decode().splitlines()))
+
+    def test_failed_status(self):
+        """ Failed jobs report an error message """
+
+        self.create()
+        ExportJob.objects.update(status=ExportJob.FAILED, error='broken')
+        job = ExportJob.objects.get()
+
+        status = self.client.get('/statistics/export_jobs/{}'.format(job.id)).json()
+        self.assertEqual(stats.EXPORT_FAILED, status['error'])
+
+    def test_timed_out_status(self):
+        """ Jobs no worker finished in time fail when polled """
+
+        self.create()
+        ExportJob.objects.update(created=timezone.now() - 2 * jobs.JOB_TIMEOUT)
+        job = ExportJob.objects.get()
+
+        # Polling by other users leaves the job alone
+        other, info = Factory.create_user()
+        self.client.login(username=other.username, password=Factory.default_password)
+        response = self.client.get('/statistics/export_jobs/{}'.format(job.id))
+        self.assertEqual(stats.NOT_FOUND, response.status_code)
+        self.assertEqual(ExportJob.PENDING, ExportJob.objects.get().status)
+
+        self.client.login(username=self.user.username, password=Factory.default_password)
+        status = self.client.get('/statistics/export_jobs/{}'.format(job.id)).json()
+        self.assertEqual(ExportJob.FAILED, status['status'])
+        self.assertEqual(ExportJob.FAILED, ExportJob.objects.get().status)
+
+    def test_status_queries(self):
+        """ Polling a job that is on time only reads it """
+
+        self.create()
+        job = ExportJob.objects.get()
+
+        # The session and the user, then the job
+        with self.assertNumQueries(3):
+            self.client.get('/statistics/export_jobs/{}'.format(job.id))
+
+    def test_other_users_jobs(self):
+        """ Users can't see the jobs of other users """
+
+        self.create()
+        job = ExportJob.objects.get()
+
+        other, info = Factory.create_user()
+        self.client.login(username=other.username, password=Factory.default_password)
+
+        response = self.client.get('/statistics/export_jobs/{}'.format(job.id))
+        self.assertEqual(stats.NOT_FOUND, response.status_code)
+
+        response = self.client.get('/statistics/export_jobs/{}/download'.format(job.id))
+        self.assertEqual(stats.NOT_FOUND, response.status_code)
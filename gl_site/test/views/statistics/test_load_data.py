@@ -89,3 +89,93 @@ class TestLoadData(TestCase):
 
         # Verify
         self.assertEquals(stats.BAD_REQUEST, response.status_code)
+
+    def test_bins_mode(self):
+        """ Bins mode responds with histograms """
+
+        data = {
+            'organization': self.info.organization.id,
+            'session': self.info.session.id,
+            'mode': 'bins'
+        }
+
+        # Make the request
+        response = self.client.get('/statistics/load_data', data, follow = True)
+
+        # Verify
+        self.assertEqual(200, response.status_code)
+        for inventory in response.json():
+            if (inventory['inventory'] != 'VIA'):
+                self.assertTrue(inventory['histogram'])
+
+    def test_invalid_mode(self):
+        """ Unknown modes respond as forbidden """
+
+        data = {
+            'organization': self.info.organization.id,
+            'session': self.info.session.id,
+            'mode': 'unknown'
+        }
+
+        # Make the request
+        response = self.client.get('/statistics/load_data', data, follow = True)
+
+        # Verify
+        self.assertEqual(stats.FORBIDDEN, response.status_code)
+
+    def test_group_by(self):
+        """ Grouped data summarizes metrics per group """
+
+        data = {
+            'organization': self.info.organization.id,
+            'session': self.info.session.id,
+            'group_by': 'gender'
+        }
+
+        # Make the request
+        response = self.client.get('/statistics/load_data', data, follow = True)
+
+        # Verify
+        self.assertEqual(200, response.status_code)
+        for inventory in response.json():
+            self.assertEqual('gender', inventory['group_by'])
+            self.assertEqual({'Male'}, {point['key'] for point in inventory['data']})
+
+    def test_invalid_group_by(self):
+        """ Unknown groupings respond as forbidden """
+
+        data = {
+            'organization': self.info.organization.id,
+            'session': self.info.session.id,
+            'group_by': 'password'
+        }
+
+        # Make the request
+        response = self.client.get('/statistics/load_data', data, follow = True)
+
+        # Verify
+        self.assertEqual(stats.FORBIDDEN, response.status_code)
+
+    def test_levels_mode(self):
+        """ Staff can compare levels """
+
+        data = {
+            'organization': self.info.organization.id,
+            'session': self.info.session.id,
+            'mode': 'levels'
+        }
+
+        # Make the request
+        response = self.client.get('/statistics/load_data', data, follow = True)
+
+        # Verify
+        self.assertEqual(200, response.status_code)
+        for inventory in response.json():
+            self.assertEqual(3, len(inventory['levels']))
+
+        # Non staff may not compare levels
+        self.user.is_staff = False
+        self.user.save()
+
+        response = self.client.get('/statistics/load_data', data, follow = True)
+        self.assertEqual(stats.FORBIDDEN, response.status_code)
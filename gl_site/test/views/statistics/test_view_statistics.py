@@ -4,6 +4,11 @@ from django.test import TestCase
 # Object factory
 from gl_site.test.factory import Factory
 
+# Queries made by loading the statistics page: the session and the user
+# with their organization, then for each of the two forms the number of
+# organizations and sessions and the options of both selects.
+VIEW_STATISTICS_QUERIES = 10
+
 class TestViewStatistics(TestCase):
     """ Test the view statistics view """
 
@@ -32,3 +37,11 @@ class TestViewStatistics(TestCase):
         # Verify
         self.assertTemplateUsed(response, template_name = 'statistics/statistics.html')
         self.assertIn('form', response.context)
+
+    def test_query_count(self):
+        """ The user's organization is loaded with the user """
+
+        self.client.login(username=self.user.username, password=Factory.default_password)
+
+        with self.assertNumQueries(VIEW_STATISTICS_QUERIES):
+            self.client.get('/statistics/view')
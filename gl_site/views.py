@@ -13,10 +13,9 @@ import gl_site.forms.reset_password_form as reset_password_form
 
 #Inventory imports
 from gl_site.inventories import inventory_by_id
-from gl_site.inventories.views import get_submission, submission_is_complete
 
 # Model imports
-from gl_site.models import Session, LeadUserInfo
+from gl_site.models import Session, LeadUserInfo, Submission
 from gl_site.config_models import SiteConfig, DashboardText
 
 #Other imports
@@ -29,30 +28,36 @@ def dashboard(request):
     """
     The dashboard view, i.e. the homepage that logged-in users see.
     """
+    # Current page of each inventory the user has started,
+    # None once it is complete, fetched in a single query
+    current_pages = dict(Submission.objects.filter(
+        user=request.user
+    ).values_list('inventory_id', 'current_page'))
+
     entries = []
     for inventory_id, cls in inventory_by_id.items():
-        submission = get_submission(request.user, inventory_id)
-        is_complete = submission_is_complete(submission)
+        is_started = inventory_id in current_pages
+        current_page = current_pages.get(inventory_id)
 
         entry = {'inventory_id': inventory_id,
             'name': cls.name,
-            'is_complete': is_complete,
-            'is_started': submission is not None}
+            'is_complete': is_started and current_page is None,
+            'is_started': is_started,
+            'n_pages': cls().n_pages,
+
+            # Page the user continues from, counting from one
+            'page': current_page + 1 if current_page is not None else None}
         entries.append(entry)
 
     shuffled_quotes = list(dashboard_quotes)
     random.shuffle(shuffled_quotes)
 
-    dashbaord_text = DashboardText.objects.all()[0]
-
     data = {
         'inventories': entries,
         'quotes': shuffled_quotes,
-        'inventory_desc': dashbaord_text.inventory_desc,
-        'mental_health_warning': dashbaord_text.mental_health_warning,
-        'about_panel_title': dashbaord_text.about_panel_title,
-        'about_panel_contents': dashbaord_text.about_panel_contents,
     }
+    data.update(DashboardText.cached_text())
+
     return render(request, 'dashboard.html', data)
 
 @logout_required
@@ -130,9 +135,9 @@ def register(request, session_uuid):
 
             info.save()
 
-            #log the user in
-            user = auth.authenticate(username=request.POST['username'], password=request.POST['password1'])
-            auth.login(request, user)
+            #log the user in. The new user needs no authentication, which
+            #would hash the password a second time.
+            auth.login(request, user, backend='django.contrib.auth.backends.ModelBackend')
 
             #Redirect back to the login page, sending a success message
             messages.success(request, 'User account created successfully.')
@@ -35,7 +35,7 @@ MIDDLEWARE = (
     'django.middleware.common.CommonMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'gl_site.middleware.UserContextMiddleware', # Replaces AuthenticationMiddleware
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
 
@@ -79,6 +79,65 @@ STATICFILES_DIRS = (BASE_DIR / 'static',)
 CKEDITOR_UPLOAD_PATH = 'ckeditor_uploads/'
 
 
+# How statistics load per user data: 'prefetch' builds model instances
+# with prefetched submissions and metrics, 'flat' pivots the rows of a
+# single values_list query.
+STATISTICS_DATA_ENGINE = 'prefetch'
+
+
+# Parse the inventory item banks when a WSGI worker starts rather than
+# on the first request that uses them.
+PRELOAD_ITEM_BANKS = True
+
+
+# Run a listener for cache invalidations in each WSGI worker. It holds
+# one database connection of its own. See gl_site.invalidation.
+LISTEN_FOR_INVALIDATIONS = True
+
+
+# Name of a cache in CACHES shared by every worker, such as memcached,
+# to use as the second level of the caches of gl_site.invalidation.
+# None leaves them in process memory only. Don't name a local memory
+# cache: each process has its own, so no values would be shared.
+INVALIDATION_SHARED_CACHE = None
+
+
+# Caches. The 'statistics' cache holds encoded load_data responses. Its
+# keys include per session data versions stored in the database, so any
+# backend may be used; the local memory backend evicts the least
+# recently used responses once MAX_ENTRIES is reached.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'statistics': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'statistics',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 200,
+        },
+    },
+}
+
+
+# Database backend: PostgreSQL with a bounded connection pool per
+# process, cooperative with gevent workers. See gl_site.db.
+DATABASE_ENGINE = 'gl_site.db.postgresql'
+
+
+# Password hashers. The first hashes new passwords with Django's default
+# PBKDF2 in a native thread, so gevent workers keep serving other
+# requests; the others verify passwords hashed before a change of
+# algorithm.
+PASSWORD_HASHERS = [
+    'gl_site.hashers.OffloadedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+
 # Default url for login page (override django default)
 LOGIN_URL = '/login'
 
@@ -23,7 +23,8 @@ ALLOWED_HOSTS = ['*']
 # Parse database configuration from $DATABASE_URL
 DATABASES = {
     'default': dj_database_url.config(
-        default='postgres://gl_dev:pw@localhost/goodnight_lead'
+        default='postgres://gl_dev:pw@localhost/goodnight_lead',
+        engine=DATABASE_ENGINE
     )
 }
 
@@ -41,6 +41,13 @@ CSRF_COOKIE_SECURE = True
 X_FRAME_OPTIONS = 'DENY'
 
 # Parse database configuration from $DATABASE_URL
-DATABASES = {'default': dj_database_url.config()}
+DATABASES = {'default': dj_database_url.config(engine=DATABASE_ENGINE)}
+
+# Connections per web worker. Every worker of every dyno may open this
+# many, so keep workers * dynos * DATABASE_POOL_SIZE within the
+# connection limit of the database plan, along with one connection
+# per worker for the invalidation listener.
+DATABASES['default']['POOL_SIZE'] = int(os.getenv('DATABASE_POOL_SIZE', 4))
+DATABASES['default']['POOL_TIMEOUT'] = int(os.getenv('DATABASE_POOL_TIMEOUT', 10))
 
 
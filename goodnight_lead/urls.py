@@ -39,6 +39,11 @@ urlpatterns = [
     url(r'^statistics/view$', statistic_views.view_statistics, name='view_statistics'),
     url(r'^statistics/load_data$', statistic_views.load_data, name='load_data'),
     url(r'^statistics/download_data$', statistic_views.download_data, name='download_data'),
+    url(r'^statistics/export_jobs$', statistic_views.create_export_job, name='create_export_job'),
+    url(r'^statistics/export_jobs/(?P<job_id>[0-9]+)$', statistic_views.export_job_status,
+        name='export_job_status'),
+    url(r'^statistics/export_jobs/(?P<job_id>[0-9]+)/download$', statistic_views.download_export_job,
+        name='download_export_job'),
 
     # Admin site
     url(r'^admin', admin.site.urls),
@@ -5,3 +5,15 @@ from dj_static import Cling
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'goodnight_lead.settings.production')
 
 application = Cling(get_wsgi_application())
+
+# Parse the inventory item banks when the worker starts
+from django.conf import settings
+if settings.PRELOAD_ITEM_BANKS:
+    from gl_site.inventories import preload_item_banks
+    preload_item_banks()
+
+# Listen for cache invalidations in the background, one listener per
+# worker since gunicorn loads the application in each worker
+if settings.LISTEN_FOR_INVALIDATIONS:
+    from gl_site.invalidation import start_listener
+    start_listener()
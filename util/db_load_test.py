@@ -0,0 +1,145 @@
+"""
+Concurrent load test of the pooled database backend.
+
+Runs many greenlets against the database the way the gunicorn gevent
+worker runs requests: each one connects, runs a query that holds its
+connection for a while and closes the connection again. Reports the
+throughput, the latency of the requests, the pool's metrics and the
+peak number of server connections.
+
+Run from the root of the repository against a local Postgres:
+
+    DATABASE_URL=postgres://localhost/goodnight_lead \\
+        python util/db_load_test.py --greenlets 200 --pool-size 10
+
+Without --pool-size the POOL_SIZE of the settings is used.
+"""
+
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import os
+import sys
+import time
+
+import gevent
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'goodnight_lead.settings.development')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.db import connection, connections, OperationalError
+from gl_site.db import green, pool
+
+def percentile(values, fraction):
+    """ Value below which fraction of the sorted values fall """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def request(hold, latencies, errors):
+    """ One simulated request: a query holding a connection for hold seconds """
+    start = time.monotonic()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_sleep(%s)', [hold])
+    except OperationalError as error:
+        errors.append(error)
+    else:
+        latencies.append(time.monotonic() - start)
+    finally:
+        # Django closes the connection at the end of each request
+        connection.close()
+
+def client(requests, hold, latencies, errors):
+    for i in range(requests):
+        request(hold, latencies, errors)
+
+    connections.close_all()
+
+def sample_connections(peak, stop):
+    """ Record the peak number of server connections to the database,
+        through a connection outside the pool
+    """
+    params = connection.get_connection_params()
+    monitor = psycopg2.connect(**params)
+    monitor.autocommit = True
+
+    try:
+        cursor = monitor.cursor()
+        while not stop:
+            cursor.execute(
+                'SELECT COUNT(*) FROM pg_stat_activity WHERE datname = %s AND pid <> pg_backend_pid()',
+                [params['database']]
+            )
+            peak[0] = max(peak[0], cursor.fetchone()[0])
+            gevent.sleep(0.01)
+    finally:
+        monitor.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--greenlets', type=int, default=100, help='Number of concurrent clients.')
+    parser.add_argument('--requests', type=int, default=10, help='Requests per client.')
+    parser.add_argument('--hold', type=float, default=0.01, help='Seconds each query holds its connection.')
+    parser.add_argument('--pool-size', type=int, help='Connections in the pool.')
+    parser.add_argument('--timeout', type=float, help='Seconds a request waits for a connection.')
+    options = parser.parse_args()
+
+    database = settings.DATABASES['default']
+    if options.pool_size is not None:
+        database['POOL_SIZE'] = options.pool_size
+    if options.timeout is not None:
+        database['POOL_TIMEOUT'] = options.timeout
+
+    print('psycopg2 green: {}'.format(green.is_psycopg_green()))
+    print('pool size: {}, timeout: {}'.format(
+        database.get('POOL_SIZE', pool.DEFAULT_SIZE),
+        database.get('POOL_TIMEOUT', pool.DEFAULT_TIMEOUT)
+    ))
+
+    latencies = []
+    errors = []
+    peak = [0]
+    stop = []
+
+    monitor = gevent.spawn(sample_connections, peak, stop)
+
+    start = time.monotonic()
+    gevent.joinall(
+        [
+            gevent.spawn(client, options.requests, options.hold, latencies, errors)
+            for i in range(options.greenlets)
+        ],
+        raise_error=True
+    )
+    elapsed = time.monotonic() - start
+
+    stop.append(True)
+    monitor.join()
+
+    latencies.sort()
+    print('requests: {} in {:.2f} s, {:.0f} per second'.format(
+        len(latencies) + len(errors), elapsed, (len(latencies) + len(errors)) / elapsed
+    ))
+    print('latency p50: {:.1f} ms, p95: {:.1f} ms, max: {:.1f} ms'.format(
+        percentile(latencies, 0.5) * 1000,
+        percentile(latencies, 0.95) * 1000,
+        percentile(latencies, 1.0) * 1000
+    ))
+    print('pool timeouts: {}'.format(len(errors)))
+    print('peak server connections: {}'.format(peak[0]))
+
+    for name, stats in pool.pool_stats().items():
+        print('pool {}: {}'.format(name, ', '.join(
+            '{}={}'.format(key, round(value, 3) if isinstance(value, float) else value)
+            for key, value in stats.items()
+        )))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Burst benchmark of password hashing on a gevent worker.
+
+Starts a burst of greenlets that each hash a password, as registering
+does, and verify it, as logging in does, while another greenlet stands
+in for the other requests of the worker: it wakes every few milliseconds
+and records how late it is. Runs the burst with Django's PBKDF2 hasher
+hashing on the hub and with the hasher of the settings, which hashes in
+a native thread, and reports the latency of both the burst and the
+other requests.
+
+Run from the root of the repository:
+
+    python util/hash_burst_test.py --greenlets 150
+"""
+
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import os
+import sys
+import time
+
+import gevent
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'goodnight_lead.settings.development')
+
+import django
+django.setup()
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, get_hasher
+
+# Seconds between the wake ups of the stand in for other requests
+TICK = 0.005
+
+def percentile(values, fraction):
+    """ Value below which fraction of the sorted values fall """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def user(hasher, latencies):
+    """ Register and log in """
+    start = time.monotonic()
+    encoded = hasher.encode('password', hasher.salt())
+    hasher.verify('password', encoded)
+    latencies.append(time.monotonic() - start)
+
+def other_requests(delays, stop):
+    while not stop:
+        start = time.monotonic()
+        gevent.sleep(TICK)
+        delays.append(time.monotonic() - start - TICK)
+
+def burst(hasher, greenlets):
+    latencies = []
+    delays = []
+    stop = []
+
+    ticker = gevent.spawn(other_requests, delays, stop)
+    gevent.sleep(TICK)
+
+    start = time.monotonic()
+    gevent.joinall([gevent.spawn(user, hasher, latencies) for i in range(greenlets)], raise_error=True)
+    elapsed = time.monotonic() - start
+
+    stop.append(True)
+    ticker.join()
+
+    return elapsed, sorted(latencies), sorted(delays)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--greenlets', type=int, default=150, help='Number of users in the burst.')
+    options = parser.parse_args()
+
+    hashers = [('on the hub', PBKDF2PasswordHasher()), ('offloaded', get_hasher())]
+
+    print('{} users registering and logging in at once'.format(options.greenlets))
+    print('{:<12} {:>8} {:>12} {:>12} {:>14} {:>14}'.format(
+        '', 'total s', 'user p50 ms', 'user p99 ms', 'other p99 ms', 'other max ms'
+    ))
+
+    for name, hasher in hashers:
+        elapsed, latencies, delays = burst(hasher, options.greenlets)
+        print('{:<12} {:>8.2f} {:>12.1f} {:>12.1f} {:>14.1f} {:>14.1f}'.format(
+            name,
+            elapsed,
+            percentile(latencies, 0.5) * 1000,
+            percentile(latencies, 0.99) * 1000,
+            percentile(delays, 0.99) * 1000,
+            percentile(delays, 1.0) * 1000
+        ))
+
+if __name__ == '__main__':
+    main()